@@ -0,0 +1,299 @@
+"""
+Extração em lote pela Batch API da OpenAI, para reprocessamentos grandes.
+
+Em vez de uma chamada síncrona por documento, todos os prompts vão para um arquivo
+JSONL enviado como um único lote; a OpenAI processa o lote em até 24h, com custo
+menor por documento, e os resultados são ligados de volta aos ids do Drive.
+
+Uso:
+    python batch_extraction.py submit    # baixa os termos, monta e envia o lote
+    python batch_extraction.py collect   # acompanha o lote e grava os resultados
+    python batch_extraction.py run       # submit + collect, esperando o lote terminar
+
+Documentos resolvidos pelas regras (rule_extractor.py) ou pelo cache da IA não entram
+no lote e são gravados já no `submit`. Os resultados vão para o mesmo arquivo JSON Lines
+do `process_documents.py`; documentos que falharem no lote podem ser refeitos com
+`python process_documents.py --resume`.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import process_documents
+from jsonl_io import JsonlWriter, read_written_ids
+from llm_cache import make_cache_key
+from metrics import metrics
+from near_duplicates import is_template
+from process_documents import (
+    MANIFEST_FILE, OPENAI_MODEL, OUTPUT_FILE, SYSTEM_PROMPT, build_user_prompt, get_docx_text,
+    get_drive_service, get_llm_cache, list_all_docx_files, load_manifest,
+    manifest_entry, prepare_prompt_text, save_manifest,
+)
+from rule_extractor import extract_with_rules, low_confidence_fields, merge_with_llm
+
+BATCH_INPUT_FILE = "lote_openai_entrada.jsonl"
+BATCH_STATE_FILE = "lote_openai_estado.json"
+BATCH_ENDPOINT = "/v1/chat/completions"
+POLL_INTERVAL_SECONDS = 60
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def build_batch_request(custom_id, system_prompt, user_prompt):
+    """Uma linha do arquivo de lote: a mesma requisição que `extract_data_with_openai` faria."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": OPENAI_MODEL,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        },
+    }
+
+
+def _finish_record(data, item, metodo):
+    data['arquivo_origem'] = item['name']
+    data['id_arquivo_drive'] = item['id']
+    data['metodo_extracao'] = metodo
+    return data
+
+
+def _save_state(state, path=BATCH_STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _load_state(path=BATCH_STATE_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def prepare_batch(items, fetch_text, writer, manifest, input_path=BATCH_INPUT_FILE, download_workers=4,
+                  failures=None):
+    """
+    Baixa os textos e decide o destino de cada documento: gravado direto (regras
+    confiáveis ou resposta já em cache) ou incluído no arquivo de lote.
+    Retorna o dicionário de pendências do lote, indexado pelo custom_id (id do Drive).
+
+    Um arquivo que falha no download fica de fora do lote sem interromper os demais;
+    se `failures` for uma lista, recebe (nome, motivo) de cada um.
+    """
+    cache = get_llm_cache() if process_documents.USE_LLM_CACHE else None
+    pending = {}
+
+    def _fetch(item):
+        try:
+            return item, fetch_text(item), None
+        except Exception as e:
+            return item, None, e
+
+    with open(input_path, 'w', encoding='utf-8') as batch_file, \
+         ThreadPoolExecutor(download_workers, thread_name_prefix="download") as pool:
+        texts = pool.map(_fetch, items)
+        for index, (item, text, error) in enumerate(texts):
+            print(f"[ {index + 1}/{len(items)} ] {item['name']}")
+            if not text:
+                reason = f"erro no download: {error}" if error else "texto vazio"
+                print(f"    - Falha ao baixar ({reason}); o arquivo fica de fora do lote.")
+                if failures is not None:
+                    failures.append((item['name'], reason))
+                continue
+            if process_documents.USE_NEAR_DUPLICATES and is_template(item['name'], text):
+                print("    - Modelo de termo; o arquivo fica de fora do lote.")
+                continue
+
+            rules_data, confidence = (extract_with_rules(text) if process_documents.USE_RULES else (None, None))
+            if rules_data and not low_confidence_fields(confidence):
+                writer.write(_finish_record(rules_data, item, 'regras'))
+                manifest[item['id']] = manifest_entry(item)
+                print("    - Extraído localmente por regras.")
+                continue
+
+            user_prompt = build_user_prompt(prepare_prompt_text(text, item['name']), item['name'])
+            cache_key = make_cache_key(OPENAI_MODEL, SYSTEM_PROMPT, user_prompt)
+            cached_response = cache.get(cache_key) if cache else None
+            if cached_response is not None:
+                llm_data = json.loads(cached_response)
+                if rules_data:
+                    llm_data = merge_with_llm(rules_data, confidence, llm_data)
+                writer.write(_finish_record(llm_data, item, 'regras+ia' if rules_data else 'ia'))
+                manifest[item['id']] = manifest_entry(item)
+                print("    - Resposta reaproveitada do cache da IA.")
+                continue
+
+            request = build_batch_request(item['id'], SYSTEM_PROMPT, user_prompt)
+            batch_file.write(json.dumps(request, ensure_ascii=False) + '\n')
+            pending[item['id']] = {
+                "item": item,
+                "chave_cache": cache_key,
+                "regras": rules_data,
+                "confianca": confidence,
+            }
+    return pending
+
+
+def submit(llm_client=None, resume=False, download_workers=4):
+    """Monta o lote com os documentos que precisam da IA e o envia à OpenAI."""
+    llm_client = llm_client or process_documents.get_openai_client()
+    if os.path.exists(BATCH_STATE_FILE):
+        print(f"Erro: já existe um lote pendente em '{BATCH_STATE_FILE}'. Rode 'collect' antes de enviar outro.")
+        return None
+    failed_folders = []
+    items = list_all_docx_files(failures=failed_folders)
+    written_ids = read_written_ids(OUTPUT_FILE) if resume else set()
+    manifest = load_manifest() if resume else {}
+    items = [item for item in items if item['id'] not in written_ids]
+    print(f"\nPreparando lote com {len(items)} arquivos...")
+
+    failed_files = []
+    with JsonlWriter(OUTPUT_FILE, append=resume) as writer:
+        pending = prepare_batch(
+            items,
+            fetch_text=lambda item: get_docx_text(get_drive_service(), item['id'], item.get('modifiedTime')),
+            writer=writer,
+            manifest=manifest,
+            download_workers=download_workers,
+            failures=failed_files,
+        )
+    save_manifest(manifest)
+    metrics.count("lote.documentos", len(pending))
+    metrics.count("lote.falhas_download", len(failed_files))
+    metrics.write_run("batch_extraction_submit")
+
+    if failed_folders:
+        print(f"\nAVISO: {len(failed_folders)} pasta(s) não puderam ser listadas; os arquivos delas ficaram de fora:")
+        for name, _, error in failed_folders:
+            print(f"- {name}: {error}")
+    if failed_files:
+        print(f"\n{len(failed_files)} arquivo(s) ficaram de fora do lote; refaça-os com "
+              "'python process_documents.py --resume':")
+        for name, reason in failed_files:
+            print(f"- {name}: {reason}")
+
+    if not pending:
+        print("\nNenhum documento precisa da IA; nada a enviar em lote.")
+        return None
+
+    with open(BATCH_INPUT_FILE, 'rb') as f:
+        input_file = llm_client.files.create(file=f, purpose="batch")
+    batch = llm_client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata={"origem": "extrator-termos-drive"},
+    )
+    _save_state({"batch_id": batch.id, "pendentes": pending})
+    print(f"\nLote '{batch.id}' enviado com {len(pending)} documentos. "
+          f"Acompanhe com 'python batch_extraction.py collect'.")
+    return batch.id
+
+
+def wait_for_batch(llm_client, batch_id, poll_interval=POLL_INTERVAL_SECONDS):
+    """Consulta o lote até ele chegar a um estado final."""
+    while True:
+        batch = llm_client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts:
+            print(f"    - Lote {batch_id}: {batch.status} "
+                  f"({counts.completed} concluídos, {counts.failed} com falha de {counts.total}).")
+        else:
+            print(f"    - Lote {batch_id}: {batch.status}.")
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def collect(llm_client=None, wait=True, poll_interval=POLL_INTERVAL_SECONDS):
+    """Baixa os resultados do lote, liga-os aos ids do Drive e grava os registros."""
+    llm_client = llm_client or process_documents.get_openai_client()
+    if not os.path.exists(BATCH_STATE_FILE):
+        print(f"Erro: nenhum lote pendente ('{BATCH_STATE_FILE}' não encontrado).")
+        return
+    state = _load_state()
+    pending = state["pendentes"]
+
+    batch = wait_for_batch(llm_client, state["batch_id"], poll_interval) if wait \
+        else llm_client.batches.retrieve(state["batch_id"])
+    if batch.status not in TERMINAL_STATUSES:
+        print(f"O lote ainda está em '{batch.status}'. Tente novamente mais tarde.")
+        return
+    if not batch.output_file_id:
+        print(f"O lote terminou em '{batch.status}' sem arquivo de resultados.")
+        return
+
+    cache = get_llm_cache() if process_documents.USE_LLM_CACHE else None
+    manifest = load_manifest() if os.path.exists(MANIFEST_FILE) else {}
+    output = llm_client.files.content(batch.output_file_id).text
+    succeeded, failed = 0, []
+    with JsonlWriter(OUTPUT_FILE, append=True) as writer:
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            entry = pending.pop(result.get("custom_id"), None)
+            if entry is None:
+                continue
+            item = entry["item"]
+            response = result.get("response") or {}
+            try:
+                if response.get("status_code") != 200:
+                    raise ValueError(result.get("error") or f"status {response.get('status_code')}")
+                content = response["body"]["choices"][0]["message"]["content"]
+                metrics.add_tokens(OPENAI_MODEL, response["body"].get("usage"), batch=True)
+                llm_data = json.loads(content)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                failed.append((item['name'], str(e)))
+                continue
+            if cache:
+                cache.set(entry["chave_cache"], OPENAI_MODEL, content)
+            if entry["regras"]:
+                llm_data = merge_with_llm(entry["regras"], entry["confianca"], llm_data)
+            writer.write(_finish_record(llm_data, item, 'regras+ia' if entry["regras"] else 'ia'))
+            manifest[item['id']] = manifest_entry(item)
+            succeeded += 1
+    save_manifest(manifest)
+
+    # Requisições sem linha no resultado (ex.: lote expirado) também contam como falha
+    failed.extend((entry["item"]['name'], "sem resposta no lote") for entry in pending.values())
+    os.remove(BATCH_STATE_FILE)
+
+    print(f"\nLote '{batch.id}' concluído: {succeeded} registros gravados em '{OUTPUT_FILE}'.")
+    if failed:
+        print(f"{len(failed)} documentos falharam; refaça-os com 'python process_documents.py --resume':")
+        for name, reason in failed:
+            print(f"- {name}: {reason}")
+    metrics.count("registros_gravados", succeeded)
+    metrics.count("lote.falhas", len(failed))
+    metrics.write_run("batch_extraction_collect")
+
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py batch`)."""
+    parser.add_argument("acao", choices=("submit", "collect", "run"))
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Pula os arquivos já gravados em '{OUTPUT_FILE}' (submit/run).")
+    parser.add_argument("--poll-interval", type=int, default=POLL_INTERVAL_SECONDS,
+                        help="Segundos entre as consultas ao estado do lote.")
+
+
+def run_cli(args):
+    if args.acao in ("submit", "run"):
+        batch_id = submit(resume=args.resume)
+        if args.acao == "run" and batch_id:
+            collect(poll_interval=args.poll_interval)
+    else:
+        collect(poll_interval=args.poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extração dos termos pela Batch API da OpenAI.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
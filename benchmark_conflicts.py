@@ -0,0 +1,116 @@
+"""
+Mede a detecção de conflitos de reserva de `booking_conflicts.BookingIndex` contra a
+comparação de todos os pares de eventos, e o tempo da consulta "o espaço está livre?".
+
+As reservas sintéticas cobrem `--years` anos, com `--per-day` eventos por dia em média,
+de 1 a 3 dias cada, nos textos de espaço que aparecem nos termos. A comparação par a par
+(O(n²)) só roda até `--naive-limit` eventos; nesses tamanhos, as duas contam os mesmos
+pares em conflito.
+
+Uso:
+    python benchmark_conflicts.py                       # 10 anos, ~4 eventos por dia
+    python benchmark_conflicts.py --years 30 --per-day 20 --queries 10000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from booking_conflicts import BookingIndex, day_interval, normalize_spaces
+
+SPACES = (
+    "Auditório e Espaço Aberto em frente ao Auditório do Centro de Inovação do Jaraguá",
+    "Auditório do Centro de Inovação do Jaraguá",
+    "Anfiteatro do Centro de Inovação do Jaraguá",
+    "AUDITÓRIO, ESPAÇO ABERTO EM FRENTE AO AUDITÓRIO, ANFITEATRO do Centro de Inovação do Jaraguá",
+    "Coworking da 116 (Espaço de Fomento) do Centro de Inovação do Jaraguá",
+    "Coworking do Espaço de Fomento, Sala de Reunião 116 e Anfiteatro do Centro de Inovação do Jaraguá",
+    "Laboratório Oxetech do Centro de Inovação do Jaraguá",
+)
+HOURS = ("07h", "08:00", "09h", "10h", "13h", "14:00", "15h30", "17h", "18h", "19h", "20h", "22h", "23h")
+
+
+def synthetic_bookings(years, per_day, seed=42):
+    """Lista de (chave, espaço, datas, hora_inicio, hora_fim)."""
+    random.seed(seed)
+    start = date(2020, 1, 1)
+    days = years * 365
+    bookings = []
+    for key in range(int(days * per_day)):
+        first_day = start + timedelta(days=random.randrange(days))
+        dates = [(first_day + timedelta(days=d)).isoformat() for d in range(random.randrange(1, 4))]
+        first, last = sorted(random.sample(range(len(HOURS)), 2))
+        bookings.append((key, random.choice(SPACES), dates, HOURS[first], HOURS[last]))
+    return bookings
+
+
+def naive_conflict_pairs(bookings):
+    """Pares em conflito comparando cada evento com todos os anteriores."""
+    expanded = [(key, normalize_spaces(espaco),
+                 [interval for interval in (day_interval(day, inicio, fim) for day in dates) if interval])
+                for key, espaco, dates, inicio, fim in bookings]
+    pairs = set()
+    for i, (key, spaces, intervals) in enumerate(expanded):
+        for other_key, other_spaces, other_intervals in expanded[:i]:
+            if spaces & other_spaces and any(start < other_end and other_start < end
+                                             for start, end in intervals
+                                             for other_start, other_end in other_intervals):
+                pairs.add((other_key, key))
+    return pairs
+
+
+def index_conflict_pairs(bookings):
+    index = BookingIndex()
+    pairs = set()
+    for key, espaco, dates, inicio, fim in bookings:
+        for other_key, _, _, _ in index.add(key, espaco, dates, inicio, fim):
+            pairs.add((other_key, key))
+    return index, pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da detecção de conflitos de reserva.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--per-day", type=float, default=4.0)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--naive-limit", type=int, default=4000,
+                        help="Maior número de eventos comparado par a par.")
+    args = parser.parse_args()
+
+    bookings = synthetic_bookings(args.years, args.per_day)
+    print(f"--- {len(bookings)} eventos em {args.years} anos ---")
+    print(f"{'eventos':>9} {'pares (s)':>10} {'índice (s)':>11} {'ganho':>7} {'conflitos':>10}")
+    sizes = sorted({size for size in (500, 1000, 2000, args.naive_limit) if size <= min(args.naive_limit, len(bookings))})
+    for size in sizes:
+        start = time.perf_counter()
+        naive_pairs = naive_conflict_pairs(bookings[:size])
+        naive_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        _, pairs = index_conflict_pairs(bookings[:size])
+        index_seconds = time.perf_counter() - start
+        check = "" if pairs == naive_pairs else f"  (diferentes: {len(naive_pairs)} x {len(pairs)})"
+        print(f"{size:>9} {naive_seconds:>10.3f} {index_seconds:>11.4f} {naive_seconds / index_seconds:>6.0f}x "
+              f"{len(pairs):>10}{check}")
+
+    start = time.perf_counter()
+    index, pairs = index_conflict_pairs(bookings)
+    index_seconds = time.perf_counter() - start
+    print(f"{len(bookings):>9} {'-':>10} {index_seconds:>11.4f} {'':>7} {len(pairs):>10}")
+
+    random.seed(7)
+    total_days = args.years * 365
+    queries = [(random.choice(SPACES), (date(2020, 1, 1) + timedelta(days=random.randrange(total_days))).isoformat(),
+                "18h", "22h") for _ in range(args.queries)]
+    timings = []
+    free = 0
+    for espaco, day, inicio, fim in queries:
+        start = time.perf_counter()
+        free += index.is_free(espaco, day, inicio, fim)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    print(f"\nConsulta 'está livre?' ({args.queries} consultas sobre {len(bookings)} eventos): "
+          f"mediana {statistics.median(timings):.1f} µs, máximo {max(timings):.1f} µs; {free} livres.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compara o extrator rápido de `docx_text.py` com a extração antiga via python-docx.
+
+Mede, por documento, o tempo de CPU e o pico de memória alocada de cada extrator,
+além do tamanho do texto gerado (o python-docx repete células mescladas).
+
+Uso:
+    python benchmark_docx.py pasta_com_termos/     # arquivos .docx locais
+    python benchmark_docx.py --drive 50            # primeiros 50 termos das pastas do Drive
+    python benchmark_docx.py --synthetic 20        # termos sintéticos (não precisa de rede)
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+import tracemalloc
+
+import docx
+
+from docx_text import extract_docx_text
+
+
+def python_docx_text(data):
+    """Extração original de `get_docx_text`, baseada no modelo de objetos do python-docx."""
+    document = docx.Document(io.BytesIO(data))
+    full_text = []
+    for para in document.paragraphs:
+        full_text.append(para.text)
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                full_text.append(cell.text)
+    return '\n'.join(full_text)
+
+
+def fast_docx_text(data):
+    return extract_docx_text(io.BytesIO(data))
+
+
+def load_corpus_from_dir(path):
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(".docx"):
+            with open(os.path.join(path, name), "rb") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def load_corpus_from_drive(limit):
+    from googleapiclient.http import MediaIoBaseDownload
+    from drive_listing import list_docx_files
+    from process_documents import FOLDER_ID_GRATUITOS, FOLDER_ID_PAGOS, get_drive_service
+
+    service = get_drive_service()
+    corpus = []
+    for folder_id in (FOLDER_ID_PAGOS, FOLDER_ID_GRATUITOS):
+        for item in list_docx_files(service, folder_id):
+            if len(corpus) >= limit:
+                return corpus
+            buffer = io.BytesIO()
+            downloader = MediaIoBaseDownload(buffer, service.files().get_media(fileId=item['id']))
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+            corpus.append((item['name'], buffer.getvalue()))
+    return corpus
+
+
+def synthetic_corpus(count):
+    """Termos no formato dos reais, com uma tabela de valores que tem células mescladas."""
+    corpus = []
+    for i in range(count):
+        document = docx.Document()
+        document.add_paragraph(f"TERMO DE PERMISSÃO DE USO Nº {i + 1}/2025")
+        document.add_paragraph(f"Processo n°: E:30010.{i:010d}/2025")
+        document.add_paragraph("PERMISSIONÁRIO(A): EMPRESA EXEMPLO LTDA, inscrita no CNPJ/MF sob o nº 12.345.678/0001-90.")
+        for clause in range(30):
+            document.add_paragraph(f"CLÁUSULA {clause + 1}: " + "texto padrão do termo de permissão de uso. " * 12)
+        table = document.add_table(rows=12, cols=6)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = "Auditório - diária de R$ 2.495,00"
+        table.cell(0, 0).merge(table.cell(0, 5))
+        table.cell(1, 0).merge(table.cell(11, 0))
+        buffer = io.BytesIO()
+        document.save(buffer)
+        corpus.append((f"sintetico_{i + 1}.docx", buffer.getvalue()))
+    return corpus
+
+
+def measure(extractor, data):
+    """Retorna (tempo de CPU em ms, pico de memória em KB, tamanho do texto)."""
+    tracemalloc.start()
+    start = time.process_time()
+    text = extractor(data)
+    cpu_ms = (time.process_time() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024, len(text)
+
+
+def run_benchmark(corpus, repeat=3):
+    results = {}
+    for label, extractor in (("python-docx", python_docx_text), ("docx_text", fast_docx_text)):
+        cpu, memory, chars = [], [], []
+        for _, data in corpus:
+            # Melhor de `repeat` execuções, para reduzir o ruído de CPU
+            runs = [measure(extractor, data) for _ in range(repeat)]
+            cpu.append(min(run[0] for run in runs))
+            memory.append(min(run[1] for run in runs))
+            chars.append(runs[0][2])
+        results[label] = {
+            "cpu_ms": statistics.median(cpu),
+            "memoria_kb": statistics.median(memory),
+            "caracteres": sum(chars),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extração de texto de .docx.")
+    parser.add_argument("pasta", nargs="?", help="Pasta com arquivos .docx.")
+    parser.add_argument("--drive", type=int, metavar="N", help="Baixa os N primeiros termos do Drive.")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="Gera N termos sintéticos.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pasta:
+        corpus = load_corpus_from_dir(args.pasta)
+    elif args.drive:
+        corpus = load_corpus_from_drive(args.drive)
+    else:
+        corpus = synthetic_corpus(args.synthetic or 20)
+    if not corpus:
+        print("Nenhum documento .docx encontrado para o benchmark.")
+        return
+
+    results = run_benchmark(corpus, repeat=args.repeat)
+    old, new = results["python-docx"], results["docx_text"]
+    print(f"--- Benchmark de extração de texto ({len(corpus)} documentos, mediana por documento) ---")
+    print(f"{'extrator':<12} {'CPU (ms)':>10} {'memória (KB)':>14} {'caracteres':>12}")
+    for label, result in results.items():
+        print(f"{label:<12} {result['cpu_ms']:>10.2f} {result['memoria_kb']:>14.0f} {result['caracteres']:>12}")
+    print(f"\nCPU: {old['cpu_ms'] / new['cpu_ms']:.1f}x mais rápido | "
+          f"memória: {old['memoria_kb'] / new['memoria_kb']:.1f}x menor | "
+          f"texto: {1 - new['caracteres'] / old['caracteres']:.0%} menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Mede as consultas de calendário e por cliente na tabela Eventos, antes e depois da
+migração `eventos_datas.sql` (índices + tabela normalizada Eventos_Datas).
+
+Gera um banco sintético com o esquema de `sistemacipt_teste.db` e roda:
+- intervalo de datas: eventos com alguma data num mês, relendo o JSON de
+  `datas_evento` (antes) ou pelo índice de Eventos_Datas (depois);
+- por cliente: todos os eventos de um cliente, com e sem o índice em id_cliente;
+- por termo: busca por numero_termo, com e sem índice.
+
+Uso:
+    python benchmark_eventos.py                   # 200 mil eventos
+    python benchmark_eventos.py --events 50000 --queries 50
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmark_import import create_empty_db
+
+MIGRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eventos_datas.sql")
+
+RANGE_BEFORE_SQL = """
+    SELECT DISTINCT Eventos.id FROM Eventos, json_each(Eventos.datas_evento) AS datas
+    WHERE datas.value BETWEEN ? AND ?
+"""
+RANGE_AFTER_SQL = "SELECT DISTINCT id_evento FROM Eventos_Datas WHERE data BETWEEN ? AND ?"
+CLIENT_SQL = "SELECT id, nome_evento, datas_evento FROM Eventos WHERE id_cliente = ?"
+TERMO_SQL = "SELECT id FROM Eventos WHERE numero_termo = ?"
+
+
+def fill_synthetic_db(path, events, clients, seed=42):
+    random.seed(seed)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO Clientes_Eventos (id, nome_razao_social, tipo_pessoa, documento) VALUES (?, ?, 'PJ', ?)",
+        ((i, f"EMPRESA {i} LTDA", f"{i:014d}") for i in range(1, clients + 1)),
+    )
+    start = date(2023, 1, 1)
+    rows = []
+    for i in range(1, events + 1):
+        first_day = start + timedelta(days=random.randrange(3 * 365))
+        days = [(first_day + timedelta(days=d)).isoformat() for d in range(random.randrange(1, 4))]
+        rows.append((i, random.randrange(1, clients + 1), f"Evento {i}", json.dumps(days), len(days),
+                     1000.0, 1000.0, f"{i}/{first_day.year}", f"E:30010.{i:010d}/{first_day.year}"))
+    conn.executemany(
+        "INSERT INTO Eventos (id, id_cliente, nome_evento, datas_evento, total_diarias, valor_bruto, valor_final, "
+        "numero_termo, numero_processo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_queries(conn, sql, params_list):
+    """Mediana, em ms, do tempo de cada consulta (lendo todas as linhas); e o total de linhas."""
+    timings, total_rows = [], 0
+    for params in params_list:
+        start = time.perf_counter()
+        total_rows += len(conn.execute(sql, params).fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas de eventos por data e por cliente.")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(7)
+    months = [(f"{year}-{month:02d}-01", f"{year}-{month:02d}-31")
+              for year, month in ((random.randrange(2023, 2026), random.randrange(1, 13)) for _ in range(args.queries))]
+    client_ids = [(random.randrange(1, args.clients + 1),) for _ in range(args.queries)]
+    termos = [(f"{i}/{year}",) for i, year in
+              ((random.randrange(1, args.events + 1), random.randrange(2023, 2026)) for _ in range(args.queries))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "eventos.db")
+        create_empty_db(db_path)
+        fill_synthetic_db(db_path, args.events, args.clients)
+        conn = sqlite3.connect(db_path)
+
+        before = {
+            "intervalo de datas (mês)": time_queries(conn, RANGE_BEFORE_SQL, months),
+            "eventos de um cliente": time_queries(conn, CLIENT_SQL, client_ids),
+            "busca por numero_termo": time_queries(conn, TERMO_SQL, termos),
+        }
+        start = time.perf_counter()
+        with open(MIGRATION_FILE, 'r', encoding='utf-8') as f:
+            conn.executescript(f.read())
+        migration_seconds = time.perf_counter() - start
+        after = {
+            "intervalo de datas (mês)": time_queries(conn, RANGE_AFTER_SQL, months),
+            "eventos de um cliente": time_queries(conn, CLIENT_SQL, client_ids),
+            "busca por numero_termo": time_queries(conn, TERMO_SQL, termos),
+        }
+        conn.close()
+
+    print(f"--- {args.events} eventos, {args.clients} clientes; mediana de {args.queries} consultas ---")
+    print(f"Migração (índices + Eventos_Datas): {migration_seconds:.2f}s")
+    print(f"{'consulta':<28} {'antes (ms)':>11} {'depois (ms)':>12} {'ganho':>8}")
+    for label in before:
+        (old_ms, old_rows), (new_ms, new_rows) = before[label], after[label]
+        check = "" if old_rows == new_rows else f"  (linhas diferentes: {old_rows} x {new_rows})"
+        print(f"{label:<28} {old_ms:>11.2f} {new_ms:>12.3f} {old_ms / new_ms:>7.0f}x{check}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compara a importação em massa de `import_to_db.import_final_data` com a importação
+antiga, registro a registro (um SELECT por documento e um INSERT por linha).
+
+Os dois caminhos rodam sobre cópias vazias do esquema de `sistemacipt_teste.db`,
+com o mesmo arquivo sintético de registros (clientes repetidos em ~30% dos termos).
+
+Uso:
+    python benchmark_import.py                 # 100 mil registros
+    python benchmark_import.py --records 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import import_to_db
+from client_classifier import ClientClassifier
+from jsonl_io import JsonlWriter, iter_records
+
+SCHEMA_DB = "sistemacipt_teste.db"
+SCHEMA_TABLES = ("Clientes_Eventos", "Eventos", "permissionarios", "permissionario_cnpjs")
+
+
+def create_empty_db(path, schema_db=SCHEMA_DB):
+    """Novo banco só com as tabelas usadas pela importação, copiadas do banco de teste."""
+    source = sqlite3.connect(schema_db)
+    tables_sql = [
+        row[0] for row in source.execute(
+            f"SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(SCHEMA_TABLES))})",
+            SCHEMA_TABLES,
+        )
+    ]
+    indexes_sql = [
+        row[0] for row in source.execute(
+            f"SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            f"AND tbl_name IN ({', '.join('?' * len(SCHEMA_TABLES))})",
+            SCHEMA_TABLES,
+        )
+    ]
+    source.close()
+    conn = sqlite3.connect(path)
+    for sql in tables_sql + indexes_sql:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+
+
+def write_synthetic_records(path, count, seed=42):
+    random.seed(seed)
+    documents = [f"{random.randrange(10**13, 10**14)}" for _ in range(int(count * 0.7))]
+    with JsonlWriter(path, checkpoint_every=count + 1) as writer:
+        for i in range(count):
+            documento = random.choice(documents)
+            day = random.randrange(1, 28)
+            writer.write({
+                "cliente": {
+                    "nome_razao_social": f"EMPRESA {documento} LTDA",
+                    "documento": documento,
+                    "tipo_pessoa": "PJ",
+                    "nome_responsavel": None,
+                    "cep": "57000-000", "cidade": "Maceió", "uf": "AL",
+                },
+                "eventos": [{
+                    "numero_processo": f"E:30010.{i:010d}/2025",
+                    "numero_termo": f"{i}/2025",
+                    "nome_evento": f"Evento sintético {i}",
+                    "datas_evento": [f"2025-{random.randrange(1, 13):02d}-{day:02d}"],
+                    "hora_inicio": "08:00", "hora_fim": "18:00",
+                    "valor_final": round(random.uniform(0, 10000), 2),
+                    "espaco_utilizado": "Auditório",
+                }],
+                "arquivo_origem": f"sintetico_{i}.docx",
+                "id_arquivo_drive": f"sintetico-{i}",
+            })
+
+
+def legacy_import(db_path, source_file):
+    """
+    Caminho antigo de `import_final_data`: um SELECT por documento, um INSERT por
+    linha e as mensagens de progresso por registro (enviadas para /dev/null).
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    classifier = ClientClassifier.from_db(cursor)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # Mesmo esquema da importação em massa (as colunas de CLIENT_COLUMNS vêm das migrações)
+        import_to_db.ensure_schema(cursor)
+        for i, record in enumerate(iter_records(source_file)):
+            client_data = record.get('cliente')
+            print(f"\n[ Processando registro {i+1} ] Arquivo: {record.get('arquivo_origem')}")
+            if not client_data or not client_data.get('documento'):
+                continue
+            cursor.execute("SELECT id FROM Clientes_Eventos WHERE documento = ?", (client_data['documento'],))
+            existing_client = cursor.fetchone()
+            if existing_client:
+                client_id = existing_client[0]
+                print(f"    -> Cliente com documento '{client_data['documento']}' já existe (ID: {client_id}).")
+            else:
+                import_to_db.classify_client(client_data, classifier)
+                cursor.execute(import_to_db._insert_sql("Clientes_Eventos", import_to_db.CLIENT_COLUMNS[1:]),
+                               import_to_db.build_client_row(None, client_data)[1:])
+                client_id = cursor.lastrowid
+                print(f"    -> NOVO Cliente '{client_data.get('nome_razao_social')}' importado com ID: {client_id}.")
+            event_list = record.get('eventos') or []
+            for evento in event_list:
+                cursor.execute(import_to_db._insert_sql("Eventos", import_to_db.EVENT_DATA_COLUMNS),
+                               import_to_db.build_event_row(client_id, evento, client_data.get('tipo_cliente', 'Geral')))
+            print(f"    -> {len(event_list)} evento(s) associado(s) ao cliente ID {client_id} importado(s).")
+    conn.commit()
+    conn.close()
+
+
+def bulk_import(db_path, source_file):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_to_db.import_final_data(db_path=db_path, source_file=source_file, verbose=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da importação para o SQLite.")
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_file = os.path.join(tmp, "registros.jsonl")
+        write_synthetic_records(source_file, args.records)
+
+        timings = {}
+        for label, importer in (("registro a registro", legacy_import), ("em massa", bulk_import)):
+            db_path = os.path.join(tmp, f"{label.replace(' ', '_')}.db")
+            create_empty_db(db_path)
+            start = time.perf_counter()
+            importer(db_path, source_file)
+            timings[label] = time.perf_counter() - start
+            conn = sqlite3.connect(db_path)
+            clients = conn.execute("SELECT COUNT(*) FROM Clientes_Eventos").fetchone()[0]
+            events = conn.execute("SELECT COUNT(*) FROM Eventos").fetchone()[0]
+            conn.close()
+            print(f"{label:<20} {timings[label]:>8.2f}s  "
+                  f"({args.records / timings[label]:>9.0f} registros/s; {clients} clientes, {events} eventos)")
+
+    old, new = timings["registro a registro"], timings["em massa"]
+    print(f"\nImportação em massa: {old / new:.1f}x mais rápida em {args.records} registros.")
+
+
+if __name__ == "__main__":
+    main()
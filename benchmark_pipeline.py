@@ -0,0 +1,352 @@
+"""
+Benchmark de ponta a ponta do pipeline, sem rede: extração (process_documents),
+sanitização (sanitize_and_review), validação (validate_data) e importação (import_to_db).
+
+Drive, OpenAI e BrasilAPI são substituídos pelos simuladores de `fakes.py`, com
+latência e taxa de erro configuráveis. Os termos são gerados sob demanda a partir de
+um modelo igual ao dos termos reais (PF e PJ, clientes repetidos, gratuitos, nomes de
+evento sem aspas), de modo que cerca de 1 em cada 4 fica incerto para as regras e vai
+à IA. A "IA" simulada responde com a extração por regras do próprio prompt.
+
+Cada tamanho roda num processo separado, para que o pico de memória (RSS) de um não
+contamine o do outro. São relatados, por etapa, o tempo, a vazão (documentos/s) e o
+pico de RSS do processo ao fim da etapa, além dos p50/p95 de metrics.py.
+
+Uso:
+    python benchmark_pipeline.py                                  # 1.000 documentos
+    python benchmark_pipeline.py --sizes 1000,10000,100000 --saida base.json
+    python benchmark_pipeline.py --sizes 1000 --comparar base.json  # código 1 se a vazão cair mais de 20%
+    python benchmark_pipeline.py --llm-latency 0.5 --drive-latency 0.05 --api-errors 0.01
+
+Erros da OpenAI simulados passam pelas novas tentativas de `extract_data_with_openai`
+(com as esperas reais entre elas).
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_DB = os.path.join(REPO_DIR, "sistemacipt_teste.db")
+DEFAULT_SIZES = "1000"
+COMPANY_POOL = 500
+PERSON_POOL = 2000
+MONTHS = ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto",
+          "setembro", "outubro", "novembro", "dezembro")
+SPACES = ("AUDITÓRIO", "AUDITÓRIO e ESPAÇO ABERTO EM FRENTE AO AUDITÓRIO", "SALA DE REUNIÕES", "ESPAÇO ABERTO")
+EVENTS = ("Formatura", "Seminário de Inovação", "Colação de Grau", "Workshop de Tecnologia", "Festival Cultural",
+          "Encontro de Startups", "Palestra", "Espetáculo Natalino")
+BOILERPLATE = (
+    "CLÁUSULA QUARTA – DAS OBRIGAÇÕES DO PERMITENTE",
+    "4.1 - Ceder o espaço, na data e hora acordadas, entregando o local em perfeitas condições de higiene, "
+    "limpeza e conservação.",
+    "4.2 - Fiscalizar, por meio do gestor indicado pela SECTI, a utilização do espaço objeto deste termo de "
+    "permissão, podendo impedir a utilização inadequada do espaço cedido.",
+    "CLÁUSULA QUINTA – DAS OBRIGAÇÕES DA PERMISSIONÁRIA",
+    "5.1 - Utilizar o espaço destinado no imóvel em questão para o fim específico do evento descrito na "
+    "cláusula primeira.",
+    "5.2 - Conservar o imóvel como se lhe pertencesse, fazendo com que seu uso e gozo sejam pacíficos e harmônicos.",
+    "5.3 - A montagem e desmontagem de materiais e equipamentos do(a) PERMISSIONÁRIO(A) ou de terceiros, dentro "
+    "do período de vigência, conforme reserva.",
+    "5.4 - A indenização pelos danos causados que, por si, seus empregados, prepostos e participantes do evento "
+    "causarem ao mobiliário, equipamentos e acessórios das áreas locadas.",
+    "CLÁUSULA SEXTA – DAS PENALIDADES",
+    "6.1 - O descumprimento de qualquer cláusula deste termo sujeita o(a) PERMISSIONÁRIO(A) às penalidades "
+    "previstas na legislação vigente.",
+    "CLÁUSULA SÉTIMA – DO FORO",
+    "7.1 - Fica eleito o foro da Comarca de Maceió/AL para dirimir quaisquer questões oriundas deste termo.",
+)
+
+
+# --- Termos sintéticos ----------------------------------------------------------
+
+def _check_digit(digits, weights):
+    remainder = sum(int(digit) * weight for digit, weight in zip(digits, weights)) % 11
+    return "0" if remainder < 2 else str(11 - remainder)
+
+
+def make_cnpj(number):
+    base = f"{number % 10**8:08d}0001"
+    weights = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+    base += _check_digit(base, weights)
+    return base + _check_digit(base, (6,) + weights)
+
+
+def make_cpf(number):
+    base = f"{number % 10**9:09d}"
+    base += _check_digit(base, range(10, 1, -1))
+    return base + _check_digit(base, range(11, 1, -1))
+
+
+def format_cnpj(cnpj):
+    return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
+
+def format_cpf(cpf):
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+
+def format_brl(value):
+    return f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def company(index):
+    """Empresa `index` do conjunto fixo de clientes PJ (mesmos dados no termo e na BrasilAPI)."""
+    return {
+        "cnpj": make_cnpj(10_000_000 + index * 7919),
+        "razao_social": f"EMPRESA SINTÉTICA {index} LTDA",
+        "socio": f"SÓCIO RESPONSÁVEL {index} DA SILVA",
+    }
+
+
+def synthetic_termo(index):
+    """Parágrafos de um Termo de Permissão de Uso no formato dos reais (determinístico por `index`)."""
+    rng = random.Random(index)
+    year = rng.choice((2024, 2025))
+    day, month = rng.randrange(1, 28), rng.randrange(12)
+    value = 0 if rng.random() < 0.1 else rng.choice((1200, 2495, 4990, 7485))
+    event = f"{rng.choice(EVENTS)} {index}"
+    if rng.random() < 0.7:
+        client = company(rng.randrange(COMPANY_POOL))
+        name = client["razao_social"]
+        # Alguns termos trazem também o CPF do sócio, o que deixa o tipo de pessoa ambíguo para as regras
+        socio_document = (f"inscrito no CPF sob o nº {format_cpf(make_cpf(index + 7))}" if rng.random() < 0.15
+                          else "brasileiro, empresário")
+        qualification = (f"{name}, inscrita no CNPJ/MF sob o nº {format_cnpj(client['cnpj'])} e estabelecida na "
+                         f"Rua Sintética, nº {rng.randrange(1, 999)}, Maceió - AL, representada por seu sócio, "
+                         f"Sr. {client['socio']}, {socio_document}.")
+    else:
+        person = rng.randrange(PERSON_POOL)
+        name = f"PESSOA SINTÉTICA {person} SANTOS"
+        qualification = (f"{name}, inscrito(a) no CPF/MF sob o nº {format_cpf(make_cpf(10**8 + person * 131))} "
+                         f"e estabelecido(a) na Rua Sintética, número {rng.randrange(1, 999)}, CEP 57055-670.")
+    # ~10% sem aspas no nome do evento: a extração por regras fica incerta e o termo vai para a IA
+    quoted_event = f"“{event}”" if rng.random() >= 0.1 else event
+    payment = (f"3.1 - O(A) PERMISSIONÁRIO(A) pagará pela utilização do espaço o valor total de R$ "
+               f"{format_brl(value)} através de Documento de Arrecadação – DAR." if value
+               else "3.1 - A utilização do espaço é gratuita, sem ônus para o(a) PERMISSIONÁRIO(A).")
+    return [
+        "TERMO DE PERMISSÃO DE USO QUE CELEBRAM ENTRE SI DE UM LADO A SECRETARIA DE ESTADO DA CIÊNCIA, DA "
+        f"TECNOLOGIA E DA INOVAÇÃO DE ALAGOAS - SECTI E DO OUTRO {name}.",
+        f"Processo n°: E:30010.{index:010d}/{year}",
+        f"Termo n°: {index + 1}/{year}",
+        "PERMITENTE: A SECRETARIA DE ESTADO DA CIÊNCIA, DA TECNOLOGIA E DA INOVAÇÃO DE ALAGOAS, inscrita no "
+        "CNPJ/MF sob o nº 04.007.216/0001-30.",
+        f"PERMISSIONÁRIO(A): {qualification}",
+        "CLÁUSULA PRIMEIRA: DO OBJETO",
+        f"1.1 - O presente instrumento tem como objeto o uso pelo(a) PERMISSIONÁRIO(A) de área do "
+        f"{rng.choice(SPACES)} do imóvel denominado CENTRO DE INOVAÇÃO DO JARAGUÁ, para realização do evento "
+        f"{quoted_event}, a ser realizado no dia {day:02d} de {MONTHS[month]} de {year}, das 08h às 18h.",
+        "CLÁUSULA SEGUNDA – DA VIGÊNCIA",
+        f"2.1 - O prazo de vigência se inicia na data de assinatura do presente termo até {day + 1:02d}/"
+        f"{month + 1:02d}/{year}, às 12h.",
+        "CLÁUSULA TERCEIRA – DO PAGAMENTO",
+        payment,
+        *BOILERPLATE,
+    ]
+
+
+def brasilapi_companies():
+    return {
+        data["cnpj"]: {"razao_social": data["razao_social"], "cep": "57022140", "logradouro": "RUA SINTÉTICA",
+                       "numero": "100", "complemento": "", "bairro": "JARAGUÁ", "municipio": "MACEIÓ", "uf": "AL",
+                       "qsa": [{"nome_socio": data["socio"]}]}
+        for data in map(company, range(COMPANY_POOL))
+    }
+
+
+# --- Execução de um tamanho -------------------------------------------------------
+
+def peak_rss_mb():
+    """Pico de memória residente do processo até agora (ru_maxrss é em KB no Linux, bytes no macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+MULTI_DOC_SECTION_RE = re.compile(r"Documento (\d+) \(nome do arquivo: [^\n]*\):\n\s*---\n(.*?)\n\s*---\n", re.DOTALL)
+
+
+def llm_responder(messages):
+    from llm_batching import BATCH_KEY, INDEX_KEY
+    from rule_extractor import extract_with_rules
+    prompt = messages[-1]["content"]
+    sections = MULTI_DOC_SECTION_RE.findall(prompt)
+    if not sections:
+        data, _ = extract_with_rules(prompt)
+        return data
+    # Prompt com vários termos (--multi-doc): um item por documento
+    return {BATCH_KEY: [dict(extract_with_rules(text)[0], **{INDEX_KEY: int(number)}) for number, text in sections]}
+
+
+def run_size(count, args):
+    """Roda as quatro etapas sobre `count` termos sintéticos num diretório temporário."""
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, REPO_DIR)
+    import import_to_db
+    import process_documents
+    import sanitize_and_review
+    import validate_data
+    from benchmark_import import create_empty_db
+    from cnpj_enrichment import CNPJCache, CNPJEnricher, TokenBucket
+    from fakes import FakeBrasilAPIServer, FakeDriveService, FakeOpenAIClient, SyntheticDocuments
+    from metrics import metrics
+
+    documents = SyntheticDocuments(count, synthetic_termo)
+    drive = FakeDriveService(documents, folders={"pagos": ("Termos Pagos", list(documents)), "gratuitos": ("Termos Gratuitos", [])},
+                             list_latency=args.drive_latency, download_latency=args.drive_latency,
+                             download_error_rate=args.drive_errors)
+    llm = FakeOpenAIClient(llm_responder, latency=args.llm_latency, error_rate=args.llm_errors)
+    process_documents.get_drive_service = lambda: drive
+    process_documents.client = llm
+    process_documents.FOLDER_ID_PAGOS, process_documents.FOLDER_ID_GRATUITOS = "pagos", "gratuitos"
+    process_documents.USE_MULTI_DOC = args.multi_doc
+
+    stages = []
+    with tempfile.TemporaryDirectory() as tmp, \
+         FakeBrasilAPIServer(brasilapi_companies(), latency=args.api_latency, error_rate=args.api_errors) as api:
+        os.chdir(tmp)
+        db_path = os.path.join(tmp, "benchmark.db")
+        create_empty_db(db_path, schema_db=SCHEMA_DB)
+        # Sem a cota da API real (3/min), que tornaria o benchmark uma medida de espera
+        enricher = CNPJEnricher(base_url=api.base_url, limiter=TokenBucket(rate_per_minute=10**9, capacity=10**6),
+                                cache=CNPJCache(os.path.join(tmp, "cache_cnpj.db")))
+
+        steps = (
+            ("extracao", lambda: process_documents.main(args.download_workers, args.llm_workers)),
+            ("sanitizacao", lambda: sanitize_and_review.sanitize_and_review_data(enricher=enricher)),
+            ("validacao", lambda: validate_data.validate_data(sanitize_and_review.OUTPUT_FILE, "validacao.json")),
+            ("importacao", lambda: import_to_db.import_final_data(db_path=db_path,
+                                                                  source_file=sanitize_and_review.OUTPUT_FILE,
+                                                                  verbose=False)),
+        )
+        with open(os.devnull, "w") as devnull:
+            for name, step in steps:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(devnull):
+                    step()
+                elapsed = time.perf_counter() - start
+                stages.append({"etapa": name, "segundos": round(elapsed, 3),
+                               "documentos_por_s": round(count / elapsed, 1), "pico_rss_mb": round(peak_rss_mb(), 1)})
+
+        conn = sqlite3.connect(db_path)
+        events = conn.execute("SELECT COUNT(*) FROM Eventos").fetchone()[0]
+        conn.close()
+        with open(process_documents.OUTPUT_FILE, encoding="utf-8") as f:
+            extracted = sum(1 for _ in f)
+        os.chdir(REPO_DIR)
+
+    total = sum(stage["segundos"] for stage in stages)
+    return {
+        "documentos": count,
+        "registros_extraidos": extracted,
+        "eventos_importados": events,
+        "chamadas_ia": llm.calls,
+        "consultas_brasilapi": sum(api.requests.values()),
+        "segundos": round(total, 3),
+        "documentos_por_s": round(count / total, 1),
+        "etapas": stages,
+        "metricas": metrics.summary()["etapas"],
+    }
+
+
+# --- Relatório e comparação ---------------------------------------------------------
+
+def run_in_subprocess(count, argv):
+    command = [sys.executable, os.path.abspath(__file__), "--run-one", str(count)] + argv
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_result(result):
+    print(f"\n--- {result['documentos']} documentos: {result['segundos']:.1f}s "
+          f"({result['documentos_por_s']:.0f} documentos/s) ---")
+    print(f"registros extraídos: {result['registros_extraidos']} | chamadas à IA: {result['chamadas_ia']} | "
+          f"consultas à BrasilAPI: {result['consultas_brasilapi']} | eventos importados: {result['eventos_importados']}")
+    print(f"{'etapa':<12} {'tempo (s)':>10} {'docs/s':>10} {'pico RSS (MB)':>14}")
+    for stage in result["etapas"]:
+        print(f"{stage['etapa']:<12} {stage['segundos']:>10.2f} {stage['documentos_por_s']:>10.0f} "
+              f"{stage['pico_rss_mb']:>14.1f}")
+    print(f"{'medida':<22} {'n':>8} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name, stats in result["metricas"].items():
+        print(f"{name:<22} {stats['n']:>8} {stats['p50_s'] * 1000:>10.2f} {stats['p95_s'] * 1000:>10.2f}")
+
+
+def find_regressions(results, baseline, tolerance):
+    """Etapas cuja vazão caiu mais do que `tolerance` (fração) em relação à base, por tamanho."""
+    base_by_size = {result["documentos"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        base = base_by_size.get(result["documentos"])
+        if not base:
+            continue
+        base_stages = {stage["etapa"]: stage for stage in base["etapas"]}
+        for stage in result["etapas"]:
+            old = base_stages.get(stage["etapa"])
+            if old and stage["documentos_por_s"] < old["documentos_por_s"] * (1 - tolerance):
+                regressions.append(f"{result['documentos']} documentos, {stage['etapa']}: "
+                                   f"{old['documentos_por_s']:.0f} -> {stage['documentos_por_s']:.0f} documentos/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline com serviços simulados.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Quantidades de termos, separadas por vírgula.")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--drive-latency", type=float, default=0.0, help="Segundos por página/download do Drive.")
+    parser.add_argument("--drive-errors", type=float, default=0.0, help="Fração de downloads com erro 500.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Segundos por chamada à OpenAI.")
+    parser.add_argument("--llm-errors", type=float, default=0.0, help="Fração de chamadas à OpenAI com erro.")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Segundos por consulta à BrasilAPI.")
+    parser.add_argument("--api-errors", type=float, default=0.0, help="Fração de consultas à BrasilAPI com erro 500.")
+    parser.add_argument("--multi-doc", action="store_true", help="Vários termos por chamada à OpenAI.")
+    parser.add_argument("--saida", help="Salva os resultados em JSON (base para --comparar).")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; termina com código 1 se houver regressão.")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Queda de vazão aceita em relação à base (padrão: 0.2 = 20%%).")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_size(args.run_one, args)))
+        return
+
+    passthrough = []
+    for option in ("download_workers", "llm_workers", "drive_latency", "drive_errors", "llm_latency", "llm_errors",
+                   "api_latency", "api_errors"):
+        passthrough += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    if args.multi_doc:
+        passthrough.append("--multi-doc")
+
+    results = []
+    for count in (int(size) for size in args.sizes.split(",")):
+        print(f"Rodando o pipeline com {count} termos sintéticos...", flush=True)
+        result = run_in_subprocess(count, passthrough)
+        print_result(result)
+        results.append(result)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em '{args.saida}'.")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerancia)
+        if regressions:
+            print(f"\nREGRESSÃO de desempenho (queda acima de {args.tolerancia:.0%}):")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print(f"\nSem regressões em relação a '{args.comparar}'.")
+
+
+if __name__ == "__main__":
+    main()
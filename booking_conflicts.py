@@ -0,0 +1,277 @@
+"""
+Conflitos de reserva: termos que ocupam o mesmo espaço em horários sobrepostos.
+
+O `espaco_utilizado` dos termos é texto livre ("Auditório e Espaço Aberto em frente ao
+Auditório do Centro de Inovação do Jaraguá", "AUDITÓRIO, ESPAÇO ABERTO, ANFITEATRO...").
+`normalize_spaces` o reduz ao conjunto de espaços reservados ({"auditorio",
+"espaco aberto"}, ...); um termo que reserva vários espaços conflita com qualquer outro
+que ocupe algum deles.
+
+Cada data do evento vira um intervalo [início, fim) em minutos absolutos (dia * 1440 +
+minutos do dia); sem horário, o dia inteiro. `BookingIndex` guarda, por espaço, os
+intervalos ordenados pelo início. Como nenhum intervalo passa de um dia, os que cruzam
+[a, b) começam entre a - 1440 e b: duas buscas binárias delimitam os candidatos, e
+consultar uma reserva custa O(log n + k), k = reservas encontradas, no lugar de comparar
+cada evento com todos os outros. Incluir conferindo os conflitos mantém a lista ordenada
+com `list.insert`, O(n) no pior caso (um deslocamento de memória, barato na prática);
+as inclusões sem conferência (`check=False`) só anexam, e a lista é ordenada uma única
+vez, O(n log n), na consulta seguinte.
+
+    index = BookingIndex()
+    conflicts = index.add(event_id, "Auditório ...", ["2025-10-10"], "13h", "23h")
+    index.is_free("Auditório", "2025-10-10", "18h", "22h")
+
+Uso (conflitos já gravados no banco, ou se um espaço está livre):
+    python booking_conflicts.py
+    python booking_conflicts.py --db sistemacipt.db --livre Auditório 2025-10-10 18h 22h
+"""
+import argparse
+import bisect
+import json
+import re
+import sqlite3
+from datetime import date
+
+from near_duplicates import strip_accents
+
+MINUTES_PER_DAY = 24 * 60
+# Eventos cancelados não ocupam o espaço
+IGNORED_STATUS = ("Cancelado",)
+# Conflitos impressos no relatório da importação (os demais só são contados)
+REPORT_LIMIT = 50
+
+# (padrão no texto normalizado, nome do espaço)
+SPACE_PATTERNS = (
+    (re.compile(r"\bauditorio\b"), "auditorio"),
+    (re.compile(r"\bespaco aberto\b"), "espaco aberto"),
+    (re.compile(r"\banfiteatro\b"), "anfiteatro"),
+    (re.compile(r"\bcoworking\b"), "coworking"),
+    (re.compile(r"\bsala de reun[a-z]*\b"), "sala de reuniao"),
+    (re.compile(r"\blaboratorio\b"), "laboratorio"),
+    (re.compile(r"\bterreo\b"), "terreo"),
+    (re.compile(r"\bcorredor\b"), "corredor"),
+)
+# "Espaço Aberto em frente ao Auditório": o auditório aí só localiza o espaço aberto
+_LANDMARK_RE = re.compile(r"\bem frente\s+(?:\w{1,3}\s+)?auditorio\b")
+_SEPARATORS_RE = re.compile(r"[^a-z0-9]+")
+_TIME_RE = re.compile(r"^\s*(\d{1,2})\s*(?:[h:]\s*(\d{2})?)?\s*(?:h|min)?\s*$", re.IGNORECASE)
+
+EVENTS_SQL = ("SELECT id, numero_termo, nome_evento, espaco_utilizado, datas_evento, hora_inicio, hora_fim "
+              "FROM Eventos WHERE espaco_utilizado IS NOT NULL "
+              f"AND status NOT IN ({', '.join('?' * len(IGNORED_STATUS))})")
+
+
+def normalize_spaces(text):
+    """Conjunto (frozenset) de espaços citados em `espaco_utilizado`; o texto normalizado se nenhum for reconhecido."""
+    if not text or not isinstance(text, str):
+        return frozenset()
+    normalized = _SEPARATORS_RE.sub(" ", strip_accents(text).lower()).strip()
+    without_landmarks = _LANDMARK_RE.sub(" ", normalized)
+    spaces = {name for pattern, name in SPACE_PATTERNS if pattern.search(without_landmarks)}
+    if not spaces and normalized:
+        spaces.add(normalized)
+    return frozenset(spaces)
+
+
+def parse_time(value):
+    """'08h', '15h30', '08:00', '8' -> minutos desde a meia-noite (None se não reconhecer)."""
+    match = _TIME_RE.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+    if hours > 24 or minutes > 59 or hours * 60 + minutes > MINUTES_PER_DAY:
+        return None
+    return hours * 60 + minutes
+
+
+def day_interval(day, hora_inicio=None, hora_fim=None):
+    """
+    Intervalo [início, fim) em minutos absolutos de uma data 'YYYY-MM-DD', ou None se
+    a data for inválida. Sem início, vale desde a meia-noite; sem fim (ou com fim
+    antes do início, como em "22h às 02h"), até o fim do dia.
+    """
+    try:
+        offset = date.fromisoformat(day).toordinal() * MINUTES_PER_DAY
+    except (TypeError, ValueError):
+        return None
+    start = parse_time(hora_inicio)
+    end = parse_time(hora_fim)
+    start = 0 if start is None else start
+    if end is None or end <= start:
+        end = MINUTES_PER_DAY
+    return offset + start, offset + end
+
+
+def format_interval(start, end):
+    """(início, fim) em minutos absolutos -> 'YYYY-MM-DD HH:MM-HH:MM'."""
+    day = date.fromordinal(start // MINUTES_PER_DAY)
+    start_minutes, end_minutes = start % MINUTES_PER_DAY, end - (start - start % MINUTES_PER_DAY)
+    return (f"{day.isoformat()} {start_minutes // 60:02d}:{start_minutes % 60:02d}"
+            f"-{end_minutes // 60:02d}:{end_minutes % 60:02d}")
+
+
+class BookingIndex:
+    """Reservas por espaço, ordenadas pelo início, para achar sobreposições com buscas binárias."""
+
+    def __init__(self):
+        self._starts = {}  # espaço -> inícios, em ordem
+        self._entries = {}  # espaço -> [(início, fim, chave), ...] na mesma ordem
+        self._spaces = {}  # texto de espaco_utilizado -> espaços (os textos se repetem muito)
+        self._unsorted = set()  # espaços com reservas anexadas por add(check=False), ainda fora de ordem
+        self.bookings = 0
+
+    def spaces(self, espaco_utilizado):
+        """`normalize_spaces` de `espaco_utilizado`, calculado uma vez por texto."""
+        if espaco_utilizado not in self._spaces:
+            self._spaces[espaco_utilizado] = normalize_spaces(espaco_utilizado)
+        return self._spaces[espaco_utilizado]
+
+    def _sort(self, space):
+        if space in self._unsorted:
+            self._unsorted.discard(space)
+            # Estável: empates no início ficam na ordem de inclusão, como com bisect_right
+            self._entries[space].sort(key=lambda entry: entry[0])
+            self._starts[space] = [entry[0] for entry in self._entries[space]]
+
+    def _overlapping(self, space, start, end):
+        self._sort(space)
+        starts = self._starts.get(space)
+        if not starts:
+            return []
+        first = bisect.bisect_right(starts, start - MINUTES_PER_DAY)
+        last = bisect.bisect_left(starts, end)
+        return [entry for entry in self._entries[space][first:last] if entry[1] > start]
+
+    def overlaps(self, espaco_utilizado, day, hora_inicio=None, hora_fim=None):
+        """Reservas [(espaço, início, fim, chave), ...] que cruzam o horário pedido em algum dos espaços."""
+        interval = day_interval(day, hora_inicio, hora_fim)
+        if interval is None:
+            return []
+        return [(space,) + entry for space in sorted(self.spaces(espaco_utilizado))
+                for entry in self._overlapping(space, *interval)]
+
+    def is_free(self, espaco_utilizado, day, hora_inicio=None, hora_fim=None):
+        """True se nenhum dos espaços tem reserva no horário pedido."""
+        return not self.overlaps(espaco_utilizado, day, hora_inicio, hora_fim)
+
+    def add(self, key, espaco_utilizado, dates, hora_inicio=None, hora_fim=None, check=True):
+        """
+        Inclui a reserva `key` (uma entrada por espaço e data) e retorna os conflitos com
+        as já incluídas: [(chave, espaço, (início, fim) novo, (início, fim) existente), ...].
+        Com `check=False`, só inclui (retorna []): a reserva é anexada e ordenada junto
+        com as demais na próxima consulta, o que torna a carga de muitas reservas O(n log n).
+        """
+        spaces = self.spaces(espaco_utilizado)
+        intervals = sorted({interval for interval in (day_interval(day, hora_inicio, hora_fim)
+                                                      for day in dates or []) if interval})
+        conflicts = []
+        for space in sorted(spaces):
+            if not check:
+                self._starts.setdefault(space, []).extend(start for start, _ in intervals)
+                self._entries.setdefault(space, []).extend((start, end, key) for start, end in intervals)
+                if intervals:
+                    self._unsorted.add(space)
+                continue
+            self._sort(space)
+            starts = self._starts.setdefault(space, [])
+            entries = self._entries.setdefault(space, [])
+            for start, end in intervals:
+                for other_start, other_end, other_key in self._overlapping(space, start, end):
+                    if other_key != key:
+                        conflicts.append((other_key, space, (start, end), (other_start, other_end)))
+                position = bisect.bisect_right(starts, start)
+                starts.insert(position, start)
+                entries.insert(position, (start, end, key))
+        if spaces and intervals:
+            self.bookings += 1
+        return conflicts
+
+
+def find_conflicts(cursor, event_ids=None):
+    """
+    Conflitos entre os eventos da tabela Eventos (exceto os cancelados), um por par de
+    eventos: os dois eventos, os espaços em comum e o primeiro horário em que se sobrepõem
+    (intervalos em minutos absolutos; ver `format_interval`).
+
+    Com `event_ids`, só os conflitos de algum desses eventos: os demais entram no índice
+    sem ser conferidos entre si, e cada evento pedido é conferido contra todos.
+    """
+    index = BookingIndex()
+    events = {}
+    conflicts = {}
+    checked = []
+
+    def _add(event_id, espaco, dates, hora_inicio, hora_fim):
+        for other_id, space, interval, other_interval in index.add(event_id, espaco, dates, hora_inicio, hora_fim):
+            conflict = conflicts.get((other_id, event_id))
+            if conflict is None:
+                conflict = conflicts[(other_id, event_id)] = {
+                    "evento": events[other_id], "outro_evento": events[event_id], "espacos": [],
+                    "horario": other_interval, "outro_horario": interval}
+            if space not in conflict["espacos"]:
+                conflict["espacos"].append(space)
+
+    for event_id, termo, nome, espaco, datas, hora_inicio, hora_fim in cursor.execute(EVENTS_SQL, IGNORED_STATUS):
+        try:
+            dates = json.loads(datas) if datas else []
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(dates, list):
+            continue
+        events[event_id] = {"id": event_id, "numero_termo": termo, "nome_evento": nome}
+        if event_ids is None:
+            _add(event_id, espaco, dates, hora_inicio, hora_fim)
+        elif event_id in event_ids:
+            checked.append((event_id, espaco, dates, hora_inicio, hora_fim))
+        else:
+            index.add(event_id, espaco, dates, hora_inicio, hora_fim, check=False)
+    for booking in checked:
+        _add(*booking)
+    return list(conflicts.values())
+
+
+def print_conflicts(conflicts, limit=REPORT_LIMIT):
+    """Imprime os conflitos (no máximo `limit`; None para todos) no formato do relatório da importação."""
+    for conflict in conflicts[:limit]:
+        event, other = conflict["evento"], conflict["outro_evento"]
+        print(f"- {', '.join(conflict['espacos'])}: termo {event['numero_termo']} (evento {event['id']}, "
+              f"{format_interval(*conflict['horario'])}) x termo {other['numero_termo']} "
+              f"(evento {other['id']}, {format_interval(*conflict['outro_horario'])})")
+    if limit is not None and len(conflicts) > limit:
+        print(f"... e mais {len(conflicts) - limit}.")
+
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py conflicts`)."""
+    parser.add_argument("--db", default="sistemacipt_teste.db", help="Banco com a tabela Eventos.")
+    parser.add_argument("--livre", nargs=4, metavar=("ESPACO", "DATA", "INICIO", "FIM"),
+                        help="Só verifica se o espaço está livre na data (YYYY-MM-DD) e horário.")
+
+
+def run_cli(args):
+    conn = sqlite3.connect(args.db)
+    if args.livre:
+        espaco, day, hora_inicio, hora_fim = args.livre
+        index = BookingIndex()
+        for event_id, termo, _, espaco_evento, datas, inicio, fim in conn.execute(EVENTS_SQL, IGNORED_STATUS):
+            try:
+                index.add((event_id, termo), espaco_evento, json.loads(datas or "[]"), inicio, fim, check=False)
+            except (json.JSONDecodeError, TypeError):
+                continue
+        conn.close()
+        overlaps = index.overlaps(espaco, day, hora_inicio, hora_fim)
+        if not overlaps:
+            print(f"'{espaco}' está livre em {day}, das {hora_inicio} às {hora_fim}.")
+        for space, start, end, (event_id, termo) in overlaps:
+            print(f"Ocupado: {space} em {format_interval(start, end)} (termo {termo}, evento {event_id}).")
+        return
+    conflicts = find_conflicts(conn.cursor())
+    conn.close()
+    print(f"{len(conflicts)} conflito(s) de reserva em '{args.db}'.")
+    print_conflicts(conflicts, limit=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reservas sobrepostas do mesmo espaço na tabela Eventos.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
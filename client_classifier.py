@@ -0,0 +1,59 @@
+"""
+Classificação dos clientes importados em "Permissionario", "Governo" ou "Geral".
+
+Os CNPJs de permissionários vêm do próprio banco (tabela `permissionario_cnpjs` e o
+CNPJ cadastrado em `permissionarios`), carregados uma vez num conjunto; os nomes de
+órgãos de governo são reconhecidos por uma única expressão regular sobre o nome sem
+acentos e em maiúsculas. O resultado fica guardado por documento.
+"""
+import re
+import unicodedata
+
+KEYWORDS_GOVERNO = ["UNIVERSIDADE FEDERAL", "UFAL", "IFAL", "SECRETARIA DE ESTADO", "SESAU", "SENAI", "SEBRAE", "SENAC", "SESI", "FEPESA", "FUNDEPES", "OAB", "CRA/AL", "ASSEMBLEIA LEGISLATIVA"]
+
+
+def fold(text):
+    """Texto em maiúsculas e sem acentos ("Assembléia" -> "ASSEMBLEIA")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).upper()
+
+
+def only_digits(value):
+    return "".join(filter(str.isdigit, value or ""))
+
+
+def load_permissionario_cnpjs(cursor):
+    """CNPJs (só dígitos) de todos os permissionários cadastrados no banco."""
+    cnpjs = {row[0] for row in cursor.execute("SELECT cnpj_norm FROM permissionario_cnpjs")}
+    cnpjs.update(only_digits(row[0]) for row in cursor.execute("SELECT cnpj FROM permissionarios"))
+    cnpjs.discard("")
+    return cnpjs
+
+
+class ClientClassifier:
+    """Classifica clientes por documento e nome; cada documento é classificado uma única vez."""
+
+    def __init__(self, permissionario_cnpjs, keywords_governo=KEYWORDS_GOVERNO):
+        self.permissionario_cnpjs = set(permissionario_cnpjs)
+        # Uma alternância só, das palavras mais longas para as mais curtas
+        alternatives = sorted({fold(keyword) for keyword in keywords_governo}, key=len, reverse=True)
+        self.governo_re = re.compile("|".join(map(re.escape, alternatives)))
+        self._by_document = {}
+
+    @classmethod
+    def from_db(cls, cursor, keywords_governo=KEYWORDS_GOVERNO):
+        return cls(load_permissionario_cnpjs(cursor), keywords_governo)
+
+    def classify(self, documento, nome):
+        """Retorna 'Permissionario', 'Governo' ou 'Geral'."""
+        key = only_digits(documento)
+        tipo_cliente = self._by_document.get(key)
+        if tipo_cliente is None:
+            if key in self.permissionario_cnpjs:
+                tipo_cliente = "Permissionario"
+            elif self.governo_re.search(fold(nome)):
+                tipo_cliente = "Governo"
+            else:
+                tipo_cliente = "Geral"
+            self._by_document[key] = tipo_cliente
+        return tipo_cliente
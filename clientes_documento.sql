@@ -0,0 +1,13 @@
+-- Documento normalizado (só dígitos) dos clientes, com índice único: "04.007.216/0001-30"
+-- e "04007216000130" passam a ser o mesmo cliente. Aplicada automaticamente pelo
+-- import_to_db.py quando a coluna ainda não existe.
+--
+-- A coluna é preenchida e mantida pelo import_to_db.py (`sync_document_norm`), com a
+-- mesma normalização do Python (`entity_resolution.normalize_document`): o sistema web
+-- não a preenche, e um gatilho que a recalculasse faria falhar, pelo índice único, as
+-- escritas do sistema em clientes cadastrados em duplicidade.
+
+ALTER TABLE Clientes_Eventos ADD COLUMN documento_norm TEXT;
+
+-- NULL não entra na restrição
+CREATE UNIQUE INDEX IF NOT EXISTS ux_clientes_documento_norm ON Clientes_Eventos(documento_norm);
@@ -0,0 +1,191 @@
+"""
+Consulta de CNPJs na BrasilAPI com limite de taxa, cache em disco e consultas concorrentes.
+
+- `TokenBucket` espaça as requisições de acordo com a cota real da API (por padrão
+  3 por minuto, com rajada de 3) em vez de uma pausa fixa antes de cada chamada.
+- `CNPJCache` guarda as respostas em SQLite com validade (TTL); um CNPJ já consultado
+  não volta à API enquanto a entrada for válida. CNPJs inexistentes (404) também são
+  guardados, para não serem consultados de novo a cada execução.
+- `CNPJEnricher.lookup_many` consulta cada CNPJ distinto uma única vez, com várias
+  threads compartilhando uma `requests.Session` (conexões reaproveitadas).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+from resilience import retry_after_from_headers
+
+BRASILAPI_URL = os.getenv("BRASILAPI_URL", "https://brasilapi.com.br/api/cnpj/v1")
+REQUESTS_PER_MINUTE = float(os.getenv("BRASILAPI_REQUESTS_PER_MINUTE", "3"))
+BURST = int(os.getenv("BRASILAPI_BURST", "3"))
+LOOKUP_WORKERS = int(os.getenv("BRASILAPI_WORKERS", "4"))
+CACHE_PATH = os.getenv("CNPJ_CACHE_PATH", "cache_cnpj.db")
+CACHE_TTL_DAYS = float(os.getenv("CNPJ_CACHE_TTL_DAYS", "30"))
+REQUEST_TIMEOUT = 30
+MAX_ATTEMPTS = 3
+
+
+def clean_cnpj(cnpj):
+    """Apenas os dígitos do CNPJ, ou None se não tiver 14 dígitos."""
+    if not cnpj or not isinstance(cnpj, str):
+        return None
+    cleaned = "".join(filter(str.isdigit, cnpj))
+    return cleaned if len(cleaned) == 14 else None
+
+
+class TokenBucket:
+    """
+    Limitador de taxa: `capacity` fichas, repostas à razão de `rate_per_minute`.
+    `acquire()` bloqueia até haver uma ficha; é seguro para várias threads.
+    """
+
+    def __init__(self, rate_per_minute=REQUESTS_PER_MINUTE, capacity=BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def pause(self, seconds):
+        """Segura novas requisições por `seconds` (ex.: a API respondeu 429 com Retry-After)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Várias threads podem receber o mesmo 429: a pausa não se acumula
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class CNPJCache:
+    """Respostas da BrasilAPI por CNPJ, em SQLite, com validade de `ttl_days` (0 = sem validade)."""
+
+    def __init__(self, path=CACHE_PATH, ttl_days=CACHE_TTL_DAYS):
+        self.path = path
+        self.ttl_days = ttl_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cnpjs (
+                cnpj TEXT PRIMARY KEY,
+                resposta TEXT,
+                consultado_em REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, cnpj):
+        """Retorna (encontrado, dados): dados é None para CNPJs que a API não conhece."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resposta, consultado_em FROM cnpjs WHERE cnpj = ?", (cnpj,)
+            ).fetchone()
+        if not row or (self.ttl_days and time.time() - row[1] > self.ttl_days * 86400):
+            return False, None
+        return True, (json.loads(row[0]) if row[0] is not None else None)
+
+    def set(self, cnpj, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cnpjs (cnpj, resposta, consultado_em) VALUES (?, ?, ?)",
+                (cnpj, json.dumps(data, ensure_ascii=False) if data is not None else None, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CNPJEnricher:
+    """Consulta CNPJs na BrasilAPI respeitando a cota, com cache e sessão HTTP compartilhada."""
+
+    def __init__(self, base_url=BRASILAPI_URL, limiter=None, cache=None, workers=LOOKUP_WORKERS, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter or TokenBucket()
+        self.cache = cache
+        self.workers = workers
+        self.session = session or self._build_session(workers)
+        self.api_calls = 0
+        self.cache_hits = 0
+        self._counter_lock = threading.Lock()
+
+    @staticmethod
+    def _build_session(workers):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _fetch(self, cnpj):
+        """Consulta a API; retorna os dados, None se o CNPJ não existir, ou levanta RequestException."""
+        for attempt in range(MAX_ATTEMPTS):
+            with metrics.timer("brasilapi_espera_cota"):
+                self.limiter.acquire()
+            with self._counter_lock:
+                self.api_calls += 1
+            with metrics.timer("brasilapi"):
+                response = self.session.get(f"{self.base_url}/{cnpj}", timeout=REQUEST_TIMEOUT)
+            metrics.count(f"brasilapi.status_{response.status_code}")
+            if response.status_code == 404:
+                return None
+            if response.status_code == 429 and attempt < MAX_ATTEMPTS - 1:
+                # Retry-After pode vir em segundos ou como data HTTP; sem ele, o intervalo da cota
+                retry_after = retry_after_from_headers(response.headers)
+                if retry_after is None:
+                    retry_after = 1 / self.limiter.rate
+                print(f"    -> Cota da API atingida; aguardando {retry_after:.0f}s.")
+                self.limiter.pause(retry_after)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def lookup(self, cnpj):
+        """Dados do CNPJ (cache ou API), ou None se inválido, inexistente ou com erro na consulta."""
+        cleaned = clean_cnpj(cnpj)
+        if not cleaned:
+            return None
+        if self.cache:
+            found, data = self.cache.get(cleaned)
+            if found:
+                with self._counter_lock:
+                    self.cache_hits += 1
+                metrics.count("cache_cnpj.acertos")
+                return data
+
+        print(f"    -> Buscando dados para o CNPJ: {cleaned}...")
+        import requests
+        try:
+            data = self._fetch(cleaned)
+        except requests.RequestException as e:
+            # Erros transitórios não vão para o cache: o CNPJ é consultado de novo na próxima execução
+            print(f"    -> Erro ao consultar a API para o CNPJ {cleaned}: {e}")
+            return None
+        if self.cache:
+            self.cache.set(cleaned, data)
+        return data
+
+    def lookup_many(self, cnpjs):
+        """Consulta em paralelo cada CNPJ distinto uma única vez; retorna {cnpj limpo: dados}."""
+        unique = sorted({cleaned for cleaned in map(clean_cnpj, cnpjs) if cleaned})
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="cnpj") as pool:
+            return dict(zip(unique, pool.map(self.lookup, unique)))
@@ -1,54 +1,87 @@
-import json
+import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from jsonl_io import iter_records, resolve_data_file
+from metrics import metrics
 
 # Reutilizaremos as funções de conexão e download do nosso script principal
-from process_documents import get_drive_service, get_docx_text
+from process_documents import (
+    MANIFEST_FILE, get_docx_text, get_drive_service, load_manifest,
+)
+
+DEFAULT_FIELDS = ("cliente.nome_responsavel",)
+DOWNLOAD_WORKERS = 4
 
-def debug_missing_fields(input_file="dados_extraidos_openai.json", output_file="debug_faltantes.txt", field_to_debug="cliente.nome_responsavel"):
+def is_missing(record, field):
+    """Um campo (ex.: 'cliente.nome_responsavel') falta se for None, vazio ou se o caminho não existir."""
+    value = record
+    try:
+        for key in field.split('.'):
+            value = value[key]
+    except (KeyError, TypeError):
+        # Se a estrutura de chaves não existir, também é considerado faltante
+        return True
+    return not value
+
+def debug_missing_fields(input_file="dados_extraidos_openai.jsonl", output_file="debug_faltantes.txt",
+                         fields=DEFAULT_FIELDS, workers=DOWNLOAD_WORKERS):
     """
-    Identifica registros com um campo específico faltando, baixa os documentos
-    originais e compila seus textos em um único arquivo de depuração.
+    Identifica registros com algum dos campos de `fields` faltando, obtém o texto dos
+    documentos originais e compila seus textos em um único arquivo de depuração.
+
+    Os textos vêm do cache compartilhado com o process_documents.py (ver text_cache.py)
+    sempre que o arquivo não mudou desde a extração; só os demais são baixados do
+    Drive, em paralelo.
     """
-    print(f"Iniciando a depuração do campo faltante: '{field_to_debug}'")
-    
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-    except FileNotFoundError:
+    if isinstance(fields, str):
+        fields = (fields,)
+    print(f"Iniciando a depuração dos campos faltantes: {', '.join(fields)}")
+
+    input_file = resolve_data_file(input_file)
+    if not os.path.exists(input_file):
         print(f"Erro: Arquivo de dados '{input_file}' não encontrado.")
         return
 
-    # Filtra para encontrar os registros com o campo faltante
-    keys = field_to_debug.split('.')
+    # Uma única passada pelo arquivo, anotando quais campos faltam em cada registro
     records_with_missing_data = []
-    for record in all_data:
-        value = record
-        try:
-            for key in keys:
-                value = value[key]
-            # Considera faltante se for None ou uma string vazia
-            if not value:
-                records_with_missing_data.append(record)
-        except (KeyError, TypeError):
-            # Se a estrutura de chaves não existir, também é considerado faltante
-            records_with_missing_data.append(record)
+    missing_counts = dict.fromkeys(fields, 0)
+    for record in iter_records(input_file):
+        missing = [field for field in fields if is_missing(record, field)]
+        if missing:
+            records_with_missing_data.append((record, missing))
+            for field in missing:
+                missing_counts[field] += 1
 
     if not records_with_missing_data:
-        print(f"Nenhum registro encontrado com o campo '{field_to_debug}' faltando. Ótimo trabalho!")
+        print("Nenhum registro encontrado com esses campos faltando. Ótimo trabalho!")
         return
 
-    print(f"Encontrados {len(records_with_missing_data)} documentos com o campo '{field_to_debug}' faltante.")
-    print("Baixando o conteúdo desses documentos para análise...")
+    for field, count in missing_counts.items():
+        print(f"- '{field}': {count} documentos com o campo faltante.")
+    print(f"Obtendo o conteúdo dos {len(records_with_missing_data)} documentos para análise...")
 
-    # Conecta ao Google Drive
-    service = get_drive_service()
-    if not service:
-        print("Não foi possível conectar ao Google Drive.")
-        return
+    # modifiedTime da última extração, para localizar o texto no cache sem consultar o Drive
+    manifest = load_manifest() if os.path.exists(MANIFEST_FILE) else {}
+    file_ids = [record.get('id_arquivo_drive') for record, _ in records_with_missing_data]
+
+    def _fetch(file_id):
+        if not file_id:
+            return None
+        modified_time = manifest.get(file_id, {}).get('modifiedTime')
+        try:
+            return get_docx_text(get_drive_service(), file_id, modified_time)
+        except Exception as e:
+            print(f"    ERRO ao obter o documento {file_id}: {e}")
+            return None
+
+    # Sem conexão prévia ao Drive: o serviço só é criado pelas threads que precisarem baixar algo
+    with ThreadPoolExecutor(workers, thread_name_prefix="download") as pool:
+        texts = list(pool.map(_fetch, file_ids))
 
     # Salva o texto completo dos documentos problemáticos em um arquivo
     with open(output_file, 'w', encoding='utf-8') as f:
-        for i, record in enumerate(records_with_missing_data):
+        for (record, missing), text_content in zip(records_with_missing_data, texts):
             file_name = record.get('arquivo_origem', 'Nome não encontrado')
             file_id = record.get('id_arquivo_drive')
 
@@ -56,15 +89,12 @@ def debug_missing_fields(input_file="dados_extraidos_openai.json", output_file="
                 f.write(f"\n--- ERRO: Documento '{file_name}' não possui ID do Drive registrado. ---\n\n")
                 continue
 
-            print(f"  ({i+1}/{len(records_with_missing_data)}) Baixando: {file_name}")
-            
             f.write(f"======================================================================\n")
             f.write(f"DOCUMENTO: {file_name}\n")
             f.write(f"ID DO DRIVE: {file_id}\n")
+            f.write(f"CAMPOS FALTANTES: {', '.join(missing)}\n")
             f.write(f"======================================================================\n\n")
-            
-            text_content = get_docx_text(service, file_id)
-            
+
             if text_content:
                 f.write(text_content)
                 f.write("\n\n")
@@ -74,5 +104,21 @@ def debug_missing_fields(input_file="dados_extraidos_openai.json", output_file="
     print(f"\nAnálise concluída! O texto completo dos {len(records_with_missing_data)} documentos foi salvo em '{output_file}'.")
     print("Por favor, revise este arquivo para determinar se a informação realmente está ausente nos textos.")
 
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py debug`)."""
+    parser.add_argument("campos", nargs="*", default=list(DEFAULT_FIELDS),
+                        help="Campos a verificar, ex.: cliente.nome_responsavel cliente.documento")
+    parser.add_argument("--input", default="dados_extraidos_openai.jsonl")
+    parser.add_argument("--output", default="debug_faltantes.txt")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Downloads simultâneos do Drive.")
+
+
+def run_cli(args):
+    debug_missing_fields(args.input, args.output, fields=args.campos, workers=args.workers)
+    metrics.write_run("debug_faltantes")
+
+
 if __name__ == "__main__":
-    debug_missing_fields()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compila o texto dos termos com campos faltantes na extração.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
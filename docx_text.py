@@ -0,0 +1,105 @@
+"""
+Extração rápida de texto de arquivos .docx, sem montar o modelo de objetos do python-docx.
+
+Lê `word/document.xml` direto do zip com um parser XML incremental (iterparse),
+descartando cada elemento assim que seu texto é aproveitado. O texto sai na ordem
+do documento (parágrafos e tabelas intercalados) e cada célula de tabela aparece uma
+única vez, mesmo quando mesclada (o `row.cells` do python-docx repete células
+mescladas horizontal e verticalmente).
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_P = _W + "p"
+_R = _W + "r"
+_T = _W + "t"
+_TC = _W + "tc"
+_BODY = _W + "body"
+_VMERGE = _W + "vMerge"
+_VAL = _W + "val"
+# Elementos de um "run" que viram caracteres no texto, como no python-docx. Só contam
+# dentro de um w:r: o w:tab de `w:pPr/w:tabs` define uma parada de tabulação, não é texto.
+_SPECIAL_CHARS = {
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "br": "\n",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+
+def iter_docx_lines(source):
+    """
+    Gera as linhas de texto de um .docx (caminho, arquivo aberto ou bytes em BytesIO):
+    uma por parágrafo fora de tabelas e uma por célula de tabela, na ordem do documento.
+    """
+    with zipfile.ZipFile(source) as docx_zip:
+        with docx_zip.open("word/document.xml") as xml_file:
+            yield from _iter_lines(xml_file)
+
+
+def _iter_lines(xml_file):
+    paragraphs = []  # pilha de parágrafos abertos (partes de texto)
+    cells = []       # pilha de células abertas: [parágrafos, é continuação de vMerge]
+    fallback_depth = 0
+    run_depth = 0
+    body = None
+    depth = 0
+
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            depth += 1
+            if tag == _P:
+                paragraphs.append([])
+            elif tag == _R:
+                run_depth += 1
+            elif tag == _TC:
+                cells.append([[], False])
+            elif tag == _BODY:
+                body = elem
+            elif tag == _MC_FALLBACK:
+                # Conteúdo alternativo duplicado (compatibilidade com versões antigas do Word)
+                fallback_depth += 1
+            elif tag == _VMERGE and cells and elem.get(_VAL) != "restart":
+                cells[-1][1] = True
+            continue
+
+        depth -= 1
+        if tag == _R:
+            run_depth -= 1
+        if fallback_depth:
+            if tag == _MC_FALLBACK:
+                fallback_depth -= 1
+        elif tag == _T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag in _SPECIAL_CHARS:
+            if paragraphs and run_depth:
+                paragraphs[-1].append(_SPECIAL_CHARS[tag])
+        elif tag == _P:
+            text = "".join(paragraphs.pop())
+            if cells:
+                cells[-1][0].append(text)
+            else:
+                yield text
+        elif tag == _TC:
+            cell_paragraphs, is_continuation = cells.pop()
+            cell_text = "\n".join(cell_paragraphs)
+            # A continuação de uma mesclagem vertical é só um marcador: o texto está na célula inicial
+            if not (is_continuation and not cell_text.strip()):
+                yield cell_text
+
+        if tag == _P or tag == _TC:
+            elem.clear()
+        # Libera os blocos de nível superior (parágrafos e tabelas) já processados
+        if depth == 2 and body is not None:
+            body.clear()
+
+
+def extract_docx_text(source):
+    """Retorna todo o texto do .docx, uma linha por parágrafo ou célula de tabela."""
+    return "\n".join(iter_docx_lines(source))
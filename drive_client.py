@@ -0,0 +1,161 @@
+"""
+Cliente da API do Drive compartilhado pelos scripts, seguro para várias threads.
+
+- O documento de descoberta da API (a descrição dos métodos do Drive v3) é lido e
+  interpretado uma única vez por processo e guardado em DISCOVERY_CACHE_PATH;
+  `build("drive", "v3")` refazia esse trabalho a cada serviço criado.
+- As credenciais de `token.json` são carregadas uma vez e compartilhadas; quando o
+  token expira, só uma thread o renova (as demais esperam e usam o token novo), e o
+  token renovado é gravado de volta em `token.json`.
+- Cada thread recebe um serviço com a sua própria conexão HTTP (o `httplib2.Http` não
+  pode ser compartilhado entre threads), mantida aberta entre as requisições.
+
+    from drive_client import get_drive_client
+
+    service = get_drive_client().service()  # serviço exclusivo da thread atual
+"""
+import json
+import os
+import threading
+
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+
+SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+TOKEN_PATH = "token.json"
+DISCOVERY_CACHE_PATH = os.getenv("DRIVE_DISCOVERY_CACHE_PATH", "cache_discovery_drive_v3.json")
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/drive/v3/rest"
+HTTP_TIMEOUT_SECONDS = 60
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def _fetch_discovery_document():
+    """Texto do documento de descoberta: o que acompanha a biblioteca ou, na falta dele, o da API."""
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        document = get_static_doc("drive", "v3")
+    except ImportError:
+        document = None
+    if document is None:
+        import requests
+        response = requests.get(DISCOVERY_URL, timeout=HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        document = response.text
+    return document
+
+
+def load_discovery_document(path=DISCOVERY_CACHE_PATH):
+    """Documento de descoberta do Drive v3 (dicionário), lido do disco ou baixado só na primeira vez."""
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    document = f.read()
+            else:
+                document = _fetch_discovery_document()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(document)
+            _discovery_document = json.loads(document)
+        return _discovery_document
+
+
+class SharedCredentials:
+    """
+    Credenciais OAuth compartilhadas entre as conexões das threads, renovadas sob um lock.
+
+    Uma renovação pedida por um 401 é ignorada se outra thread já trocou o token desde
+    que esta o usou (várias threads recebem 401 ao mesmo tempo quando o token expira).
+    """
+
+    def __init__(self, credentials, token_path=TOKEN_PATH):
+        self._credentials = credentials
+        self._token_path = token_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.refreshes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._credentials, name)
+
+    def _refresh(self, request):
+        self._credentials.refresh(request)
+        self.refreshes += 1
+        with open(self._token_path, "w") as token:
+            token.write(self._credentials.to_json())
+
+    def refresh(self, request):
+        with self._lock:
+            last_token = getattr(self._local, "token", None)
+            if self._credentials.valid and self._credentials.token != last_token:
+                return
+            self._refresh(request)
+
+    def before_request(self, request, method, url, headers):
+        with self._lock:
+            if not self._credentials.valid:
+                self._refresh(request)
+            token = self._credentials.token
+        self._local.token = token
+        self._credentials.apply(headers, token=token)
+
+
+class DriveClient:
+    """Credenciais e documento de descoberta compartilhados; um serviço do Drive por thread."""
+
+    def __init__(self, token_path=TOKEN_PATH, scopes=SCOPES, discovery_path=DISCOVERY_CACHE_PATH,
+                 timeout=HTTP_TIMEOUT_SECONDS):
+        self.token_path = token_path
+        self.scopes = scopes
+        self.discovery_path = discovery_path
+        self.timeout = timeout
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.services_built = 0
+
+    def credentials(self):
+        """Credenciais compartilhadas, carregadas (e renovadas, se preciso) na primeira chamada."""
+        with self._lock:
+            if self._credentials is None:
+                creds = None
+                if os.path.exists(self.token_path):
+                    creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+                if not creds or not (creds.valid or (creds.expired and creds.refresh_token)):
+                    raise Exception("Token não encontrado ou inválido. Execute 'authenticate.py' primeiro.")
+                self._credentials = SharedCredentials(creds, self.token_path)
+                if not creds.valid:
+                    self._credentials.refresh(Request())
+            return self._credentials
+
+    def new_service(self):
+        """Um novo serviço do Drive, com conexão HTTP própria (não compartilhe entre threads)."""
+        http = AuthorizedHttp(self.credentials(), http=httplib2.Http(timeout=self.timeout))
+        service = build_from_document(load_discovery_document(self.discovery_path), http=http)
+        with self._lock:
+            self.services_built += 1
+        return service
+
+    def service(self):
+        """Serviço do Drive exclusivo da thread atual, criado no primeiro uso e reaproveitado depois."""
+        if getattr(self._local, "service", None) is None:
+            self._local.service = self.new_service()
+        return self._local.service
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_drive_client():
+    """Cliente do Drive compartilhado pelo processo."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DriveClient()
+        return _client
@@ -0,0 +1,133 @@
+"""
+Listagem dos .docx das pastas do Drive, paginada e concorrente.
+
+Cada pasta é listada por uma thread, seguindo `nextPageToken` até o fim (o Drive
+devolve no máximo 1000 arquivos por página). Com `recursive`, as subpastas
+encontradas também entram na fila. Os metadados são entregues à medida que as
+páginas chegam, para que os downloads comecem antes de a listagem terminar:
+
+    for item in iter_docx_files(get_drive_service, {"Termos Pagos": FOLDER_ID_PAGOS}):
+        ...
+
+Um arquivo presente em mais de uma pasta é entregue uma única vez. Cada página é
+pedida com novas tentativas (ver resilience.py); uma pasta que ainda assim falha é
+relatada em `failures`, e a listagem dela (e das subpastas) fica incompleta.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from resilience import call_with_retry
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+PAGE_SIZE = 1000
+LIST_WORKERS = 4
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, modifiedTime, md5Checksum)"
+# Tentativas por página (erros 429, 5xx e de rede; os demais falham na hora)
+LIST_MAX_ATTEMPTS = 4
+
+
+def folder_query(folder_id, recursive=False):
+    mime_filter = f"mimeType='{DOCX_MIME_TYPE}'"
+    if recursive:
+        mime_filter = f"({mime_filter} or mimeType='{FOLDER_MIME_TYPE}')"
+    return f"'{folder_id}' in parents and {mime_filter} and trashed=false"
+
+
+def iter_folder_pages(service, folder_id, recursive=False, page_size=PAGE_SIZE, max_attempts=LIST_MAX_ATTEMPTS):
+    """
+    Gera as páginas (listas de metadados) de uma pasta, seguindo `nextPageToken`. Cada
+    página tem até `max_attempts` tentativas; o último erro é relançado.
+    """
+    query = folder_query(folder_id, recursive)
+    page_token = None
+    while True:
+        request = service.files().list(q=query, pageSize=page_size, fields=LIST_FIELDS, pageToken=page_token)
+        response = call_with_retry(request.execute, max_attempts=max_attempts)
+        yield response.get("files", [])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def iter_docx_files(get_service, folders, workers=LIST_WORKERS, recursive=False, page_size=PAGE_SIZE,
+                    failures=None):
+    """
+    Gera os metadados dos .docx de `folders` (nome -> id) à medida que são listados.
+
+    `get_service()` é chamado pela própria thread de listagem, que deve receber um
+    serviço só seu (ex.: `process_documents.get_drive_service`). Uma pasta que
+    falha depois das novas tentativas não interrompe a listagem das demais: é
+    relatada e, se `failures` for uma lista, incluída nela como (nome, id, erro).
+    Quem precisa da listagem completa deve conferir `failures` ao fim da iteração.
+    """
+    events = queue.Queue()
+
+    def _list_folder(folder_name, folder_id):
+        found = 0
+        error = None
+        try:
+            service = get_service()
+            for page in iter_folder_pages(service, folder_id, recursive, page_size):
+                files = []
+                for item in page:
+                    if item.get("mimeType") == FOLDER_MIME_TYPE:
+                        events.put(("pasta", f"{folder_name}/{item['name']}", item["id"]))
+                    else:
+                        files.append(item)
+                found += len(files)
+                events.put(("arquivos", files))
+        except Exception as e:
+            error = e
+        finally:
+            events.put(("fim", folder_name, folder_id, found, error))
+
+    pool = ThreadPoolExecutor(workers, thread_name_prefix="listagem")
+    seen_folders = set()
+    seen_files = set()
+    # Só esta thread (a que consome o gerador) agenda pastas e conta as pendentes
+    pending = 0
+
+    def _schedule(folder_name, folder_id):
+        nonlocal pending
+        if folder_id in seen_folders:
+            return
+        seen_folders.add(folder_id)
+        pending += 1
+        pool.submit(_list_folder, folder_name, folder_id)
+
+    try:
+        for folder_name, folder_id in folders.items():
+            print(f"\n--- Listando pasta: {folder_name} ---")
+            _schedule(folder_name, folder_id)
+        while pending:
+            event = events.get()
+            if event[0] == "pasta":
+                _schedule(event[1], event[2])
+            elif event[0] == "arquivos":
+                for item in event[1]:
+                    if item["id"] not in seen_files:
+                        seen_files.add(item["id"])
+                        yield item
+            else:
+                pending -= 1
+                _, folder_name, folder_id, found, error = event
+                if error is not None:
+                    print(f"ERRO ao listar a pasta {folder_name} ({found} arquivos .docx antes da falha): {error}")
+                    if failures is not None:
+                        failures.append((folder_name, folder_id, error))
+                elif found:
+                    print(f"Pasta {folder_name}: {found} arquivos .docx.")
+                else:
+                    print(f"Nenhum arquivo .docx encontrado na pasta {folder_name}.")
+    finally:
+        # Se o consumidor parar antes do fim, as pastas que ainda não começaram são canceladas
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def list_docx_files(service, folder_id, page_size=PAGE_SIZE):
+    """Lista todos os .docx de uma pasta (todas as páginas, sem subpastas); relança o erro se uma página falhar."""
+    items = []
+    for page in iter_folder_pages(service, folder_id, page_size=page_size):
+        items.extend(page)
+    return items
@@ -0,0 +1,188 @@
+"""
+Identificação de clientes: o mesmo cliente com o documento em outro formato, sem
+documento, ou com o nome escrito de outro jeito.
+
+Comparar cada cliente com todos os outros é quadrático; aqui cada cliente entra em
+"blocos" e só é comparado com quem divide algum bloco com ele:
+- o documento normalizado (só dígitos, ver `normalize_document`);
+- o código fonético de cada palavra significativa do nome (`name_tokens` descarta
+  "LTDA", "ME", "EMPRESA", números etc.; `phonetic` aproxima grafias como
+  "MÉDICOS"/"MEDICOS", "INSTRUMENTO"/"INSTRUMENTOS", "PRODUÇÕES"/"PRODUCOES").
+
+Um bloco guarda no máximo MAX_BLOCK_SIZE clientes (palavras muito comuns, como
+"ESCOLA", não viram um bloco enorme). Dentro dos blocos, a comparação fina é a razão
+do `difflib.SequenceMatcher` entre as palavras do nome em ordem alfabética.
+
+Regras de `ClientResolver.resolve`: mesmo documento normalizado é o mesmo cliente;
+documentos diferentes nunca são; sem documento, vale o nome mais parecido com
+similaridade >= NAME_SIMILARITY_THRESHOLD.
+
+Uso (clientes possivelmente duplicados no banco):
+    python entity_resolution.py
+    python entity_resolution.py --db sistemacipt.db --limiar 0.85
+"""
+import argparse
+import re
+import sqlite3
+from difflib import SequenceMatcher
+
+from client_classifier import fold, only_digits
+
+NAME_SIMILARITY_THRESHOLD = 0.9
+MAX_BLOCK_SIZE = 50
+# Palavras que não distinguem um cliente de outro
+NAME_STOPWORDS = {
+    "LTDA", "LIMITADA", "ME", "EPP", "EIRELI", "MEI", "SA", "S", "A", "CIA", "SLU", "SS", "EMPRESA",
+    "E", "DE", "DA", "DO", "DAS", "DOS", "EM", "PARA", "COM",
+}
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+# Regras fonéticas aplicadas em ordem sobre a palavra em maiúsculas e sem acentos
+_PHONETIC_RULES = tuple((re.compile(pattern), replacement) for pattern, replacement in (
+    (r"PH", "F"), (r"TH", "T"), (r"SCH|SH|CH", "X"), (r"LH", "L"), (r"NH", "N"),
+    (r"C(?=[EI])", "S"), (r"G(?=[EI])", "J"), (r"QU(?=[EI])", "K"), (r"GU(?=[EI])", "G"), (r"[CQ]", "K"),
+    (r"Y", "I"), (r"W", "V"), (r"Z", "S"), (r"H", ""),
+    (r"(?<=.)[AEIOU]", ""), (r"(.)\1+", r"\1"), (r"(?<=..)S$", ""),
+))
+
+
+def normalize_document(value):
+    """Só os dígitos do CPF/CNPJ ("04.007.216/0001-30" -> "04007216000130"), ou None se não houver."""
+    if value is None:
+        return None
+    return only_digits(str(value)) or None
+
+
+def name_tokens(nome):
+    """Palavras significativas do nome, em maiúsculas e sem acentos, em ordem alfabética."""
+    words = _NON_ALNUM_RE.split(fold(nome if isinstance(nome, str) else ""))
+    return sorted({word for word in words if word and not word.isdigit() and word not in NAME_STOPWORDS})
+
+
+def phonetic(word):
+    """Código fonético aproximado de uma palavra (maiúsculas, sem acentos)."""
+    for pattern, replacement in _PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+class ClientResolver:
+    """Clientes conhecidos, em blocos por documento e por código fonético das palavras do nome."""
+
+    def __init__(self, threshold=NAME_SIMILARITY_THRESHOLD, max_block_size=MAX_BLOCK_SIZE):
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self._by_document = {}
+        self._tokens = {}  # id -> palavras do nome
+        self._blocks = {}  # código fonético -> [id, ...]
+        self.comparisons = 0
+
+    @classmethod
+    def from_db(cls, cursor, threshold=NAME_SIMILARITY_THRESHOLD):
+        """Resolvedor com todos os clientes de Clientes_Eventos (documento_norm: ver `import_to_db.sync_document_norm`)."""
+        resolver = cls(threshold)
+        for client_id, documento_norm, nome in cursor.execute(
+                "SELECT id, documento_norm, nome_razao_social FROM Clientes_Eventos ORDER BY id"):
+            resolver.add(client_id, documento_norm, nome)
+        return resolver
+
+    def add(self, client_id, documento, nome):
+        """Inclui um cliente; um documento já conhecido continua apontando para o primeiro cliente."""
+        document = normalize_document(documento)
+        if document:
+            self._by_document.setdefault(document, client_id)
+        tokens = name_tokens(nome)
+        self._tokens[client_id] = tokens
+        for key in {phonetic(token) for token in tokens}:
+            block = self._blocks.setdefault(key, [])
+            if len(block) < self.max_block_size:
+                block.append(client_id)
+
+    def by_document(self, documento):
+        """Id do cliente com o mesmo documento normalizado, ou None."""
+        document = normalize_document(documento)
+        return self._by_document.get(document) if document else None
+
+    def similar_names(self, nome):
+        """[(id, similaridade), ...] dos clientes com nome parecido (>= threshold), do mais ao menos parecido."""
+        tokens = name_tokens(nome)
+        keys = {phonetic(token) for token in tokens}
+        if not keys:
+            return []
+        shared = {}
+        for key in keys:
+            for client_id in self._blocks.get(key, ()):
+                shared[client_id] = shared.get(client_id, 0) + 1
+        # Nomes parecidos dividem a maior parte das palavras: os demais nem são comparados
+        minimum = max(1, len(keys) // 2)
+        # O nome procurado é o segundo texto do SequenceMatcher, indexado uma vez só;
+        # as estimativas rápidas (limites superiores da razão) descartam a maioria antes do cálculo completo
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(" ".join(tokens))
+        matches = []
+        for client_id, count in shared.items():
+            if count < minimum:
+                continue
+            self.comparisons += 1
+            matcher.set_seq1(" ".join(self._tokens[client_id]))
+            if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= self.threshold:
+                matches.append((client_id, similarity))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def resolve(self, documento, nome):
+        """
+        (id, motivo) do cliente já conhecido que corresponde a este, com motivo "documento"
+        ou "nome"; (None, None) se for um cliente novo. Com documento, só o documento conta.
+        """
+        if normalize_document(documento):
+            client_id = self.by_document(documento)
+            return (client_id, "documento") if client_id is not None else (None, None)
+        matches = self.similar_names(nome)
+        return (matches[0][0], "nome") if matches else (None, None)
+
+
+def find_duplicates(clients, threshold=NAME_SIMILARITY_THRESHOLD):
+    """
+    Pares de clientes possivelmente duplicados em [(id, documento, nome), ...]:
+    [(id_a, id_b, motivo, similaridade), ...], com motivo "documento" (mesmo documento
+    normalizado) ou "nome" (nomes parecidos, mesmo que os documentos sejam diferentes).
+    """
+    resolver = ClientResolver(threshold)
+    pairs = []
+    for client_id, documento, nome in clients:
+        same_document = resolver.by_document(documento)
+        if same_document is not None:
+            pairs.append((same_document, client_id, "documento", 1.0))
+        for other_id, similarity in resolver.similar_names(nome):
+            if other_id != same_document:
+                pairs.append((other_id, client_id, "nome", similarity))
+        resolver.add(client_id, documento, nome)
+    return pairs
+
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py clients`)."""
+    parser.add_argument("--db", default="sistemacipt_teste.db", help="Banco com a tabela Clientes_Eventos.")
+    parser.add_argument("--limiar", type=float, default=NAME_SIMILARITY_THRESHOLD,
+                        help="Similaridade mínima entre os nomes (0 a 1).")
+
+
+def run_cli(args):
+    conn = sqlite3.connect(args.db)
+    rows = conn.execute("SELECT id, documento, nome_razao_social FROM Clientes_Eventos ORDER BY id").fetchall()
+    conn.close()
+    clients = {client_id: (documento, nome) for client_id, documento, nome in rows}
+    pairs = find_duplicates(rows, args.limiar)
+    print(f"{len(rows)} clientes em '{args.db}'; {len(pairs)} par(es) possivelmente duplicado(s).")
+    for id_a, id_b, reason, similarity in pairs:
+        (doc_a, nome_a), (doc_b, nome_b) = clients[id_a], clients[id_b]
+        print(f"- [{reason} {similarity:.2f}] {id_a}: {nome_a} ({doc_a}) x {id_b}: {nome_b} ({doc_b})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clientes possivelmente duplicados em Clientes_Eventos.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
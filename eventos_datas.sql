@@ -0,0 +1,55 @@
+-- Índices das consultas de calendário e por cliente, e as datas dos eventos em formato
+-- normalizado (uma linha por data), no lugar de reler o JSON de Eventos.datas_evento.
+-- Os gatilhos mantêm Eventos_Datas em dia com qualquer escrita em Eventos (importação ou
+-- sistema web); não dependem de PRAGMA foreign_keys, ao contrário do ON DELETE CASCADE.
+-- Pode ser executada mais de uma vez (a tabela é reconstruída); é aplicada
+-- automaticamente pelo import_to_db.py quando a tabela ou os gatilhos ainda não existem.
+
+CREATE INDEX IF NOT EXISTS idx_eventos_cliente ON Eventos(id_cliente);
+CREATE INDEX IF NOT EXISTS idx_eventos_numero_termo ON Eventos(numero_termo);
+CREATE INDEX IF NOT EXISTS idx_eventos_numero_processo ON Eventos(numero_processo);
+
+-- Uma linha por (evento, data), com a data no formato 'YYYY-MM-DD'
+CREATE TABLE IF NOT EXISTS Eventos_Datas (
+    id_evento INTEGER NOT NULL REFERENCES Eventos(id) ON DELETE CASCADE,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id_evento, data)
+) WITHOUT ROWID;
+
+-- Consultas por intervalo de datas ("eventos entre 01/03 e 31/03")
+CREATE INDEX IF NOT EXISTS idx_eventos_datas_data ON Eventos_Datas(data, id_evento);
+
+-- Datas de um evento: os textos não vazios de datas_evento, se for um array JSON válido
+-- (o CASE evita o erro do json_each com um JSON inválido, que abortaria a escrita em Eventos)
+CREATE TRIGGER IF NOT EXISTS trg_eventos_datas_ins AFTER INSERT ON Eventos
+BEGIN
+    INSERT OR IGNORE INTO Eventos_Datas (id_evento, data)
+    SELECT NEW.id, datas.value
+    FROM json_each(CASE WHEN json_valid(NEW.datas_evento) AND json_type(NEW.datas_evento) = 'array'
+                        THEN NEW.datas_evento ELSE '[]' END) AS datas
+    WHERE datas.type = 'text' AND datas.value <> '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_eventos_datas_upd AFTER UPDATE OF id, datas_evento ON Eventos
+BEGIN
+    DELETE FROM Eventos_Datas WHERE id_evento = OLD.id;
+    INSERT OR IGNORE INTO Eventos_Datas (id_evento, data)
+    SELECT NEW.id, datas.value
+    FROM json_each(CASE WHEN json_valid(NEW.datas_evento) AND json_type(NEW.datas_evento) = 'array'
+                        THEN NEW.datas_evento ELSE '[]' END) AS datas
+    WHERE datas.type = 'text' AND datas.value <> '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_eventos_datas_del AFTER DELETE ON Eventos
+BEGIN
+    DELETE FROM Eventos_Datas WHERE id_evento = OLD.id;
+END;
+
+-- Reconstrói as datas dos eventos já cadastrados (as de um banco migrado antes dos
+-- gatilhos podem estar desatualizadas)
+DELETE FROM Eventos_Datas;
+INSERT OR IGNORE INTO Eventos_Datas (id_evento, data)
+SELECT Eventos.id, datas.value
+FROM Eventos, json_each(CASE WHEN json_valid(Eventos.datas_evento) AND json_type(Eventos.datas_evento) = 'array'
+                             THEN Eventos.datas_evento ELSE '[]' END) AS datas
+WHERE datas.type = 'text' AND datas.value <> '';
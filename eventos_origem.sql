@@ -0,0 +1,15 @@
+-- Rastreia a origem de cada evento importado, para que a importação possa ser refeita
+-- sem duplicar eventos (import_to_db.py --incremental). Aplicada automaticamente pelo
+-- import_to_db.py quando as colunas ainda não existem.
+
+-- Id do arquivo no Google Drive de onde o evento foi extraído
+ALTER TABLE Eventos ADD COLUMN id_arquivo_drive TEXT;
+
+-- Posição do evento na lista de eventos do termo (um termo pode ter vários eventos)
+ALTER TABLE Eventos ADD COLUMN indice_evento INTEGER;
+
+-- SHA-256 dos dados extraídos do evento: se não mudar, a linha não é regravada
+ALTER TABLE Eventos ADD COLUMN hash_conteudo TEXT;
+
+-- Um evento por (arquivo, posição); eventos antigos, sem origem (NULL), não entram na restrição
+CREATE UNIQUE INDEX IF NOT EXISTS ux_eventos_origem ON Eventos(id_arquivo_drive, indice_evento);
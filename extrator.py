@@ -0,0 +1,135 @@
+"""
+Ponto de entrada único do pipeline: `python extrator.py <comando> [opções]`.
+
+    python extrator.py extract --incremental     # process_documents.py
+    python extrator.py batch run                 # batch_extraction.py
+    python extrator.py debug cliente.documento   # debug_faltantes.py
+    python extrator.py duplicates                # near_duplicates.py
+    python extrator.py sanitize                  # sanitize_and_review.py
+    python extrator.py validate --tolerancia 0.02
+    python extrator.py import --incremental --validar
+    python extrator.py conflicts --livre Auditório 2025-10-10 18h 22h
+    python extrator.py clients --limiar 0.85
+    python extrator.py startup                   # confere o tempo de inicialização
+
+Só o módulo do comando pedido é importado, e cada módulo deixa as bibliotecas pesadas
+(openai, googleapiclient, requests) e a criação dos clientes para o primeiro uso: um
+`validate` não carrega nada do Drive nem da OpenAI e não precisa de OPENAI_API_KEY.
+As opções de cada comando vêm do próprio script (`add_arguments` / `run_cli`), que
+continua podendo ser executado diretamente.
+
+`startup` importa cada comando num processo novo e compara o tempo com
+STARTUP_BUDGET_MS; sai com código 1 se algum passar do orçamento.
+"""
+import argparse
+import importlib
+import subprocess
+import sys
+import time
+
+# comando -> (módulo, descrição)
+COMMANDS = {
+    "extract": ("process_documents", "Extrai os dados dos termos do Drive com regras e IA."),
+    "batch": ("batch_extraction", "Extração pela Batch API da OpenAI (submit, collect, run)."),
+    "debug": ("debug_faltantes", "Compila o texto dos termos com campos faltantes."),
+    "duplicates": ("near_duplicates", "Agrupa os termos quase idênticos do cache de textos."),
+    "sanitize": ("sanitize_and_review", "Sanitiza e enriquece os dados extraídos para revisão."),
+    "validate": ("validate_data", "Relatório de qualidade dos dados extraídos."),
+    "import": ("import_to_db", "Importa os dados revisados para o banco do sistema."),
+    "conflicts": ("booking_conflicts", "Reservas sobrepostas do mesmo espaço, ou se um espaço está livre."),
+    "clients": ("entity_resolution", "Clientes possivelmente duplicados no banco."),
+}
+
+# Tempo máximo (ms) para importar o módulo de cada comando, medido num processo novo.
+# Os comandos só de leitura de arquivos ficam em dezenas de ms; os demais carregam
+# o extrator por regras, os caches e o índice de duplicados.
+STARTUP_BUDGET_MS = {
+    "extract": 150,
+    "batch": 150,
+    "debug": 150,
+    "duplicates": 50,
+    "sanitize": 75,
+    "validate": 50,
+    "import": 50,
+    "conflicts": 50,
+    "clients": 50,
+}
+STARTUP_RUNS = 3
+
+_IMPORT_TIMER = (
+    "import sys, time\n"
+    "sys.path.insert(0, {path!r})\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+
+def load_command(name):
+    """Módulo do comando `name`, importado só agora."""
+    return importlib.import_module(COMMANDS[name][0])
+
+
+def import_time_ms(module, runs=STARTUP_RUNS):
+    """Menor tempo (ms) de `import module` em `runs` processos novos do Python."""
+    code = _IMPORT_TIMER.format(path=sys.path[0], module=module)
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def check_startup(names=None, runs=STARTUP_RUNS):
+    """Mede a importação de cada comando e imprime a tabela; retorna True se todos cabem no orçamento."""
+    ok = True
+    print(f"{'comando':<12} {'módulo':<22} {'import (ms)':>12} {'orçamento':>10}")
+    for name in names or COMMANDS:
+        module = COMMANDS[name][0]
+        elapsed = import_time_ms(module, runs)
+        budget = STARTUP_BUDGET_MS[name]
+        status = "" if elapsed <= budget else "  ACIMA DO ORÇAMENTO"
+        ok = ok and elapsed <= budget
+        print(f"{name:<12} {module:<22} {elapsed:>12.1f} {budget:>10}{status}")
+    return ok
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands_help = [f"  {name:<11} {description}" for name, (_, description) in COMMANDS.items()]
+    commands_help.append(f"  {'startup':<11} Confere o tempo de inicialização dos comandos.")
+    parser = argparse.ArgumentParser(
+        prog="extrator", description="Pipeline de extração dos termos de permissão de uso.",
+        epilog="comandos:\n" + "\n".join(commands_help), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("comando", choices=list(COMMANDS) + ["startup"])
+    # Só o nome do comando é lido aqui; as demais opções são do parser do próprio comando
+    args = parser.parse_args(argv[:1])
+    rest = argv[1:]
+
+    if args.comando == "startup":
+        startup = argparse.ArgumentParser(prog="extrator startup",
+                                          description="Confere o tempo de importação de cada comando.")
+        startup.add_argument("comandos", nargs="*", metavar="comando", help="Padrão: todos.")
+        startup.add_argument("--execucoes", type=int, default=STARTUP_RUNS,
+                             help="Processos medidos por comando (vale o menor tempo).")
+        startup_args = startup.parse_args(rest)
+        unknown = [name for name in startup_args.comandos if name not in COMMANDS]
+        if unknown:
+            startup.error(f"comando desconhecido: {', '.join(unknown)}")
+        sys.exit(0 if check_startup(startup_args.comandos, startup_args.execucoes) else 1)
+
+    # O .env é carregado antes do módulo, para valer nas constantes lidas na importação
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    start = time.perf_counter()
+    module = load_command(args.comando)
+    loaded_ms = (time.perf_counter() - start) * 1000
+    command = argparse.ArgumentParser(prog=f"extrator {args.comando}", description=COMMANDS[args.comando][1],
+                                      epilog=f"Módulo '{module.__name__}' carregado em {loaded_ms:.0f} ms.")
+    module.add_arguments(command)
+    module.run_cli(command.parse_args(rest))
+
+
+if __name__ == "__main__":
+    main()
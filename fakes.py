@@ -0,0 +1,552 @@
+"""
+Substitutos locais para os serviços externos do pipeline (Google Drive, OpenAI e BrasilAPI).
+
+Permitem rodar `process_documents.run_pipeline` e `get_docx_text` sem rede, sem
+credenciais e sem custo de API, por exemplo:
+
+    drive = FakeDriveService({"id1": ("termo.docx", ["Termo n°: 1/2025"])})
+    llm = FakeOpenAIClient()
+    items = list_docx_files(drive, FAKE_FOLDER_ID)
+    run_pipeline(items,
+                 fetch_text=lambda item: get_docx_text(drive, item['id']),
+                 extract=lambda text, name: extract_data_with_openai(text, name, llm_client=llm))
+
+Pastas, subpastas e paginação, para a listagem de `drive_listing.py`:
+
+    drive = FakeDriveService(files, folders={"raiz": ("Termos", ["id1", "sub"]), "sub": ("2024", ["id2"])})
+    items = list(iter_docx_files(lambda: drive, {"Termos": "raiz"}, recursive=True, page_size=1))
+
+Para a Batch API, `FakeOpenAIBatchServer` sobe um servidor HTTP local compatível
+com o cliente oficial:
+
+    with FakeOpenAIBatchServer() as server:
+        llm = OpenAI(base_url=server.base_url, api_key="teste")
+        batch_extraction.submit(llm_client=llm)
+
+`FakeBrasilAPIServer` faz o mesmo para a consulta de CNPJs (com cota opcional, 429):
+
+    with FakeBrasilAPIServer({"12345678000195": {"razao_social": "EMPRESA X LTDA"}}) as api:
+        enricher = CNPJEnricher(base_url=api.base_url)
+
+Os três simuladores aceitam latência e taxa de erro configuráveis; `benchmark_pipeline.py`
+os usa para medir o pipeline inteiro com milhares de termos gerados sob demanda.
+"""
+import collections
+import collections.abc
+import email.parser
+import email.policy
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+FAKE_FOLDER_ID = "pasta-falsa"
+DEFAULT_MODIFIED_TIME = "2025-01-01T00:00:00.000Z"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def build_docx_bytes(paragraphs):
+    """Monta um .docx mínimo (em memória) com um parágrafo por item de `paragraphs`."""
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{_escape(p)}</w:t></w:r></w:p>' for p in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}"><w:body>{body}</w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx_zip:
+        docx_zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        docx_zip.writestr("_rels/.rels", _RELS)
+        docx_zip.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+class _FakeHttp:
+    """Imita o `httplib2.Http` usado pelo `MediaIoBaseDownload`."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        response = httplib2.Response({"status": 200, "content-length": str(len(self.content))})
+        return response, self.content
+
+
+_PARENT_RE = re.compile(r"'([^']+)' in parents")
+_MIME_RE = re.compile(r"mimeType='([^']+)'")
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class SyntheticDocuments(collections.abc.Mapping):
+    """
+    Documentos "file-0" ... "file-{count-1}" gerados sob demanda por `make_paragraphs(índice)`,
+    sem guardar os .docx na memória (para simular pastas com dezenas de milhares de termos).
+    """
+
+    def __init__(self, count, make_paragraphs, prefix="file-"):
+        self.count = count
+        self.make_paragraphs = make_paragraphs
+        self.prefix = prefix
+
+    def _index(self, file_id):
+        if isinstance(file_id, str) and file_id.startswith(self.prefix) and file_id[len(self.prefix):].isdigit():
+            index = int(file_id[len(self.prefix):])
+            if index < self.count:
+                return index
+        raise KeyError(file_id)
+
+    def __getitem__(self, file_id):
+        index = self._index(file_id)
+        return f"Termo sintético {index + 1}.docx", build_docx_bytes(self.make_paragraphs(index))
+
+    def __contains__(self, file_id):
+        try:
+            self._index(file_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return (f"{self.prefix}{index}" for index in range(self.count))
+
+    def __len__(self):
+        return self.count
+
+
+class _FakeFilesResource:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q=None, pageSize=100, fields=None, pageToken=None, **kwargs):
+        def _execute():
+            if self.drive.list_latency:
+                time.sleep(self.drive.list_latency)
+            with self.drive.lock:
+                self.drive.list_calls += 1
+            parent = _PARENT_RE.search(q or "")
+            mime_types = set(_MIME_RE.findall(q or "")) or {DOCX_MIME_TYPE, FOLDER_MIME_TYPE}
+            children = [child_id for child_id in self.drive.children(parent and parent.group(1))
+                        if self.drive.mime_type(child_id) in mime_types]
+            start = int(pageToken or 0)
+            response = {"files": [self.drive.metadata(child_id) for child_id in children[start:start + pageSize]]}
+            if start + pageSize < len(children):
+                response["nextPageToken"] = str(start + pageSize)
+            return response
+        return SimpleNamespace(execute=_execute)
+
+    def get_media(self, fileId):
+        if self.drive.download_latency:
+            time.sleep(self.drive.download_latency)
+        with self.drive.lock:
+            self.drive.downloads += 1
+            failed = self.drive.download_error_rate and self.drive.random.random() < self.drive.download_error_rate
+            if failed:
+                self.drive.download_errors += 1
+        if failed:
+            raise HttpError(httplib2.Response({"status": 500}), b"erro simulado do Drive", uri=f"fake://drive/{fileId}")
+        content = self.drive.documents[fileId][1]
+        return SimpleNamespace(uri=f"fake://drive/{fileId}", headers={}, http=_FakeHttp(content))
+
+
+class FakeDriveService:
+    """
+    Serviço do Drive em memória. `files` mapeia id -> (nome, parágrafos ou bytes do .docx).
+    Suporta `files().list(q=..., pageSize=..., pageToken=...).execute()` (com paginação
+    por `nextPageToken`) e `files().get_media(fileId=...)`.
+
+    `folders` mapeia id da pasta -> (nome, ids dos filhos), que podem ser arquivos ou
+    outras pastas. Sem `folders`, qualquer pasta contém todos os arquivos.
+    `list_latency` atrasa cada página da listagem e `download_latency` cada download,
+    como chamadas de rede; uma fração `download_error_rate` dos downloads falha com
+    HttpError 500. `files` pode ser um `SyntheticDocuments` (documentos gerados sob demanda).
+    """
+
+    def __init__(self, files, folders=None, list_latency=0, download_latency=0, download_error_rate=0, seed=0):
+        if isinstance(files, SyntheticDocuments):
+            self.documents = files
+        else:
+            self.documents = {}
+            for file_id, (name, content) in files.items():
+                if not isinstance(content, bytes):
+                    content = build_docx_bytes(content)
+                self.documents[file_id] = (name, content)
+        self.modified_times = collections.defaultdict(lambda: DEFAULT_MODIFIED_TIME)
+        self.folders = folders
+        self.list_latency = list_latency
+        self.download_latency = download_latency
+        self.download_error_rate = download_error_rate
+        self.random = random.Random(seed)
+        self.list_calls = 0
+        self.downloads = 0
+        self.download_errors = 0
+        self.lock = threading.Lock()
+
+    def children(self, folder_id):
+        if self.folders is None:
+            return list(self.documents)
+        return list(self.folders.get(folder_id, (None, []))[1])
+
+    def files(self):
+        return _FakeFilesResource(self)
+
+    def mime_type(self, file_id):
+        return DOCX_MIME_TYPE if file_id in self.documents else FOLDER_MIME_TYPE
+
+    def metadata(self, file_id):
+        """Metadados no formato devolvido por `files().list` (id, name, mimeType, modifiedTime, md5Checksum)."""
+        if file_id not in self.documents:
+            return {"id": file_id, "name": self.folders[file_id][0], "mimeType": FOLDER_MIME_TYPE}
+        name, content = self.documents[file_id]
+        return {
+            "id": file_id,
+            "name": name,
+            "mimeType": DOCX_MIME_TYPE,
+            "modifiedTime": self.modified_times[file_id],
+            "md5Checksum": hashlib.md5(content).hexdigest(),
+        }
+
+    def update(self, file_id, content, modified_time):
+        """Simula a edição de um arquivo no Drive."""
+        if not isinstance(content, bytes):
+            content = build_docx_bytes(content)
+        self.documents[file_id] = (self.documents[file_id][0], content)
+        self.modified_times[file_id] = modified_time
+
+
+class FakeAPIError(Exception):
+    """
+    Falha simulada de uma chamada à API, com `status_code` e `response.headers`
+    como as exceções do cliente `openai` (ver `resilience.classify_error`).
+    """
+
+    def __init__(self, message, status_code=500, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class FakeOpenAIClient:
+    """
+    Cliente OpenAI falso: responde `chat.completions.create` com o JSON devolvido
+    por `responder(messages)` (por padrão, um registro vazio no formato esperado).
+    Cada chamada demora `latency` segundos e uma fração `error_rate` delas levanta
+    `FakeAPIError` (500). Com `max_concurrent`, chamadas além desse número de
+    simultâneas recebem 429 com `Retry-After: retry_after`, simulando a cota da conta.
+    """
+
+    def __init__(self, responder=None, latency=0, error_rate=0, seed=0, max_concurrent=None, retry_after=1):
+        self.responder = responder or (lambda messages: {"cliente": None, "eventos": []})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            throttled = self.max_concurrent is not None and self.in_flight > self.max_concurrent
+            if throttled:
+                self.rate_limited += 1
+                self.in_flight -= 1
+        if throttled:
+            raise FakeAPIError("limite de requisições simulado", status_code=429,
+                               headers={"retry-after": str(self.retry_after)})
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                failed = self.error_rate and self.random.random() < self.error_rate
+                if failed:
+                    self.errors += 1
+        if failed:
+            raise FakeAPIError("erro simulado da API da OpenAI")
+        content = json.dumps(self.responder(messages), ensure_ascii=False)
+        message = SimpleNamespace(role="assistant", content=content)
+        usage = _approximate_usage(messages, content)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(**usage),
+        )
+
+
+def _approximate_usage(messages, content):
+    """Contagem de tokens aproximada (4 caracteres por token), no formato do `usage` da API."""
+    prompt_tokens = sum(len(message.get("content") or "") for message in messages or []) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _default_responder(messages):
+    return {"cliente": None, "eventos": []}
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _LocalServer:
+    """Servidor HTTP numa porta livre de 127.0.0.1, rodando numa thread; `self` fica em `server.fake`."""
+
+    handler = None
+    base_path = ""
+
+    def __init__(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}{self.base_path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _BatchApiHandler(_JsonHandler):
+    server_version = "FakeOpenAI/1.0"
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        fake = self.server.fake
+        if self.path == "/v1/files":
+            # Upload multipart/form-data: só interessa a parte "file"
+            raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._read_body()
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(raw)
+            content, filename = b"", "lote.jsonl"
+            for part in message.iter_parts():
+                if part.get_param("name", header="content-disposition") == "file":
+                    content = part.get_payload(decode=True)
+                    filename = part.get_filename() or filename
+            self._send_json(fake.add_file(content, filename, purpose="batch"))
+        elif self.path == "/v1/batches":
+            self._send_json(fake.create_batch(json.loads(self._read_body())))
+        else:
+            self._send_json({"error": {"message": f"rota desconhecida: {self.path}"}}, status=404)
+
+    def do_GET(self):
+        fake = self.server.fake
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in fake.batches:
+            self._send_json(fake.retrieve_batch(parts[2]))
+        elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in fake.files:
+            content = fake.files[parts[2]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self._send_json({"error": {"message": f"rota desconhecida: {self.path}"}}, status=404)
+
+
+class FakeOpenAIBatchServer(_LocalServer):
+    """
+    Servidor HTTP local que imita as rotas da Batch API usadas pelo `batch_extraction.py`
+    (upload de arquivo, criação e consulta de lote, download do resultado).
+
+    Cada requisição do lote é respondida com `responder(messages)`; os custom_ids em
+    `failing_ids` recebem erro 500. O lote fica "in_progress" nas primeiras
+    `polls_until_done` consultas e depois "completed".
+    """
+
+    handler = _BatchApiHandler
+    base_path = "/v1"
+
+    def __init__(self, responder=None, failing_ids=(), polls_until_done=1):
+        super().__init__()
+        self.responder = responder or _default_responder
+        self.failing_ids = set(failing_ids)
+        self.polls_until_done = polls_until_done
+        self.files = {}
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_file(self, content, filename, purpose):
+        with self._lock:
+            file_id = f"file-{next(self._ids)}"
+        self.files[file_id] = {"content": content}
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, params):
+        output_lines, completed, failed = [], 0, 0
+        for line in self.files[params["input_file_id"]]["content"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if request["custom_id"] in self.failing_ids:
+                failed += 1
+                response = {"status_code": 500, "body": {"error": {"message": "erro simulado"}}}
+            else:
+                completed += 1
+                content = json.dumps(self.responder(request["body"]["messages"]), ensure_ascii=False)
+                response = {"status_code": 200, "body": {
+                    "object": "chat.completion",
+                    "model": request["body"].get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": _approximate_usage(request["body"]["messages"], content),
+                }}
+            output_lines.append(json.dumps({"id": f"req-{request['custom_id']}", "custom_id": request["custom_id"],
+                                            "response": response, "error": None}, ensure_ascii=False))
+        output = self.add_file("\n".join(output_lines).encode("utf-8"), "resultado.jsonl", purpose="batch_output")
+
+        with self._lock:
+            batch_id = f"batch-{next(self._ids)}"
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": params["endpoint"],
+            "input_file_id": params["input_file_id"], "completion_window": params["completion_window"],
+            "created_at": int(time.time()), "status": "validating", "output_file_id": None,
+            "metadata": params.get("metadata"),
+            "request_counts": {"total": completed + failed, "completed": 0, "failed": 0},
+            "_polls": 0, "_output_file_id": output["id"],
+            "_counts": {"total": completed + failed, "completed": completed, "failed": failed},
+        }
+        return self._public(self.batches[batch_id])
+
+    def retrieve_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["_polls"] += 1
+        if batch["_polls"] > self.polls_until_done:
+            batch["status"] = "completed"
+            batch["output_file_id"] = batch["_output_file_id"]
+            batch["request_counts"] = batch["_counts"]
+        else:
+            batch["status"] = "in_progress"
+        return self._public(batch)
+
+    @staticmethod
+    def _public(batch):
+        return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+
+class _BrasilAPIHandler(_JsonHandler):
+    server_version = "FakeBrasilAPI/1.0"
+
+    def do_GET(self):
+        fake = self.server.fake
+        cnpj = self.path.rstrip("/").rsplit("/", 1)[-1]
+        status, payload, headers = fake.respond(cnpj)
+        self._send_json(payload, status=status, headers=headers)
+
+
+class FakeBrasilAPIServer(_LocalServer):
+    """
+    Imita `GET /api/cnpj/v1/{cnpj}` da BrasilAPI: 200 com os dados de `companies`
+    ou 404. Com `requests_per_minute`, requisições acima da cota (janela deslizante
+    de 60s) recebem 429 com Retry-After. `requests` conta as chamadas por CNPJ.
+    Cada resposta demora `latency` segundos e uma fração `error_rate` delas é um 500.
+    """
+
+    handler = _BrasilAPIHandler
+    base_path = "/api/cnpj/v1"
+
+    def __init__(self, companies=None, requests_per_minute=None, latency=0, error_rate=0, seed=0):
+        super().__init__()
+        self.companies = companies or {}
+        self.requests_per_minute = requests_per_minute
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.throttled = 0
+        self.errors = 0
+        self._recent = []
+        self._lock = threading.Lock()
+
+    def respond(self, cnpj):
+        with self._lock:
+            self.requests[cnpj] = self.requests.get(cnpj, 0) + 1
+            now = time.monotonic()
+            self._recent = [moment for moment in self._recent if now - moment < 60]
+            if self.requests_per_minute and len(self._recent) >= self.requests_per_minute:
+                self.throttled += 1
+                retry_after = 60 - (now - self._recent[0])
+                return 429, {"message": "Too Many Requests"}, {"Retry-After": f"{retry_after:.2f}"}
+            self._recent.append(now)
+            failed = self.error_rate and self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 500, {"message": "Erro interno simulado."}, {}
+        if cnpj in self.companies:
+            return 200, dict(self.companies[cnpj], cnpj=cnpj), {}
+        return 404, {"message": f"CNPJ {cnpj} não encontrado."}, {}
@@ -1,15 +1,34 @@
+import argparse
+import hashlib
 import json
 import sqlite3
-import requests
 import time
 import os
+import sys
+
+from booking_conflicts import find_conflicts, print_conflicts
+from client_classifier import ClientClassifier
+from entity_resolution import ClientResolver, normalize_document
+from jsonl_io import iter_records, resolve_data_file
+from metrics import metrics
 
 # Altere para "sistemacipt.db" para a importação final
 DB_PATH = "sistemacipt_teste.db" 
-SOURCE_FILE = "dados_prontos_para_importar.json"
+SOURCE_FILE = "dados_prontos_para_importar.jsonl"
+# Migrações aplicadas automaticamente quando o banco ainda não as tem:
+# colunas de origem dos eventos (id do arquivo no Drive, posição e hash), usadas pelo modo incremental,
+# índices + tabela normalizada de datas (Eventos_Datas) com os gatilhos que a mantêm,
+# e o documento normalizado dos clientes
+ORIGIN_MIGRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eventos_origem.sql")
+DATES_MIGRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eventos_datas.sql")
+CLIENTS_MIGRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clientes_documento.sql")
+DATES_SCHEMA_OBJECTS = {"Eventos_Datas", "trg_eventos_datas_ins", "trg_eventos_datas_upd", "trg_eventos_datas_del"}
+# Mensagem do SQLite quando o índice único ux_eventos_origem (eventos_origem.sql) é violado
+ORIGIN_UNIQUE_ERROR = "UNIQUE constraint failed: Eventos.id_arquivo_drive, Eventos.indice_evento"
 
 def enrich_data_from_cnpj(cnpj):
     """Busca dados adicionais de um CNPJ usando a BrasilAPI."""
+    import requests
     if not cnpj or not isinstance(cnpj, str): return None
     cleaned_cnpj = "".join(filter(str.isdigit, cnpj))
     if len(cleaned_cnpj) != 14: return None
@@ -23,161 +42,420 @@ def enrich_data_from_cnpj(cnpj):
         print(f"    -> Erro ao consultar a API para o CNPJ {cleaned_cnpj}: {e}")
         return None
 
-def import_final_data():
-    """Lê os dados finais, aplica regras e os importa para o banco de dados."""
-    
-    if not os.path.exists(SOURCE_FILE):
-        print(f"Erro: Arquivo de dados '{SOURCE_FILE}' não encontrado.")
-        return
+# Registros acumulados antes de cada executemany
+BATCH_SIZE = 5000
+# Ajustes do SQLite para a carga em massa (WAL, fsync só no commit do WAL, cache de 64 MB)
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+)
+
+CLIENT_COLUMNS = ("id", "nome_razao_social", "tipo_pessoa", "documento", "nome_responsavel", "tipo_cliente",
+                  "cep", "logradouro", "numero", "complemento", "bairro", "cidade", "uf", "documento_norm")
+EVENT_DATA_COLUMNS = ("id_cliente", "nome_evento", "datas_evento", "total_diarias", "valor_bruto",
+                 "valor_final", "status", "data_vigencia_final", "numero_processo", "numero_termo",
+                 "espaco_utilizado", "numero_oficio_sei", "hora_inicio", "hora_fim", "tipo_desconto_auto")
+EVENT_ORIGIN_COLUMNS = ("id_arquivo_drive", "indice_evento", "hash_conteudo")
+EVENT_COLUMNS = ("id",) + EVENT_DATA_COLUMNS + EVENT_ORIGIN_COLUMNS
+# Na atualização de um evento já importado, o status (pagamento) é mantido como está no sistema
+EVENT_UPDATE_COLUMNS = tuple(column for column in EVENT_DATA_COLUMNS if column != "status") + ("hash_conteudo",)
+
+def _insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+INSERT_CLIENT_SQL = _insert_sql("Clientes_Eventos", CLIENT_COLUMNS)
+INSERT_EVENT_SQL = _insert_sql("Eventos", EVENT_COLUMNS)
+UPSERT_EVENT_SQL = (
+    INSERT_EVENT_SQL
+    + " ON CONFLICT(id_arquivo_drive, indice_evento) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in EVENT_UPDATE_COLUMNS)
+)
+
+def classify_client(client_data, classifier):
+    """Aplica as regras de negócio de um cliente novo: tipo de cliente (ver client_classifier.py) e responsável."""
+    client_data['tipo_cliente'] = classifier.classify(client_data.get('documento'), client_data.get('nome_razao_social'))
+
+    if client_data.get('tipo_pessoa') == 'PF' and not client_data.get('nome_responsavel'):
+         client_data['nome_responsavel'] = client_data.get('nome_razao_social')
+
+    if client_data.get('tipo_pessoa') == 'PJ' and not client_data.get('nome_responsavel'):
+        if client_data.get('nome_razao_social') and 2 <= len(client_data['nome_razao_social'].split()) <= 4:
+            client_data['nome_responsavel'] = client_data['nome_razao_social']
+
+def build_client_row(client_id, client_data):
+    return (
+        client_id,
+        client_data.get('nome_razao_social_oficial') or client_data.get('nome_razao_social'),
+        client_data.get('tipo_pessoa'), client_data.get('documento'),
+        client_data.get('nome_responsavel'), client_data.get('tipo_cliente', 'Geral'),
+        client_data.get('cep'), client_data.get('logradouro'), client_data.get('numero'),
+        client_data.get('complemento'), client_data.get('bairro'), client_data.get('cidade'),
+        client_data.get('uf'), normalize_document(client_data.get('documento'))
+    )
+
+def build_event_row(client_id, evento, tipo_cliente):
+    valor_final = evento.get('valor_final')
+    if valor_final is None: valor_final = 0.0
+
+    desconto_percentual = 0.0
+    if tipo_cliente == 'Governo': desconto_percentual = 0.20
+    elif tipo_cliente == 'Permissionario': desconto_percentual = 0.60
+
+    valor_bruto = 0.0
+    if valor_final > 0:
+        valor_bruto = valor_final / (1 - desconto_percentual) if desconto_percentual > 0 else valor_final
+
+    return (
+        client_id, evento.get('nome_evento'), json.dumps(evento.get('datas_evento')),
+        len(evento.get('datas_evento', [])), round(valor_bruto, 2), valor_final,
+        'Pendente', evento.get('data_vigencia_final'),
+        evento.get('numero_processo'), evento.get('numero_termo'),
+        evento.get('espaco_utilizado'), evento.get('numero_oficio_sei'),
+        evento.get('hora_inicio'), evento.get('hora_fim'),
+        tipo_cliente if desconto_percentual > 0 else "Nenhum"
+    )
 
-    with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-        all_data = json.load(f)
+def content_hash(row):
+    """SHA-256 dos valores gravados de um evento: muda sempre que algum campo extraído mudar."""
+    return hashlib.sha256(json.dumps(row, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def client_row_problem(row):
+    """Motivo pelo qual a linha violaria as restrições de Clientes_Eventos (None se está ok)."""
+    if not row[1]:
+        return "nome_razao_social ausente"
+    if row[2] not in ('PF', 'PJ'):
+        return f"tipo_pessoa inválido ({row[2]!r})"
+    return None
+
+def event_row_problem(row):
+    """Motivo pelo qual a linha violaria as restrições de Eventos (None se está ok)."""
+    if not row[1]:
+        return "nome_evento ausente"
+    return None
+
+def _next_id(cursor, table):
+    """Próximo id de uma tabela AUTOINCREMENT, como o SQLite o atribuiria."""
+    max_id = cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    return max(max_id, seq[0] if seq else 0) + 1
+
+def _apply_migration(cursor, path, description):
+    print(f"Aplicando a migração '{os.path.basename(path)}' ({description})...")
+    with open(path, 'r', encoding='utf-8') as f:
+        cursor.executescript(f.read())
+
+def sync_document_norm(cursor):
+    """
+    Acerta a coluna documento_norm de Clientes_Eventos com `normalize_document`: clientes
+    cadastrados ou alterados pelo sistema web a têm vazia ou desatualizada. Clientes já
+    cadastrados em duplicidade (mesmo documento com outra pontuação): só o mais antigo
+    fica com o documento normalizado; os demais ficam com NULL, para revisão
+    (python entity_resolution.py lista os grupos). Retorna (alterados, repetidos).
+    """
+    owners = {}
+    changes = []
+    repeated = 0
+    for client_id, documento, current in cursor.execute(
+            "SELECT id, documento, documento_norm FROM Clientes_Eventos ORDER BY id").fetchall():
+        norm = normalize_document(documento)
+        if norm and owners.setdefault(norm, client_id) != client_id:
+            norm = None
+            repeated += 1
+        if norm != current:
+            changes.append((norm, client_id))
+    if not changes:
+        return 0, repeated
+    own_transaction = not cursor.connection.in_transaction
+    if own_transaction:
+        cursor.execute("BEGIN")
+    # Os que perdem o documento normalizado o liberam antes de ele ir para outro cliente (índice único)
+    cursor.executemany("UPDATE Clientes_Eventos SET documento_norm = NULL WHERE id = ?",
+                       [(client_id,) for _, client_id in changes])
+    cursor.executemany("UPDATE Clientes_Eventos SET documento_norm = ? WHERE id = ?",
+                       [change for change in changes if change[0] is not None])
+    if own_transaction:
+        cursor.execute("COMMIT")
+    return len(changes), repeated
+
+def ensure_schema(cursor):
+    """
+    Aplica as migrações `eventos_origem.sql`, `eventos_datas.sql` e `clientes_documento.sql`
+    que o banco ainda não tiver, e acerta o documento normalizado dos clientes.
+    """
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(Eventos)")}
+    if "id_arquivo_drive" not in columns:
+        _apply_migration(cursor, ORIGIN_MIGRATION_FILE, "colunas de origem dos eventos")
+    names = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    if not DATES_SCHEMA_OBJECTS <= names:
+        _apply_migration(cursor, DATES_MIGRATION_FILE, "índices, tabela Eventos_Datas e gatilhos")
+    client_columns = {row[1] for row in cursor.execute("PRAGMA table_info(Clientes_Eventos)")}
+    if "documento_norm" not in client_columns:
+        _apply_migration(cursor, CLIENTS_MIGRATION_FILE, "documento normalizado dos clientes")
+    updated, repeated = sync_document_norm(cursor)
+    if updated and repeated:
+        print(f"{repeated} cliente(s) com documento repetido (em outro formato) ficaram sem documento_norm; "
+              "veja `python entity_resolution.py`.")
+
+def import_final_data(db_path=DB_PATH, source_file=SOURCE_FILE, batch_size=BATCH_SIZE, verbose=True,
+                      incremental=False):
+    """
+    Lê os dados finais, aplica regras e os importa para o banco de dados.
+
+    Os clientes já cadastrados são lidos numa única consulta e identificados pelo
+    documento normalizado (só dígitos, coluna documento_norm); um registro sem documento
+    é ligado ao cliente de nome mais parecido, se houver (ver entity_resolution.py); clientes e eventos
+    novos são inseridos em lotes com `executemany`, com ids atribuídos aqui, dentro
+    de uma única transação: se algo falhar no banco, nada é gravado.
+    Registros que violariam as restrições das tabelas são ignorados e relatados.
+
+    Cada evento guarda o id do arquivo no Drive, sua posição no termo e o hash do
+    conteúdo. Com `incremental`, a importação pode ser repetida sobre o mesmo banco:
+    eventos com hash inalterado são pulados, os alterados são atualizados no lugar
+    (`INSERT ... ON CONFLICT`, preservando o status) e só os novos são inseridos.
+    As datas de cada evento gravado vão para a tabela Eventos_Datas pelos gatilhos de
+    `eventos_datas.sql`.
+
+    Registros do mesmo grupo de termos quase idênticos (`grupo_similar`, ver
+    near_duplicates.py) são relatados juntos quando algum deles é ignorado: o problema
+    de uma cópia costuma se repetir nas demais.
+
+    Antes do commit, os eventos gravados são conferidos contra todos os do banco e o
+    relatório lista os que reservam o mesmo espaço em horários sobrepostos (ver
+    booking_conflicts.py); os conflitos são só relatados, não impedem a importação.
+    """
+    source_file = resolve_data_file(source_file)
+    if not os.path.exists(source_file):
+        print(f"Erro: Arquivo de dados '{source_file}' não encontrado.")
+        return
 
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(db_path, isolation_level=None)
         cursor = conn.cursor()
-        print(f"Conexão com o banco de dados '{DB_PATH}' estabelecida.")
+        for pragma in BULK_PRAGMAS:
+            cursor.execute(pragma)
+        ensure_schema(cursor)
+        print(f"Conexão com o banco de dados '{db_path}' estabelecida.")
     except sqlite3.Error as e:
         print(f"Erro fatal ao conectar ao banco de dados: {e}")
         return
 
     clients_imported = 0
     clients_found = 0
+    clients_matched_by_name = 0
     events_imported = 0
+    events_updated = 0
+    events_unchanged = 0
+    stale_events = []
     records_skipped = []
-    
-    permissionario_cnpjs = ["01703922000128", "03370669000163", "04007216000130", "05314972000174", "05301393000197", "06935095000111", "08911934000197", "09584747000109", "10771790000162", "10882812000161", "12439637000168", "12257462000178", "13055903000111", "14876384000115", "16918665000119", "21950824000100", "22080376000196", "28207096000182", "29500928000117", "30441031000220", "31639572000149", "32860087000163", "37432689000133", "40411089000101", "43150497000137", "46731465000113"]
-    keywords_governo = ["UNIVERSIDADE FEDERAL", "UFAL", "IFAL", "SECRETARIA DE ESTADO", "SESAU", "SENAI", "SEBRAE", "SENAC", "SESI", "FEPESA", "FUNDEPES", "OAB", "CRA/AL", "ASSEMBLEIA LEGISLATIVA"]
-
-    for i, record in enumerate(all_data):
-        client_data = record.get('cliente')
-        event_list = record.get('eventos')
-        
-        print(f"\n[ Processando registro {i+1}/{len(all_data)} ] Arquivo: {record.get('arquivo_origem')}")
-
-        if not client_data or not client_data.get('documento'):
-            print("    - IGNORADO: Registro de modelo ou sem documento.")
-            records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': 'Modelo ou sem documento'})
-            continue
-            
-        # --- LÓGICA DE CLIENTE: ENCONTRAR OU CRIAR ---
-        client_id = None
-        doc_cliente = client_data.get('documento')
-        
-        cursor.execute("SELECT id FROM Clientes_Eventos WHERE documento = ?", (doc_cliente,))
-        existing_client = cursor.fetchone()
-        
-        if existing_client:
-            client_id = existing_client[0]
-            clients_found += 1
-            print(f"    -> Cliente com documento '{doc_cliente}' já existe (ID: {client_id}). Usando cliente existente.")
-        else:
-            # --- Aplica regras de negócio apenas para clientes novos ---
-            tipo_cliente = "Geral"
-            doc_cliente_clean = "".join(filter(str.isdigit, doc_cliente))
-            if doc_cliente_clean in permissionario_cnpjs:
-                tipo_cliente = "Permissionario"
+    # grupo de quase idênticos -> arquivos dos registros do grupo
+    similar_groups = {}
+    booking_conflicts = []
+    # Ids dos eventos inseridos ou atualizados nesta importação
+    written_event_ids = set()
+    total_records = 0
+
+    client_rows = []
+    event_rows = []
+
+    def _flush():
+        metrics.count("sqlite_insert.linhas", len(client_rows) + len(event_rows))
+        with metrics.timer("sqlite_insert"):
+            cursor.executemany(INSERT_CLIENT_SQL, client_rows)
+            cursor.executemany(UPSERT_EVENT_SQL if incremental else INSERT_EVENT_SQL, event_rows)
+        for rows in (client_rows, event_rows):
+            rows.clear()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Todos os clientes já cadastrados, em blocos por documento normalizado e por nome
+        resolver = ClientResolver.from_db(cursor)
+        client_types = dict(cursor.execute("SELECT id, tipo_cliente FROM Clientes_Eventos"))
+        next_client_id = _next_id(cursor, "Clientes_Eventos")
+        # CNPJs de permissionários lidos do próprio banco, uma vez por importação
+        classifier = ClientClassifier.from_db(cursor)
+        next_event_id = _next_id(cursor, "Eventos")
+        # (arquivo do Drive, posição do evento) -> (id, hash) dos eventos já importados
+        existing_events = {}
+        events_per_file = {}
+        if incremental:
+            for event_id, file_id, index, row_hash in cursor.execute(
+                "SELECT id, id_arquivo_drive, indice_evento, hash_conteudo FROM Eventos WHERE id_arquivo_drive IS NOT NULL"
+            ):
+                existing_events[(file_id, index)] = (event_id, row_hash)
+                events_per_file[file_id] = max(events_per_file.get(file_id, 0), index + 1)
+
+        # Lê os registros um a um, sem carregar o arquivo inteiro na memória
+        for i, record in enumerate(iter_records(source_file)):
+            total_records += 1
+            client_data = record.get('cliente')
+            event_list = record.get('eventos')
+            if verbose:
+                print(f"\n[ Processando registro {i+1} ] Arquivo: {record.get('arquivo_origem')}")
+            if record.get('grupo_similar'):
+                similar_groups.setdefault(record['grupo_similar'], []).append(record.get('arquivo_origem'))
+
+            if not client_data:
+                if verbose:
+                    print("    - IGNORADO: Registro de modelo ou sem cliente.")
+                records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': 'Modelo ou sem cliente'})
+                continue
+            file_id = record.get('id_arquivo_drive')
+            if incremental and not file_id:
+                # Sem a origem não há como saber se os eventos já foram importados
+                records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': 'Sem id_arquivo_drive (modo incremental)'})
+                continue
+
+            # --- LÓGICA DE CLIENTE: ENCONTRAR OU CRIAR ---
+            doc_cliente = client_data.get('documento')
+            client_id, match_reason = resolver.resolve(doc_cliente, client_data.get('nome_razao_social'))
+            if client_id:
+                # O desconto dos eventos segue o tipo já cadastrado do cliente, para que
+                # reimportar o mesmo termo produza exatamente as mesmas linhas
+                client_data['tipo_cliente'] = client_types[client_id]
+                clients_found += 1
+                if match_reason == "nome":
+                    clients_matched_by_name += 1
+                    if verbose:
+                        print(f"    -> Registro sem documento ligado pelo nome ao cliente ID {client_id}.")
+                elif verbose:
+                    print(f"    -> Cliente com documento '{doc_cliente}' já existe (ID: {client_id}). Usando cliente existente.")
+            elif not normalize_document(doc_cliente):
+                if verbose:
+                    print("    - IGNORADO: Registro sem documento e sem cliente de nome correspondente.")
+                records_skipped.append({'arquivo': record.get('arquivo_origem'),
+                                        'motivo': 'Sem documento e sem cliente de nome correspondente'})
+                continue
             else:
-                nome_cliente_raw = client_data.get('nome_razao_social', '')
-                for keyword in keywords_governo:
-                    if keyword in nome_cliente_raw.upper():
-                        tipo_cliente = "Governo"
-                        break
-            client_data['tipo_cliente'] = tipo_cliente
-            
-            if client_data.get('tipo_pessoa') == 'PJ':
-                # (A etapa de enriquecimento já foi feita no script anterior, aqui só usamos os dados)
-                pass
-
-            if client_data.get('tipo_pessoa') == 'PF' and not client_data.get('nome_responsavel'):
-                 client_data['nome_responsavel'] = client_data.get('nome_razao_social')
-
-            if client_data.get('tipo_pessoa') == 'PJ' and not client_data.get('nome_responsavel'):
-                if client_data.get('nome_razao_social') and 2 <= len(client_data['nome_razao_social'].split()) <= 4:
-                    client_data['nome_responsavel'] = client_data['nome_razao_social']
-            
-            try:
-                cursor.execute("""
-                    INSERT INTO Clientes_Eventos (
-                        nome_razao_social, tipo_pessoa, documento, nome_responsavel, tipo_cliente,
-                        cep, logradouro, numero, complemento, bairro, cidade, uf
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    client_data.get('nome_razao_social_oficial') or client_data.get('nome_razao_social'),
-                    client_data.get('tipo_pessoa'), client_data.get('documento'),
-                    client_data.get('nome_responsavel'), client_data.get('tipo_cliente', 'Geral'),
-                    client_data.get('cep'), client_data.get('logradouro'), client_data.get('numero'),
-                    client_data.get('complemento'), client_data.get('bairro'), client_data.get('cidade'),
-                    client_data.get('uf')
-                ))
-                client_id = cursor.lastrowid
+                # --- Aplica regras de negócio apenas para clientes novos ---
+                classify_client(client_data, classifier)
+                row = build_client_row(next_client_id, client_data)
+                problem = client_row_problem(row)
+                if problem:
+                    if verbose:
+                        print(f"    - ERRO GRAVE ao inserir novo cliente: {problem}")
+                    records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': f"Cliente inválido: {problem}"})
+                    continue
+                client_id = next_client_id
+                next_client_id += 1
+                resolver.add(client_id, doc_cliente, client_data.get('nome_razao_social'))
+                client_types[client_id] = client_data['tipo_cliente']
+                client_rows.append(row)
                 clients_imported += 1
-                print(f"    -> NOVO Cliente '{client_data.get('nome_razao_social')}' importado com ID: {client_id}.")
-            except sqlite3.Error as e:
-                print(f"    - ERRO GRAVE ao inserir novo cliente: {e}")
-                records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': f"Erro no DB ao inserir cliente: {e}"})
-                continue
-        
-        # --- INSERÇÃO DOS EVENTOS (VINCULADOS AO CLIENTE NOVO OU EXISTENTE) ---
-        if client_id and event_list:
-            tipo_cliente = client_data.get('tipo_cliente', 'Geral')
-            try:
-                for evento in event_list:
-                    valor_final = evento.get('valor_final')
-                    if valor_final is None: valor_final = 0.0
-
-                    desconto_percentual = 0.0
-                    if tipo_cliente == 'Governo': desconto_percentual = 0.20
-                    elif tipo_cliente == 'Permissionario': desconto_percentual = 0.60
-                    
-                    valor_bruto = 0.0
-                    if valor_final > 0:
-                        valor_bruto = valor_final / (1 - desconto_percentual) if desconto_percentual > 0 else valor_final
-                    
-                    cursor.execute("""
-                        INSERT INTO Eventos (
-                            id_cliente, nome_evento, datas_evento, total_diarias, valor_bruto, 
-                            valor_final, status, data_vigencia_final, numero_processo, numero_termo,
-                            espaco_utilizado, numero_oficio_sei, hora_inicio, hora_fim, tipo_desconto_auto
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        client_id, evento.get('nome_evento'), json.dumps(evento.get('datas_evento')),
-                        len(evento.get('datas_evento', [])), round(valor_bruto, 2), valor_final,
-                        'Pendente', evento.get('data_vigencia_final'), 
-                        evento.get('numero_processo'), evento.get('numero_termo'),
-                        evento.get('espaco_utilizado'), evento.get('numero_oficio_sei'),
-                        evento.get('hora_inicio'), evento.get('hora_fim'), 
-                        tipo_cliente if desconto_percentual > 0 else "Nenhum"
-                    ))
-                    events_imported += 1
-                print(f"    -> {len(event_list)} evento(s) associado(s) ao cliente ID {client_id} importado(s).")
-            except sqlite3.Error as e:
-                print(f"    - ERRO GRAVE ao inserir evento para o cliente ID {client_id}: {e}")
-                records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': f"Erro no DB ao inserir evento: {e}"})
-
-    conn.commit()
+                if verbose:
+                    print(f"    -> NOVO Cliente '{client_data.get('nome_razao_social')}' importado com ID: {client_id}.")
+
+            # --- INSERÇÃO DOS EVENTOS (VINCULADOS AO CLIENTE NOVO OU EXISTENTE) ---
+            if event_list:
+                tipo_cliente = client_data.get('tipo_cliente', 'Geral')
+                for index, evento in enumerate(event_list):
+                    row = build_event_row(client_id, evento, tipo_cliente)
+                    problem = event_row_problem(row)
+                    if problem:
+                        records_skipped.append({'arquivo': record.get('arquivo_origem'), 'motivo': f"Evento inválido: {problem}"})
+                        continue
+                    row_hash = content_hash(row)
+                    event_id, previous_hash = existing_events.get((file_id, index), (None, None))
+                    if previous_hash == row_hash:
+                        events_unchanged += 1
+                        continue
+                    if event_id is None:
+                        event_id = next_event_id
+                        next_event_id += 1
+                        events_imported += 1
+                    else:
+                        events_updated += 1
+                    event_rows.append((event_id,) + row + (file_id, index, row_hash))
+                    written_event_ids.add(event_id)
+                if verbose:
+                    print(f"    -> {len(event_list)} evento(s) associado(s) ao cliente ID {client_id} na fila de importação.")
+            # O termo passou a ter menos eventos do que os já importados dele
+            for index in range(len(event_list or []), events_per_file.get(file_id, 0)):
+                stale_events.append((record.get('arquivo_origem'), index))
+
+            if len(client_rows) + len(event_rows) >= batch_size:
+                _flush()
+
+        _flush()
+        if written_event_ids:
+            with metrics.timer("conflitos_reserva"):
+                booking_conflicts = find_conflicts(cursor, written_event_ids)
+        metrics.count("conflitos_reserva", len(booking_conflicts))
+        with metrics.timer("sqlite_commit"):
+            cursor.execute("COMMIT")
+    except sqlite3.Error as e:
+        conn.rollback()
+        conn.close()
+        print(f"\nERRO GRAVE no banco de dados; a importação foi desfeita por completo: {e}")
+        # Só a violação de ux_eventos_origem indica termos já importados; outras restrições ficam na mensagem acima
+        if isinstance(e, sqlite3.IntegrityError) and not incremental and ORIGIN_UNIQUE_ERROR in str(e):
+            print("Os eventos desses termos já foram importados; use --incremental para reimportar sobre este banco.")
+        return
     conn.close()
 
     print("\n\n--- RELATÓRIO FINAL DA IMPORTAÇÃO ---")
-    print(f"Total de documentos processados: {len(all_data)}")
+    print(f"Total de documentos processados: {total_records}")
     print(f"Clientes novos criados: {clients_imported}")
     print(f"Clientes existentes reutilizados: {clients_found}")
+    if clients_matched_by_name:
+        print(f"  ... dos quais reconhecidos pelo nome (registro sem documento): {clients_matched_by_name}")
     print(f"Eventos novos importados: {events_imported}")
-    
+    if incremental:
+        print(f"Eventos atualizados: {events_updated}")
+        print(f"Eventos inalterados (pulados): {events_unchanged}")
+        if stale_events:
+            print(f"\n--- Eventos que não constam mais nos termos ({len(stale_events)}); revise-os manualmente ---")
+            for arquivo, index in stale_events:
+                print(f"- Arquivo: {arquivo} | Evento nº {index + 1}")
+
+    if booking_conflicts:
+        print(f"\n--- Conflitos de reserva: mesmo espaço em horários sobrepostos ({len(booking_conflicts)}) ---")
+        print_conflicts(booking_conflicts)
+
     if records_skipped:
         print(f"\n--- Relatório de Registros Ignorados ({len(records_skipped)}) ---")
         for skipped in records_skipped:
             print(f"- Arquivo: {skipped['arquivo']} | Motivo: {skipped['motivo']}")
 
+        skipped_files = {skipped['arquivo'] for skipped in records_skipped}
+        groups_to_review = [files for files in similar_groups.values()
+                            if len(files) > 1 and skipped_files.intersection(files)]
+        if groups_to_review:
+            print(f"\n--- Grupos de termos quase idênticos com registros ignorados ({len(groups_to_review)}); "
+                  "revise o grupo inteiro ---")
+            for files in groups_to_review:
+                print(f"- {len(files)} termos: {', '.join(str(arquivo) for arquivo in files)}")
+
     print("\n✨ Processo de importação concluído! ✨")
 
 
-if __name__ == "__main__":
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py import`)."""
+    parser.add_argument("--incremental", action="store_true",
+                        help="Não limpa o banco: insere eventos novos, atualiza os alterados e pula os inalterados.")
+    parser.add_argument("--validar", action="store_true",
+                        help="Valida os dados antes (ver validate_data.py) e não importa se forem reprovados.")
+    parser.add_argument("--tolerancia", type=float, default=0.0,
+                        help="Com --validar, fração de falhas aceita nas regras de severidade 'erro'.")
+
+
+def run_cli(args):
+    """Valida (com --validar), pede confirmação e importa os dados para DB_PATH."""
+    if args.validar:
+        from validate_data import validate_data
+        report = validate_data(SOURCE_FILE, tolerance=args.tolerancia)
+        if not report or not report["aprovado"]:
+            print("Importação cancelada: os dados não passaram na validação.")
+            sys.exit(1)
+
     if os.path.exists(DB_PATH):
-        if DB_PATH == "sistemacipt_teste.db":
+        if DB_PATH == "sistemacipt_teste.db" and not args.incremental:
              print("Limpando banco de dados de teste para uma nova importação...")
              conn = sqlite3.connect(DB_PATH)
              cursor = conn.cursor()
+             if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'Eventos_Datas'").fetchone():
+                 cursor.execute("DELETE FROM Eventos_Datas;")
              cursor.execute("DELETE FROM Eventos;")
              cursor.execute("DELETE FROM Clientes_Eventos;")
              cursor.execute("DELETE FROM sqlite_sequence WHERE name='Eventos';")
@@ -188,8 +466,15 @@ if __name__ == "__main__":
 
         confirm = input(f"Este script irá modificar o banco de dados '{DB_PATH}'.\nVocê fez um backup? Deseja continuar? (s/n): ")
         if confirm.lower() == 's':
-            import_final_data()
+            import_final_data(incremental=args.incremental)
+            metrics.write_run("import_to_db")
         else:
             print("Importação cancelada pelo usuário.")
     else:
-        print(f"Erro: Banco de dados '{DB_PATH}' não encontrado no diretório.")
\ No newline at end of file
+        print(f"Erro: Banco de dados '{DB_PATH}' não encontrado no diretório.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa os dados revisados para o banco do sistema.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
@@ -0,0 +1,149 @@
+"""
+Leitura e escrita incremental dos arquivos de dados no formato JSON Lines (um registro por linha).
+
+Os scripts leem os registros um a um com `iter_records`, sem carregar o arquivo inteiro.
+Arquivos antigos no formato de lista JSON (`[ {...}, ... ]`) continuam sendo aceitos.
+"""
+import json
+import os
+
+
+def resolve_data_file(path):
+    """
+    Retorna `path` se existir; senão, o arquivo `.json` equivalente do formato
+    antigo (ex.: `dados_extraidos_openai.json` no lugar de `.jsonl`), se houver.
+    """
+    if os.path.exists(path) or not path.endswith('.jsonl'):
+        return path
+    legacy_path = path[:-len('.jsonl')] + '.json'
+    if os.path.exists(legacy_path):
+        print(f"Aviso: '{path}' não encontrado; usando o arquivo no formato antigo '{legacy_path}'.")
+        return legacy_path
+    return path
+
+
+def _is_legacy_json_array(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                return char == '['
+
+
+def iter_records(path):
+    """
+    Percorre os registros de `path` sem carregá-los todos na memória.
+    Uma última linha truncada (processo interrompido no meio da escrita) é ignorada com aviso.
+    """
+    if _is_legacy_json_array(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if not line.endswith('\n'):
+                    print(f"AVISO: última linha de '{path}' está incompleta e foi ignorada.")
+                    return
+                raise ValueError(f"Linha {line_number} de '{path}' não é um JSON válido.")
+            yield record
+
+
+def read_written_ids(path, key='id_arquivo_drive'):
+    """Conjunto dos ids já gravados em `path` (vazio se o arquivo não existir)."""
+    if not os.path.exists(path):
+        return set()
+    return {record.get(key) for record in iter_records(path)}
+
+
+def _drop_incomplete_tail(path):
+    """Remove uma última linha sem '\\n' (escrita interrompida) antes de continuar o arquivo."""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # Procura o último '\n' de trás para frente, em blocos
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+
+class JsonlWriter:
+    """
+    Acrescenta registros a um arquivo JSON Lines à medida que ficam prontos.
+
+    Cada `write` vai para o disco imediatamente (flush); a cada `checkpoint_every`
+    registros é feito um `fsync`, garantindo que um travamento perca no máximo o
+    último bloco. `checkpoint()` pode ser chamado a qualquer momento.
+    """
+
+    def __init__(self, path, append=False, checkpoint_every=20):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.written = 0
+        self._since_checkpoint = 0
+        if append and os.path.exists(path):
+            _drop_incomplete_tail(path)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record):
+        """Grava um registro; retorna True quando um checkpoint acabou de ser feito."""
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+        self._file.flush()
+        self.written += 1
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+            return True
+        return False
+
+    def checkpoint(self):
+        """Força os dados gravados até aqui para o disco."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_checkpoint = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def rewrite_filtered(path, keep, key='id_arquivo_drive'):
+    """
+    Regrava `path` (em streaming e de forma atômica) mantendo apenas os registros
+    para os quais `keep(record)` é verdadeiro. Retorna os ids (`key`) mantidos.
+    """
+    kept_ids = set()
+    tmp_path = f"{path}.tmp"
+    with JsonlWriter(tmp_path, checkpoint_every=1000) as writer:
+        for record in iter_records(path):
+            if keep(record):
+                writer.write(record)
+                kept_ids.add(record.get(key))
+    os.replace(tmp_path, path)
+    return kept_ids
@@ -0,0 +1,113 @@
+"""
+Vários termos numa mesma chamada à IA.
+
+O prompt de sistema e a estrutura JSON ocupam boa parte de cada requisição e se
+repetem para todo termo; juntando alguns documentos (até um orçamento de tokens do
+texto) numa só requisição, esse custo fixo e a latência de ida e volta são divididos
+entre eles.
+
+`DocumentBatcher` recebe os documentos das threads que chamam a IA e os agrupa:
+um lote é enviado quando atinge `max_documents`, quando o próximo documento passaria
+do orçamento de tokens ou quando o mais antigo já esperou `max_wait` segundos. Quem
+chama `extract` fica bloqueado até a resposta do seu lote:
+
+    batcher = DocumentBatcher(send_batch)
+    data = batcher.extract(text, file_name)
+
+`send_batch([(file_name, text), ...])` faz a chamada e devolve uma lista alinhada com
+a entrada (None para os documentos que falharam). A resposta da IA é um objeto
+{"documentos": [{"documento": 1, ...}, ...]}; `parse_batch_response` a confere e
+devolve só os itens válidos, para que os que faltarem sejam refeitos um a um.
+"""
+import json
+import os
+import threading
+
+from prompt_budget import count_tokens
+
+MULTI_DOC_MAX_DOCUMENTS = int(os.getenv("MULTI_DOC_MAX_DOCUMENTS", "8"))
+# Tokens de texto dos documentos por requisição (o prompt fixo não entra na conta)
+MULTI_DOC_TOKEN_BUDGET = int(os.getenv("MULTI_DOC_TOKEN_BUDGET", "12000"))
+MULTI_DOC_MAX_WAIT_SECONDS = float(os.getenv("MULTI_DOC_MAX_WAIT_SECONDS", "2"))
+
+BATCH_KEY = "documentos"
+INDEX_KEY = "documento"
+
+
+def parse_batch_response(content, count):
+    """
+    Lista com `count` posições: o dicionário extraído para cada documento (numerados
+    a partir de 1 no prompt) ou None se ele faltar ou vier malformado. Um JSON
+    inválido levanta `json.JSONDecodeError`.
+    """
+    data = json.loads(content)
+    items = data.get(BATCH_KEY) if isinstance(data, dict) else data
+    results = [None] * count
+    if not isinstance(items, list):
+        return results
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            position = int(item.get(INDEX_KEY)) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= position < count or results[position] is not None:
+            continue
+        extracted = {key: value for key, value in item.items() if key != INDEX_KEY}
+        if isinstance(extracted.get("cliente"), dict) or isinstance(extracted.get("eventos"), list):
+            results[position] = extracted
+    return results
+
+
+class DocumentBatcher:
+    """Agrupa os documentos enviados por várias threads em lotes de uma única chamada."""
+
+    def __init__(self, send_batch, max_documents=MULTI_DOC_MAX_DOCUMENTS, token_budget=MULTI_DOC_TOKEN_BUDGET,
+                 max_wait=MULTI_DOC_MAX_WAIT_SECONDS):
+        self.send_batch = send_batch
+        self.max_documents = max_documents
+        self.token_budget = token_budget
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_tokens = 0
+
+    def _take(self):
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        return batch
+
+    def _send(self, batch):
+        results = None
+        try:
+            results = self.send_batch([(entry["nome"], entry["texto"]) for entry in batch])
+        except Exception as e:
+            print(f"    ERRO inesperado no lote de {len(batch)} documentos para a IA: {e}")
+        finally:
+            for i, entry in enumerate(batch):
+                entry["resultado"] = results[i] if results else None
+                entry["pronto"].set()
+
+    def extract(self, text, file_name):
+        """Entra no próximo lote e espera a resposta; retorna o dicionário extraído ou None."""
+        entry = {"nome": file_name, "texto": text, "tokens": count_tokens(text),
+                 "pronto": threading.Event(), "resultado": None}
+        ready = []
+        with self._lock:
+            if self._pending and self._pending_tokens + entry["tokens"] > self.token_budget:
+                ready.append(self._take())
+            self._pending.append(entry)
+            self._pending_tokens += entry["tokens"]
+            if len(self._pending) >= self.max_documents or self._pending_tokens >= self.token_budget:
+                ready.append(self._take())
+        for batch in ready:
+            self._send(batch)
+
+        if not entry["pronto"].wait(self.max_wait):
+            # Lote incompleto há tempo demais: esta thread o envia como está
+            with self._lock:
+                batch = self._take() if any(pending is entry for pending in self._pending) else None
+            if batch:
+                self._send(batch)
+        entry["pronto"].wait()
+        return entry["resultado"]
@@ -0,0 +1,125 @@
+"""
+Cache em disco (SQLite) das respostas da OpenAI, endereçado pelo conteúdo da requisição.
+
+A chave é o SHA-256 de (modelo, prompt de sistema, prompt do usuário): se o texto do
+documento e os prompts forem idênticos aos de uma execução anterior, a resposta salva
+é reutilizada sem nova chamada paga à API.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache_llm.db")
+# Entradas mais antigas que isso são descartadas (0 desativa a expiração)
+CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "90"))
+# Tamanho máximo das respostas guardadas; acima disso as menos usadas recentemente saem primeiro
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+def make_cache_key(model, system_prompt, user_prompt):
+    """Hash estável de (modelo, prompt de sistema, prompt do usuário)."""
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, user_prompt):
+        encoded = part.encode("utf-8")
+        # O tamanho antes de cada parte evita colisões entre concatenações diferentes
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """Cache de respostas em SQLite, seguro para uso por várias threads."""
+
+    def __init__(self, path=CACHE_PATH, max_age_days=CACHE_MAX_AGE_DAYS, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                modelo TEXT NOT NULL,
+                resposta TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas(ultimo_acesso)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Retorna a resposta guardada para `key` ou None, atualizando os contadores."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE chave = ?", (key,)
+            ).fetchone()
+            if row and self.max_age_days and now - row[1] > self.max_age_days * 86400:
+                self._conn.execute("DELETE FROM respostas WHERE chave = ?", (key,))
+                self._conn.commit()
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, model, response_text):
+        """Guarda a resposta bruta (texto JSON) devolvida pelo modelo."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respostas (chave, modelo, resposta, tamanho, criado_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response_text, len(response_text.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """Remove entradas expiradas e, se o cache passar de `max_bytes`, as menos usadas recentemente."""
+        removed = 0
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM respostas WHERE criado_em < ?", (cutoff,)).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                excess = total - self.max_bytes
+                to_delete = []
+                for key, size in self._conn.execute("SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso"):
+                    if excess <= 0:
+                        break
+                    to_delete.append((key,))
+                    excess -= size
+                self._conn.executemany("DELETE FROM respostas WHERE chave = ?", to_delete)
+                removed += len(to_delete)
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        """Contadores da execução atual e ocupação do cache."""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entradas": entries,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,143 @@
+"""
+Métricas de execução compartilhadas pelos scripts do pipeline: tempo por etapa,
+contadores e tokens/custo da OpenAI.
+
+Cada script registra no objeto global `metrics` e, ao final, grava um JSON com o
+resumo da execução em `METRICS_DIR` (p50/p95/máximo por etapa, contadores e custo):
+
+    from metrics import metrics
+
+    with metrics.timer("drive_download"):
+        ...
+    metrics.count("cache_textos.acertos")
+    metrics.add_tokens("gpt-4o", response.usage)
+    metrics.write_run("process_documents")
+
+Etapas usadas: drive_download, docx_parse, openai_chat, brasilapi (e brasilapi_espera_cota),
+enriquecimento_cnpj, sqlite_insert, conflitos_reserva, sqlite_commit, validacao_leitura e validacao (uma
+amostra por regra). Registrar é barato e seguro entre threads; nada é gravado até `write_run`.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.getenv("METRICS_DIR", "metricas")
+
+# Preço em US$ por milhão de tokens (entrada, entrada em cache, saída).
+# A Batch API cobra metade (ver `add_tokens(..., batch=True)`).
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+BATCH_DISCOUNT = 0.5
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por interpolação linear de uma lista já ordenada."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _usage_value(usage, name):
+    if usage is None:
+        return 0
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value or 0
+
+
+def _cached_tokens(usage):
+    details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(usage, "prompt_tokens_details", None)
+    return _usage_value(details, "cached_tokens")
+
+
+class Metrics:
+    """Tempos (histograma por etapa), contadores e tokens de uma execução, seguro para várias threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.timings = {}
+        self.counters = {}
+        self.tokens = {}
+
+    @contextmanager
+    def timer(self, stage):
+        """Mede o bloco e registra a duração em `stage`, mesmo se ele levantar uma exceção."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.timings.setdefault(stage, []).append(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_tokens(self, model, usage, batch=False):
+        """Soma o `usage` de uma resposta da OpenAI (objeto do cliente ou dicionário da Batch API)."""
+        prompt_tokens = _usage_value(usage, "prompt_tokens")
+        completion_tokens = _usage_value(usage, "completion_tokens")
+        cached_tokens = _cached_tokens(usage)
+        input_price, cached_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0, 0.0))
+        cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+        if batch:
+            cost *= BATCH_DISCOUNT
+        with self._lock:
+            totals = self.tokens.setdefault(model, {"chamadas": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                                                    "completion_tokens": 0, "custo_usd": 0.0})
+            totals["chamadas"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["custo_usd"] += cost
+
+    def summary(self):
+        with self._lock:
+            stages = {}
+            for stage, values in self.timings.items():
+                ordered = sorted(values)
+                stages[stage] = {
+                    "n": len(ordered),
+                    "total_s": round(sum(ordered), 4),
+                    "p50_s": round(percentile(ordered, 0.50), 4),
+                    "p95_s": round(percentile(ordered, 0.95), 4),
+                    "max_s": round(ordered[-1], 4),
+                }
+            tokens = {model: dict(totals, custo_usd=round(totals["custo_usd"], 4))
+                      for model, totals in self.tokens.items()}
+            return {
+                "inicio": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                "duracao_s": round(time.time() - self.started_at, 2),
+                "etapas": stages,
+                "contadores": dict(self.counters),
+                "tokens": tokens,
+                "custo_total_usd": round(sum(totals["custo_usd"] for totals in self.tokens.values()), 4),
+            }
+
+    def write_run(self, script_name, directory=None):
+        """Grava o resumo em `<directory>/<script>_<data-hora>.json` e retorna o caminho."""
+        directory = directory or METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        summary = dict(self.summary(), script=script_name)
+        path = os.path.join(directory, f"{script_name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"Métricas da execução salvas em '{path}'.")
+        return path
+
+
+# Instância compartilhada pelos módulos de um mesmo processo
+metrics = Metrics()
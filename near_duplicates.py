@@ -0,0 +1,242 @@
+"""
+Detecção de termos quase idênticos (cópias do mesmo modelo) por MinHash + LSH.
+
+Muitos termos são cópias de um mesmo modelo que mudam só nomes, datas e valores.
+O texto é normalizado (minúsculas, sem acentos, dígitos trocados por "0") e dividido
+em "shingles" de SHINGLE_SIZE palavras; a assinatura MinHash estima a similaridade de
+Jaccard entre dois documentos. As assinaturas são cortadas em BANDS faixas e cada
+faixa vira uma chave de balde (LSH): só documentos que colidem em algum balde são
+comparados, então encontrar os parecidos de um novo documento não exige compará-lo
+com todos os anteriores.
+
+A assinatura usa "one permutation hashing": cada shingle é hasheado uma única vez e
+vai para um dos NUM_HASHES compartimentos, que guardam o menor valor (compartimentos
+vazios copiam o vizinho). O custo é linear no tamanho do texto. O hash é o `hash()`
+do Python, que muda a cada processo: as assinaturas só valem dentro de um mesmo índice.
+
+Arquivos de modelo ("MODELO. Termo de Permissão de Uso .docx", ou textos ainda com
+campos a preencher) são identificados por `is_template` e ficam fora da extração.
+
+Uso (grupos dos textos já guardados em cache_textos.db):
+    python near_duplicates.py
+    python near_duplicates.py --limiar 0.9 --saida grupos_similares.json
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+NUM_HASHES = 128
+BANDS = 32  # 32 faixas de 4 valores: pares com similaridade acima de ~0,6 quase sempre colidem
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.7
+# Documentos guardados por balde: num grupo grande (centenas de cópias do mesmo modelo),
+# os primeiros já bastam para ligar um novo documento ao grupo, e cada inclusão faz no
+# máximo BANDS * MAX_BUCKET_SIZE comparações
+MAX_BUCKET_SIZE = 8
+CLUSTERS_FILE = "grupos_similares.json"
+
+_WORD_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+_MAX_HASH = (1 << 64) - 1
+TEMPLATE_NAME_RE = re.compile(r"\bmodelo\b", re.IGNORECASE)
+# Campos não preenchidos: "XXXXX", "_____", "[NOME DA EMPRESA]", "<data>"
+PLACEHOLDER_RE = re.compile(r"\b[xX]{4,}\b|_{5,}|\[[A-ZÀ-Ü ]{3,}\]|<[^<>\n]{3,30}>")
+MIN_PLACEHOLDERS = 3
+
+
+def strip_accents(text):
+    """Texto sem acentos (e sem os demais caracteres fora do ASCII, como "º")."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def normalize_words(text):
+    """Palavras do texto em minúsculas, sem acentos e com os números trocados por "0"."""
+    return _WORD_RE.findall(_DIGITS_RE.sub("0", strip_accents(text).lower()))
+
+
+def signature(text, num_hashes=NUM_HASHES):
+    """Assinatura MinHash (tupla de `num_hashes` inteiros) do texto, ou None se ele não tiver palavras."""
+    words = normalize_words(text)
+    if not words:
+        return None
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    bins = [_MAX_HASH] * num_hashes
+    for shingle in shingles:
+        value = hash(shingle) & _MAX_HASH
+        position = value % num_hashes
+        if value < bins[position]:
+            bins[position] = value
+    # Compartimentos vazios recebem o valor do próximo preenchido (densificação por rotação)
+    densified = list(bins)
+    for i in range(num_hashes):
+        position = i
+        while bins[position] == _MAX_HASH:
+            position = (position + 1) % num_hashes
+        densified[i] = bins[position]
+    return tuple(densified)
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Fração de posições iguais: estimativa da similaridade de Jaccard entre os textos."""
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / len(signature_a)
+
+
+def is_template(file_name, text=None):
+    """Modelo de termo: "MODELO" no nome do arquivo ou texto com vários campos a preencher."""
+    if file_name and TEMPLATE_NAME_RE.search(strip_accents(file_name)):
+        return True
+    return bool(text) and len(PLACEHOLDER_RE.findall(text)) >= MIN_PLACEHOLDERS
+
+
+class NearDuplicateIndex:
+    """Índice LSH de assinaturas MinHash com os grupos de quase duplicados, seguro para várias threads."""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, num_hashes=NUM_HASHES, bands=BANDS):
+        if num_hashes % bands:
+            raise ValueError("num_hashes deve ser múltiplo de bands.")
+        self.threshold = threshold
+        self.num_hashes = num_hashes
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self.signatures = {}  # em ordem de inclusão
+        self._buckets = [{} for _ in range(bands)]
+        self._order = {}
+        self._parent = {}
+        self._lock = threading.Lock()
+
+    def _band_keys(self, sig):
+        return [hash(sig[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _find(self, key):
+        while self._parent[key] != key:
+            self._parent[key] = self._parent[self._parent[key]]
+            key = self._parent[key]
+        return key
+
+    def add(self, key, text):
+        """
+        Indexa o texto de `key` e retorna [(chave, similaridade), ...] com um documento
+        já indexado por grupo com similaridade >= threshold, do mais parecido ao menos.
+        """
+        sig = signature(text, self.num_hashes)
+        if sig is None:
+            return []
+        band_keys = self._band_keys(sig)
+        with self._lock:
+            candidates = set()
+            for band, bucket_key in enumerate(band_keys):
+                candidates.update(self._buckets[band].get(bucket_key, ()))
+            candidates.discard(key)
+            matches = []
+            matched_groups = set()
+            for candidate in candidates:
+                # Basta um documento parecido por grupo: os demais já estão ligados a ele
+                root = self._find(candidate)
+                if root in matched_groups:
+                    continue
+                similarity = estimated_similarity(sig, self.signatures[candidate])
+                if similarity >= self.threshold:
+                    matches.append((candidate, similarity))
+                    matched_groups.add(root)
+
+            if key not in self.signatures:
+                self._order[key] = len(self._order)
+                self._parent[key] = key
+                for band, bucket_key in enumerate(band_keys):
+                    bucket = self._buckets[band].setdefault(bucket_key, [])
+                    if len(bucket) < MAX_BUCKET_SIZE:
+                        bucket.append(key)
+            self.signatures[key] = sig
+            for candidate, _ in matches:
+                # A raiz de cada grupo é sempre o documento indexado primeiro
+                root_a, root_b = sorted((self._find(key), self._find(candidate)), key=self._order.get)
+                if root_a != root_b:
+                    self._parent[root_b] = root_a
+        return sorted(matches, key=lambda match: -match[1])
+
+    def group(self, key):
+        """Id do grupo de `key`: a chave do primeiro documento indexado do grupo."""
+        with self._lock:
+            return self._find(key)
+
+    def clusters(self):
+        """
+        Grupos com dois ou mais documentos: listas de chaves na ordem em que foram
+        indexadas (a primeira é o id do grupo).
+        """
+        with self._lock:
+            groups = {}
+            for key in self.signatures:
+                groups.setdefault(self._find(key), []).append(key)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+def write_clusters(clusters, names=None, path=CLUSTERS_FILE):
+    """
+    Salva os grupos em JSON: cada grupo tem o id do primeiro documento ("grupo") e a
+    lista de arquivos (id do Drive, como em `id_arquivo_drive`, e nome).
+    """
+    names = names or {}
+    payload = [{"grupo": members[0], "arquivos": [{"id": key, "nome": names.get(key)} for key in members]}
+               for members in sorted(clusters, key=len, reverse=True)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_cluster_ids(path=CLUSTERS_FILE):
+    """id do arquivo -> id do grupo, a partir de um arquivo salvo por `write_clusters` ({} se não existir)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {entry["id"]: group["grupo"] for group in json.load(f) for entry in group["arquivos"]}
+
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py duplicates`)."""
+    parser.add_argument("--cache", default=None, help="Banco do cache de textos (padrão: o de text_cache.py).")
+    parser.add_argument("--manifesto", default="manifesto_extracao.json", help="Manifesto com os nomes dos arquivos.")
+    parser.add_argument("--limiar", type=float, default=SIMILARITY_THRESHOLD, help="Similaridade mínima (0 a 1).")
+    parser.add_argument("--saida", default=CLUSTERS_FILE)
+
+
+def run_cli(args):
+    """Agrupa os textos do cache e salva os grupos em `args.saida`."""
+    from text_cache import CACHE_PATH
+
+    names = {}
+    if os.path.exists(args.manifesto):
+        with open(args.manifesto, encoding="utf-8") as f:
+            names = {file_id: entry.get("name") for file_id, entry in json.load(f).items()}
+
+    index = NearDuplicateIndex(args.limiar)
+    templates = []
+    conn = sqlite3.connect(args.cache or CACHE_PATH)
+    for file_id, text in conn.execute("SELECT id_arquivo, texto FROM textos"):
+        if is_template(names.get(file_id), text):
+            templates.append(file_id)
+            continue
+        index.add(file_id, text)
+    conn.close()
+
+    clusters = index.clusters()
+    grouped = sum(len(members) for members in clusters)
+    print(f"{len(index.signatures)} documentos indexados; {len(templates)} modelos ignorados.")
+    print(f"{len(clusters)} grupos de quase duplicados, com {grouped} documentos.")
+    for members in sorted(clusters, key=len, reverse=True)[:10]:
+        print(f"- {len(members)} documentos, ex.: {', '.join(str(names.get(key, key)) for key in members[:3])}")
+    print(f"Grupos salvos em '{write_clusters(clusters, names, args.saida)}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrupa os termos quase idênticos a partir do cache de textos.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
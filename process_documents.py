@@ -1,105 +1,199 @@
 import os
 import io
-import docx
+import argparse
+import copy
+import hashlib
 import json
-import time
-from dotenv import load_dotenv
-from openai import OpenAI # Nova importação para a OpenAI
-
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
-
-# Configura a API da OpenAI com a chave
-# O cliente OpenAI lê a variável de ambiente OPENAI_API_KEY por padrão
-client = OpenAI() 
-if not os.getenv("OPENAI_API_KEY"):
-    raise ValueError("A variável de ambiente OPENAI_API_KEY não foi encontrada.")
-
-# Constantes do projeto (permanecem as mesmas)
-# ... (imports do Google, constantes de pastas, etc)
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
-
-SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from llm_cache import LLMCache, make_cache_key
+from text_cache import TextCache
+from docx_text import extract_docx_text
+from rule_extractor import extract_with_rules, low_confidence_fields, merge_with_llm
+from jsonl_io import JsonlWriter, read_written_ids, rewrite_filtered
+from prompt_budget import PROMPT_TOKEN_BUDGET, trim_document
+from drive_listing import LIST_WORKERS, iter_docx_files
+from metrics import metrics
+from resilience import AdaptiveLimiter, FATAL, call_with_retry, classify_error
+from llm_batching import BATCH_KEY, INDEX_KEY, DocumentBatcher, parse_batch_response
+from near_duplicates import CLUSTERS_FILE, NearDuplicateIndex, is_template, write_clusters
+
+if __name__ == "__main__":
+    # Rodando como script, o .env vale também para as constantes abaixo (DOWNLOAD_WORKERS...).
+    # Importado, o .env é carregado pelo ponto de entrada (extrator.py) ou por `get_openai_client`.
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# Nada de rede ou bibliotecas pesadas (openai, googleapiclient) na importação: os clientes
+# são criados no primeiro uso (ver `get_openai_client` e `get_drive_service`).
 FOLDER_ID_PAGOS = "1jTRfpGeotGcd3YZZA-4YvwAxIrdGp14G"
 FOLDER_ID_GRATUITOS = "1NBwjHCLjpIIh04p7sKGBqHCODeXIEg7p"
+# Inclui os .docx das subpastas na listagem; ative com --recursive
+LIST_RECURSIVE = False
+
+OPENAI_MODEL = "gpt-4o"  # Ou "gpt-4-turbo"
+# Reaproveita respostas idênticas já pagas (ver llm_cache.py); desative com --no-cache
+USE_LLM_CACHE = True
+# Reaproveita o texto já extraído de arquivos não editados desde então (ver text_cache.py);
+# compartilhado com debug_faltantes.py; desative com --no-text-cache
+USE_TEXT_CACHE = True
+
+# Extrai primeiro por regras (rule_extractor.py) e só chama a IA quando algum campo fica
+# abaixo do limite de confiança; desative com --no-rules
+USE_RULES = True
+
+# Recorta as cláusulas de texto padrão antes da IA, dentro de PROMPT_TOKEN_BUDGET tokens
+# (ver prompt_budget.py); desative com --no-trim
+USE_PROMPT_TRIMMING = True
+
+# Pula os modelos de termo ("MODELO..." no nome ou campos a preencher no texto), reaproveita a
+# extração de textos repetidos e agrupa os termos quase idênticos em CLUSTERS_FILE
+# (ver near_duplicates.py); desative com --no-dedup
+USE_NEAR_DUPLICATES = True
+
+# Concorrência do pipeline: downloads do Drive e chamadas à IA rodam em pools separados
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "2"))
+# Tentativas por chamada à IA; erros de limite (429) e transitórios são repetidos com
+# espera exponencial e o número de chamadas simultâneas se ajusta aos 429 (ver resilience.py)
+LLM_MAX_ATTEMPTS = 5
+# Junta vários termos numa mesma chamada à IA (ver llm_batching.py); ative com --multi-doc
+USE_MULTI_DOC = False
+
+# Saída em JSON Lines: cada registro é gravado assim que fica pronto (ver jsonl_io.py)
+OUTPUT_FILE = "dados_extraidos_openai.jsonl"
+# A cada quantos registros a saída recebe fsync e o manifesto é regravado
+CHECKPOINT_EVERY = 20
+# Manifesto do modo incremental: id do arquivo -> nome, modifiedTime e md5Checksum já extraídos
+MANIFEST_FILE = "manifesto_extracao.json"
+MANIFEST_FIELDS = ("name", "modifiedTime", "md5Checksum")
 
+# Cliente da OpenAI, criado no primeiro uso por `get_openai_client`; pode ser trocado por um stub
+client = None
+_client_lock = threading.Lock()
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+_llm_limiter = None
+_llm_limiter_lock = threading.Lock()
+_document_batcher = None
+_document_batcher_lock = threading.Lock()
+_text_cache = None
+_text_cache_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Retorna o cliente da OpenAI, criando-o no primeiro uso. A chave vem da variável
+    de ambiente OPENAI_API_KEY (ou do arquivo .env).
+    """
+    global client
+    with _client_lock:
+        if client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            load_dotenv()
+            if not os.getenv("OPENAI_API_KEY"):
+                raise ValueError("A variável de ambiente OPENAI_API_KEY não foi encontrada.")
+            # As novas tentativas ficam a cargo de resilience.py (ver `_request_extraction`)
+            client = OpenAI(max_retries=0)
+        return client
 
 def get_drive_service():
-    """Autentica e retorna um objeto de serviço da API do Drive."""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            raise Exception("Token não encontrado ou inválido. Execute 'authenticate.py' primeiro.")
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return build("drive", "v3", credentials=creds)
+    """
+    Retorna o serviço da API do Drive da thread atual (o httplib2 não é thread-safe),
+    criado no primeiro uso; credenciais e documento de descoberta são compartilhados
+    (ver drive_client.py).
+    """
+    from drive_client import get_drive_client
+    return get_drive_client().service()
+
+def get_llm_cache():
+    """Retorna o cache de respostas da IA, abrindo-o no primeiro uso."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+def get_llm_limiter(max_concurrent=None):
+    """
+    Retorna o limitador de chamadas simultâneas à IA, compartilhado por todas as threads.
+    `max_concurrent` (re)cria o limitador com esse teto; sem ele, usa LLM_WORKERS.
+    """
+    global _llm_limiter
+    with _llm_limiter_lock:
+        if _llm_limiter is None or (max_concurrent and max_concurrent != _llm_limiter.max_limit):
+            _llm_limiter = AdaptiveLimiter(max_concurrent or LLM_WORKERS)
+        return _llm_limiter
+
+def get_document_batcher():
+    """Retorna o agrupador de termos do modo multi-documento, compartilhado por todas as threads."""
+    global _document_batcher
+    with _document_batcher_lock:
+        if _document_batcher is None:
+            _document_batcher = DocumentBatcher(extract_documents_with_openai)
+        return _document_batcher
 
-def get_docx_text(service, file_id):
-    """Faz o download de um arquivo .docx e extrai todo o seu texto."""
+def get_text_cache():
+    """Retorna o cache de textos dos documentos, abrindo-o no primeiro uso."""
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            _text_cache = TextCache()
+        return _text_cache
+
+def get_docx_text(service, file_id, modified_time=None):
+    """
+    Faz o download de um arquivo .docx e extrai todo o seu texto.
+    Com `modified_time`, o texto de uma versão já baixada vem do cache de textos.
+    """
+    cache = get_text_cache() if USE_TEXT_CACHE and modified_time else None
+    if cache:
+        cached_text = cache.get(file_id, modified_time)
+        if cached_text is not None:
+            metrics.count("cache_textos.acertos")
+            return cached_text
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaIoBaseDownload
     try:
-        request = service.files().get_media(fileId=file_id)
-        file_buffer = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_buffer, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+        with metrics.timer("drive_download"):
+            request = service.files().get_media(fileId=file_id)
+            file_buffer = io.BytesIO()
+            downloader = MediaIoBaseDownload(file_buffer, request)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk()
+        metrics.count("drive_download.bytes", file_buffer.tell())
         file_buffer.seek(0)
-        document = docx.Document(file_buffer)
-        full_text = []
-        for para in document.paragraphs:
-            full_text.append(para.text)
-        for table in document.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    full_text.append(cell.text)
-        return '\n'.join(full_text)
+        with metrics.timer("docx_parse"):
+            text = extract_docx_text(file_buffer)
+        if cache:
+            cache.set(file_id, modified_time, text)
+        return text
     except HttpError as error:
         print(f"    ERRO ao baixar o arquivo: {error}")
         return None
 
-def extract_data_with_openai(text, file_name):
-    """
-    Usa a API da OpenAI (GPT-4o) para extrair dados estruturados.
-    """
-    print("    - Enviando para a API da OpenAI (GPT-4o)...")
-    
-    system_prompt = """
+SYSTEM_PROMPT = """
     Você é um assistente de IA altamente preciso, especializado em extrair dados de documentos contratuais e formatá-los como um objeto JSON.
     Sua resposta deve conter APENAS o objeto JSON, sem nenhum texto, explicação ou ```json``` adicional.
     Se um campo não for encontrado no texto, seu valor deve ser `null`.
     """
 
-    user_prompt = f"""
-    Analise o seguinte "Termo de Permissão de Uso" (nome do arquivo: {file_name}) e extraia as informações conforme a estrutura JSON solicitada.
-
-    Instruções Específicas:
+EXTRACTION_INSTRUCTIONS = """Instruções Específicas:
     - `cliente.documento`: Retorne apenas os números do CNPJ ou CPF.
     - `eventos.valor_final`: Retorne um número (float). Se o evento for gratuito, retorne 0.0.
-    - `eventos.datas_evento`: Retorne uma lista de strings, com cada data no formato "YYYY-MM-DD".
+    - `eventos.datas_evento`: Retorne uma lista de strings, com cada data no formato "YYYY-MM-DD"."""
 
-    Texto do Documento:
-    ---
-    {text}
-    ---
-
-    Estrutura JSON de Saída:
-    {{
-      "cliente": {{
+OUTPUT_SCHEMA = """{
+      "cliente": {
         "nome_razao_social": "string",
         "documento": "string",
         "tipo_pessoa": "string ('PJ' ou 'PF')",
         "nome_responsavel": "string"
-      }},
+      },
       "eventos": [
-        {{
+        {
           "numero_processo": "string",
           "numero_termo": "string",
           "nome_evento": "string",
@@ -108,87 +202,585 @@ def extract_data_with_openai(text, file_name):
           "hora_fim": "string",
           "valor_final": 0.0,
           "espaco_utilizado": "string"
-        }}
+        }
       ]
-    }}
+    }"""
+
+def build_user_prompt(text, file_name):
+    """Monta o prompt do usuário com o texto do termo e a estrutura JSON esperada."""
+    return f"""
+    Analise o seguinte "Termo de Permissão de Uso" (nome do arquivo: {file_name}) e extraia as informações conforme a estrutura JSON solicitada.
+
+    {EXTRACTION_INSTRUCTIONS}
+
+    Texto do Documento:
+    ---
+    {text}
+    ---
+
+    Estrutura JSON de Saída:
+    {OUTPUT_SCHEMA}
     """
-    
-    max_retries = 3
-    retry_delay = 5
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",  # Ou "gpt-4-turbo"
+
+def build_multi_document_prompt(documents):
+    """Prompt com vários termos [(nome do arquivo, texto), ...], numerados a partir de 1 (ver llm_batching.py)."""
+    texts = "\n".join(
+        f"""
+    Documento {number} (nome do arquivo: {file_name}):
+    ---
+    {text}
+    ---
+""" for number, (file_name, text) in enumerate(documents, start=1))
+    return f"""
+    Analise os {len(documents)} "Termos de Permissão de Uso" abaixo e extraia as informações de cada um, separadamente, conforme a estrutura JSON solicitada.
+
+    {EXTRACTION_INSTRUCTIONS}
+{texts}
+    Estrutura JSON de cada documento:
+    {OUTPUT_SCHEMA}
+
+    Responda com um único objeto JSON no formato {{"{BATCH_KEY}": [...]}}, com um item para cada documento, na mesma ordem,
+    contendo o número do documento em "{INDEX_KEY}" e os campos "cliente" e "eventos" da estrutura acima.
+    """
+
+def prepare_prompt_text(text, file_name):
+    """Recorta o texto do termo para o prompt e informa a contagem de tokens antes e depois."""
+    if not USE_PROMPT_TRIMMING:
+        return text
+    trimmed_text, tokens_before, tokens_after = trim_document(text, PROMPT_TOKEN_BUDGET)
+    print(f"    - Tokens do texto de '{file_name}': {tokens_before} -> {tokens_after}.")
+    return trimmed_text
+
+def _request_extraction(user_prompt, label, llm_client):
+    """
+    Uma chamada à IA com novas tentativas (ver resilience.py); retorna o conteúdo da
+    resposta ou None se ela falhar. `label` identifica a chamada nas mensagens.
+    """
+    llm_client = llm_client or get_openai_client()
+    def _call():
+        with metrics.timer("openai_chat"):
+            return llm_client.chat.completions.create(
+                model=OPENAI_MODEL,
                 response_format={"type": "json_object"},
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ]
             )
-            print("    - Resposta recebida da IA.")
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            print(f"    ERRO ao chamar a API da OpenAI (tentativa {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                print(f"    - Esperando {retry_delay} segundos para tentar novamente...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-            else:
-                print("    - Falha ao extrair dados após múltiplas tentativas.")
-                return None
 
-def main():
+    def _on_retry(attempt, error, kind, delay):
+        metrics.count(f"openai_chat.novas_tentativas.{kind}")
+        print(f"    ERRO ao chamar a API da OpenAI (tentativa {attempt + 1}/{LLM_MAX_ATTEMPTS}, {kind}): {error}")
+        print(f"    - Esperando {delay:.1f} segundos para tentar novamente...")
+
+    try:
+        response = call_with_retry(_call, limiter=get_llm_limiter(), max_attempts=LLM_MAX_ATTEMPTS,
+                                   on_retry=_on_retry)
+    except Exception as e:
+        metrics.count("openai_chat.erros")
+        if classify_error(e) == FATAL:
+            print(f"    ERRO não recuperável ao chamar a API da OpenAI para '{label}': {e}")
+        else:
+            print(f"    - Falha ao extrair dados de '{label}' após {LLM_MAX_ATTEMPTS} tentativas: {e}")
+        return None
+
+    metrics.add_tokens(OPENAI_MODEL, getattr(response, "usage", None))
+    print(f"    - Resposta recebida da IA para '{label}'.")
+    return response.choices[0].message.content
+
+def _parse_extraction(content, file_name):
+    if content is None:
+        return None
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        # Repetir a mesma chamada paga dificilmente corrige um JSON inválido
+        metrics.count("openai_chat.erros")
+        print(f"    ERRO: resposta da IA para '{file_name}' não é um JSON válido: {e}")
+        return None
+
+def extract_documents_with_openai(documents, llm_client=None):
     """
-    Script principal para extrair dados de todos os documentos usando a API da OpenAI.
+    Extrai vários termos [(nome do arquivo, texto já recortado), ...] numa única
+    chamada e retorna a lista de dicionários na mesma ordem. Documentos ausentes ou
+    malformados na resposta (ou todos, se ela falhar) são refeitos um a um.
     """
-    print("Iniciando o processo de extração com IA (Modelo: OpenAI GPT-4o)...")
-    service = get_drive_service()
-    
-    folder_ids = {
+    llm_client = llm_client or get_openai_client()
+    if len(documents) == 1:
+        file_name, text = documents[0]
+        print(f"    - Enviando '{file_name}' para a API da OpenAI (GPT-4o)...")
+        return [_parse_extraction(_request_extraction(build_user_prompt(text, file_name), file_name, llm_client),
+                                  file_name)]
+
+    label = f"lote de {len(documents)} documentos"
+    print(f"    - Enviando {len(documents)} documentos numa só requisição à OpenAI: "
+          f"{', '.join(file_name for file_name, _ in documents)}")
+    metrics.count("multi_doc.requisicoes")
+    metrics.count("multi_doc.documentos", len(documents))
+    results = [None] * len(documents)
+    content = _request_extraction(build_multi_document_prompt(documents), label, llm_client)
+    if content is not None:
+        try:
+            results = parse_batch_response(content, len(documents))
+        except json.JSONDecodeError as e:
+            metrics.count("openai_chat.erros")
+            print(f"    ERRO: resposta da IA para o {label} não é um JSON válido: {e}")
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        metrics.count("multi_doc.refeitos", len(missing))
+        print(f"    - {len(missing)} de {len(documents)} documentos sem resposta válida no lote; refazendo um a um...")
+        for i in missing:
+            file_name, text = documents[i]
+            content = _request_extraction(build_user_prompt(text, file_name), file_name, llm_client)
+            results[i] = _parse_extraction(content, file_name)
+    return results
+
+def extract_data_with_openai(text, file_name, llm_client=None):
+    """
+    Usa a API da OpenAI (GPT-4o) para extrair dados estruturados.
+    `llm_client` permite substituir o cliente padrão (ex.: por um stub local).
+    Com USE_MULTI_DOC, o termo entra num lote com outros (ver `get_document_batcher`),
+    enviado sempre pelo cliente padrão (`get_openai_client`).
+    """
+    prompt_text = prepare_prompt_text(text, file_name)
+    user_prompt = build_user_prompt(prompt_text, file_name)
+
+    cache = get_llm_cache() if USE_LLM_CACHE else None
+    cache_key = make_cache_key(OPENAI_MODEL, SYSTEM_PROMPT, user_prompt)
+    if cache:
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            metrics.count("cache_ia.acertos")
+            print(f"    - Resposta reaproveitada do cache para '{file_name}'.")
+            return json.loads(cached_response)
+
+    if USE_MULTI_DOC:
+        extracted_data = get_document_batcher().extract(prompt_text, file_name)
+        # Guardado com a chave do prompt individual: o mesmo termo é reaproveitado em qualquer modo
+        content = json.dumps(extracted_data, ensure_ascii=False)
+    else:
+        print(f"    - Enviando '{file_name}' para a API da OpenAI (GPT-4o)...")
+        content = _request_extraction(user_prompt, file_name, llm_client)
+        extracted_data = _parse_extraction(content, file_name)
+    if extracted_data is None:
+        return None
+    if cache:
+        cache.set(cache_key, OPENAI_MODEL, content)
+    return extracted_data
+
+def extract_record(text, file_name, llm_client=None):
+    """
+    Extrai os dados do termo localmente, por regras, e recorre à OpenAI apenas se
+    algum campo ficar abaixo do limite de confiança; nesse caso os campos confiáveis
+    das regras prevalecem sobre a resposta da IA.
+    """
+    if not USE_RULES:
+        extracted_data = extract_data_with_openai(text, file_name, llm_client=llm_client)
+        if extracted_data:
+            extracted_data['metodo_extracao'] = 'ia'
+        return extracted_data
+
+    rules_data, confidence = extract_with_rules(text)
+    uncertain_fields = low_confidence_fields(confidence)
+    if not uncertain_fields:
+        print(f"    - '{file_name}' extraído localmente por regras (sem chamada à IA).")
+        rules_data['metodo_extracao'] = 'regras'
+        return rules_data
+
+    print(f"    - Campos incertos em '{file_name}': {', '.join(uncertain_fields)}.")
+    llm_data = extract_data_with_openai(text, file_name, llm_client=llm_client)
+    if not llm_data:
+        return None
+    merged_data = merge_with_llm(rules_data, confidence, llm_data)
+    merged_data['metodo_extracao'] = 'regras+ia'
+    return merged_data
+
+def run_pipeline(items, fetch_text, extract, on_result=None,
+                 download_workers=DOWNLOAD_WORKERS, llm_workers=LLM_WORKERS):
+    """
+    Baixa e extrai os arquivos com concorrência limitada: os downloads de um pool
+    se sobrepõem às chamadas à IA do outro.
+
+    `fetch_text(item)` devolve o texto do arquivo e `extract(text, file_name)` o
+    dicionário extraído; ambos podem ser stubs locais (ver `fakes.py`).
+    Cada arquivo é entregue a `on_result(item, result)` (result é None quando o
+    arquivo falha) na mesma ordem de `items`, assim que ele e os anteriores terminam.
+    Sem `on_result`, retorna a lista de resultados nessa ordem.
+
+    Um erro em `on_result` não impede a entrega dos demais arquivos: o primeiro é
+    relançado depois que os pools terminam, assim como um erro inesperado das threads.
+    """
+    # `items` pode ser um gerador (listagem do Drive em andamento); aí o total não é conhecido
+    total = len(items) if hasattr(items, '__len__') else None
+    results = []
+    if on_result is None:
+        on_result = lambda item, result: results.append(result)
+    llm_futures = []
+    # Limita os arquivos "em voo" para que os textos baixados não se acumulem
+    # na memória mais rápido do que a IA consegue consumi-los.
+    slots = threading.BoundedSemaphore(download_workers + 2 * llm_workers)
+    # Resultados que terminaram fora de ordem aguardam aqui até chegar a vez deles
+    pending = {}
+    next_index = 0
+    emit_lock = threading.Lock()
+    callback_errors = []
+
+    def _finish(index, item, result):
+        nonlocal next_index
+        with emit_lock:
+            pending[index] = (item, result)
+            while next_index in pending:
+                ready_item, ready_result = pending.pop(next_index)
+                next_index += 1
+                try:
+                    on_result(ready_item, ready_result)
+                except Exception as e:
+                    print(f"    ERRO ao gravar o resultado de '{ready_item['name']}': {e}")
+                    callback_errors.append(e)
+
+    def _extract(index, item, text_content):
+        extracted_data = None
+        try:
+            extracted_data = extract(text_content, item['name'])
+            if extracted_data:
+                extracted_data['arquivo_origem'] = item['name']
+                extracted_data['id_arquivo_drive'] = item['id']
+                print(f"    - Extração bem-sucedida: {item['name']}")
+            else:
+                print(f"    - Falha na extração com IA: {item['name']}")
+        except Exception as e:
+            print(f"    ERRO inesperado ao extrair '{item['name']}': {e}")
+            extracted_data = None
+        finally:
+            slots.release()
+            _finish(index, item, extracted_data or None)
+
+    def _download(index, item):
+        progress = f"{index+1}/{total}" if total is not None else f"{index+1}"
+        print(f"\n[ Baixando {progress} ] Lendo arquivo: {item['name']}")
+        try:
+            text_content = fetch_text(item)
+        except Exception as e:
+            print(f"    ERRO inesperado ao baixar '{item['name']}': {e}")
+            text_content = None
+        if not text_content:
+            slots.release()
+            _finish(index, item, None)
+            return
+        llm_futures.append(llm_pool.submit(_extract, index, item, text_content))
+
+    with ThreadPoolExecutor(download_workers, thread_name_prefix="download") as download_pool, \
+         ThreadPoolExecutor(llm_workers, thread_name_prefix="llm") as llm_pool:
+        download_futures = []
+        for index, item in enumerate(items):
+            slots.acquire()
+            download_futures.append(download_pool.submit(_download, index, item))
+        # Todos os downloads precisam terminar antes de o pool da IA ser encerrado
+        wait(download_futures)
+        wait(llm_futures)
+
+    for future in download_futures + llm_futures:
+        future.result()
+    if callback_errors:
+        raise callback_errors[0]
+    return results
+
+def drive_folders():
+    """Pastas de termos a listar (nome -> id)."""
+    return {
         "Termos Pagos": FOLDER_ID_PAGOS,
         "Termos Gratuitos": FOLDER_ID_GRATUITOS
     }
-    all_extracted_data = []
 
-    for folder_name, folder_id in folder_ids.items():
-        print(f"\n--- Processando pasta: {folder_name} ---")
-        try:
-            query = (f"'{folder_id}' in parents and "
-                     "mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document' and "
-                     "trashed=false")
-            results = service.files().list(q=query, pageSize=1000, fields="files(id, name)").execute()
-            items = results.get("files", [])
-
-            if not items:
-                print(f"Nenhum arquivo .docx encontrado na pasta {folder_name}.")
-                continue
-
-            print(f"Encontrados {len(items)} arquivos. Iniciando extração com OpenAI...")
-            for i, item in enumerate(items):
-                print(f"\n[ Processando {i+1}/{len(items)} ] Lendo arquivo: {item['name']}")
-                text_content = get_docx_text(service, item['id'])
-                
-                if text_content:
-                    extracted_data = extract_data_with_openai(text_content, item['name'])
-                    if extracted_data:
-                        extracted_data['arquivo_origem'] = item['name']
-                        extracted_data['id_arquivo_drive'] = item['id']
-                        all_extracted_data.append(extracted_data)
-                        print("    - Extração bem-sucedida.")
-                    else:
-                        print("    - Falha na extração com IA.")
-                
-                # Pausa para não sobrecarregar a API
-                time.sleep(1) 
-
-        except HttpError as error:
-            print(f"Ocorreu um erro ao acessar a pasta {folder_name}: {error}")
-    
-    output_filename = 'dados_extraidos_openai.json'
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        json.dump(all_extracted_data, f, indent=2, ensure_ascii=False)
+def iter_all_docx_files(recursive=None, failures=None):
+    """
+    Gera os .docx das pastas de termos à medida que as páginas da listagem chegam
+    (pastas listadas em paralelo; ver drive_listing.py). As pastas que não puderam
+    ser listadas entram em `failures`, se for uma lista.
+    """
+    if recursive is None:
+        recursive = LIST_RECURSIVE
+    return iter_docx_files(get_drive_service, drive_folders(), workers=LIST_WORKERS, recursive=recursive,
+                           failures=failures)
+
+def list_all_docx_files(recursive=None, failures=None):
+    """Lista dos .docx das pastas de termos; incompleta se alguma pasta entrar em `failures`."""
+    all_items = list(iter_all_docx_files(recursive, failures))
+    print(f"\nEncontrados {len(all_items)} arquivos.")
+    return all_items
+
+def load_manifest(path=MANIFEST_FILE):
+    """Carrega o manifesto da última extração (dicionário vazio se não existir)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """Grava o manifesto de forma atômica, para não corrompê-lo se o processo for interrompido."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def manifest_entry(item):
+    """Metadados do Drive que identificam a versão extraída de um arquivo."""
+    return {field: item.get(field) for field in MANIFEST_FIELDS}
+
+def is_unchanged(item, manifest):
+    """Um arquivo está inalterado se o id já consta no manifesto com o mesmo modifiedTime e md5Checksum."""
+    previous = manifest.get(item['id'])
+    if not previous:
+        return False
+    return (previous.get('modifiedTime') == item.get('modifiedTime')
+            and previous.get('md5Checksum') == item.get('md5Checksum'))
+
+def _skip_written(items, written_ids, listed_entries):
+    """Repassa os itens ainda não gravados; dos já gravados, guarda só os metadados em `listed_entries`."""
+    for item in items:
+        if item['id'] in written_ids:
+            listed_entries[item['id']] = manifest_entry(item)
+        else:
+            yield item
+
+def _skip_templates(items):
+    """Repassa os itens que não são modelos de termo pelo nome do arquivo (sem baixá-los)."""
+    for item in items:
+        if is_template(item['name']):
+            metrics.count("modelos_ignorados")
+            print(f"\nPulando modelo de termo: {item['name']}")
+        else:
+            yield item
+
+class DuplicateTracker:
+    """
+    Acompanha os termos de uma execução: pula modelos pelo texto, indexa os textos
+    baixados para agrupar os quase idênticos e reaproveita a extração de um texto
+    idêntico a outro já extraído (cópias do mesmo arquivo em pastas diferentes).
+    """
+
+    def __init__(self, extract):
+        self.extract = extract
+        self.index = NearDuplicateIndex()
+        self.names = {}
+        self._extracted = {}
+        self._lock = threading.Lock()
+
+    def check_text(self, item, text):
+        """Retorna o texto, ou None se ele for de um modelo de termo."""
+        if not text:
+            return text
+        if is_template(None, text):
+            metrics.count("modelos_ignorados")
+            print(f"    - '{item['name']}' é um modelo de termo (campos a preencher); ignorado.")
+            return None
+        self.names[item['id']] = item['name']
+        matches = self.index.add(item['id'], text)
+        if matches:
+            metrics.count("quase_duplicados")
+            similar_id, similarity = matches[0]
+            print(f"    - '{item['name']}' é quase idêntico a '{self.names.get(similar_id, similar_id)}' ({similarity:.0%}).")
+        return text
+
+    def extract_record(self, text, file_name):
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            previous = self._extracted.get(key)
+        if previous is not None:
+            metrics.count("extracao.reaproveitada")
+            print(f"    - Texto idêntico a '{previous['arquivo_origem']}'; extração reaproveitada.")
+            return copy.deepcopy(previous)
+        extracted_data = self.extract(text, file_name)
+        if extracted_data:
+            with self._lock:
+                self._extracted.setdefault(key, dict(copy.deepcopy(extracted_data), arquivo_origem=file_name))
+        return extracted_data
+
+    def group_of(self, file_id):
+        """
+        Id do grupo de quase duplicados do arquivo, ou None se ele for o primeiro (ou único) do grupo.
+
+        É provisório: considera só os textos indexados até agora, e grupos podem se unir
+        (mudando o id) ou ganhar membros depois. O agrupamento final é o de `write_clusters`,
+        que sanitize_and_review.py prefere ao valor gravado no registro.
+        """
+        if file_id not in self.index.signatures:
+            return None
+        group = self.index.group(file_id)
+        return group if group != file_id else None
+
+def main(download_workers=DOWNLOAD_WORKERS, llm_workers=LLM_WORKERS, incremental=False, resume=False):
+    """
+    Script principal para extrair dados de todos os documentos usando a API da OpenAI.
+
+    Os registros são gravados em `OUTPUT_FILE` à medida que ficam prontos. Com
+    `resume`, continua uma execução interrompida pulando os arquivos já gravados;
+    com `incremental`, mantém os registros de arquivos inalterados desde a última
+    execução e processa apenas os novos ou alterados.
+    """
+    print("Iniciando o processo de extração com IA (Modelo: OpenAI GPT-4o)...")
+    get_llm_limiter(llm_workers)
+    if USE_LLM_CACHE:
+        removed = get_llm_cache().evict()
+        if removed:
+            print(f"Cache da IA: {removed} respostas antigas removidas.")
+    old_manifest = load_manifest() if (incremental or resume) else {}
+    written_ids = set()
+    # O manifesto descreve exatamente o que está no arquivo de saída
+    manifest = {}
+    # Metadados dos arquivos já gravados vistos na listagem, para completar o manifesto no fim
+    listed_entries = {}
+    if incremental:
+        # Registros de arquivos ausentes da listagem são descartados, o que só vale se ela estiver completa
+        failed_folders = []
+        all_items = list_all_docx_files(failures=failed_folders)
+        items_by_id = {item['id']: item for item in all_items}
+        if failed_folders:
+            names = ", ".join(name for name, _, _ in failed_folders)
+            print(f"\nAVISO: listagem incompleta ({names}); os registros de arquivos não listados serão mantidos.")
+        if os.path.exists(OUTPUT_FILE):
+            # Mantém os registros de arquivos que não mudaram (e, com a listagem incompleta, os não
+            # listados, que podem estar nas pastas que falharam); o resto é reprocessado
+            written_ids = rewrite_filtered(
+                OUTPUT_FILE,
+                lambda record: (is_unchanged(items_by_id[record['id_arquivo_drive']], old_manifest)
+                                if record.get('id_arquivo_drive') in items_by_id
+                                else bool(failed_folders and record.get('id_arquivo_drive'))),
+            )
+        print(f"\nModo incremental: {len(written_ids)} arquivos inalterados reaproveitados.")
+        for file_id in written_ids:
+            entry = old_manifest.get(file_id)
+            if entry is None and file_id in items_by_id:
+                entry = manifest_entry(items_by_id[file_id])
+            if entry is not None:
+                manifest[file_id] = entry
+        items_to_process = [item for item in all_items if item['id'] not in written_ids]
+    else:
+        if resume:
+            written_ids = read_written_ids(OUTPUT_FILE)
+            print(f"\nRetomando execução: {len(written_ids)} arquivos já gravados em '{OUTPUT_FILE}' serão pulados.")
+            manifest.update((file_id, old_manifest[file_id]) for file_id in written_ids if file_id in old_manifest)
+        # Os downloads começam enquanto as pastas ainda estão sendo listadas
+        items_to_process = _skip_written(iter_all_docx_files(), written_ids, listed_entries)
+
+    tracker = None
+    extract = extract_record
+    fetch_text = lambda item: get_docx_text(get_drive_service(), item['id'], item.get('modifiedTime'))
+    if USE_NEAR_DUPLICATES:
+        tracker = DuplicateTracker(extract_record)
+        extract = tracker.extract_record
+        fetch_text = lambda item: tracker.check_text(
+            item, get_docx_text(get_drive_service(), item['id'], item.get('modifiedTime')))
+        items_to_process = _skip_templates(items_to_process)
+        if incremental:
+            items_to_process = list(items_to_process)
+
+    print(f"\nIniciando extração com OpenAI ({download_workers} downloads / {llm_workers} chamadas à IA em paralelo)...")
+    pipeline_llm_workers = llm_workers
+    if USE_MULTI_DOC:
+        # Cada thread da IA só espera o lote do seu termo; quem limita as chamadas
+        # simultâneas continua sendo o limitador (llm_workers)
+        max_documents = get_document_batcher().max_documents
+        pipeline_llm_workers = llm_workers * max_documents
+        print(f"Modo multi-documento: até {max_documents} termos por chamada à IA.")
+    output_filename = OUTPUT_FILE
+    with JsonlWriter(output_filename, append=bool(written_ids), checkpoint_every=CHECKPOINT_EVERY) as writer:
+        def _save_result(item, result):
+            if not result:
+                return
+            manifest[item['id']] = manifest_entry(item)
+            metrics.count(f"extracao.{result.get('metodo_extracao', 'ia')}")
+            group = tracker.group_of(item['id']) if tracker else None
+            if group:
+                result['grupo_similar'] = group
+            if writer.write(result):
+                save_manifest(manifest)
+
+        run_pipeline(
+            items_to_process,
+            fetch_text=fetch_text,
+            extract=extract,
+            on_result=_save_result,
+            download_workers=download_workers,
+            llm_workers=pipeline_llm_workers,
+        )
+    for file_id, entry in listed_entries.items():
+        manifest.setdefault(file_id, entry)
+    save_manifest(manifest)
+
+    if USE_LLM_CACHE:
+        stats = get_llm_cache().stats()
+        print(f"\nCache da IA: {stats['hits']} acertos, {stats['misses']} faltas "
+              f"({stats['hit_rate']:.0%}); {stats['entradas']} respostas guardadas.")
+    if USE_TEXT_CACHE:
+        stats = get_text_cache().stats()
+        print(f"Cache de textos: {stats['hits']} documentos reaproveitados, {stats['misses']} baixados do Drive.")
     
-    print(f"\n\nProcesso concluído! Todos os dados extraídos pela OpenAI foram salvos em '{output_filename}'.")
+    if tracker:
+        clusters = tracker.index.clusters()
+        print(f"\nQuase duplicados: {len(clusters)} grupos com {sum(len(members) for members in clusters)} termos.")
+        if incremental or resume:
+            # Só os termos desta execução foram indexados; o agrupamento completo vem do cache de textos
+            print("Para atualizar os grupos de todos os termos, execute 'python near_duplicates.py'.")
+        else:
+            print(f"Grupos salvos em '{write_clusters(clusters, tracker.names)}'.")
+
+    metrics.count("registros_gravados", writer.written)
+    limiter = get_llm_limiter()
+    if limiter.throttled:
+        print(f"\nLimite da OpenAI atingido {limiter.throttled} vezes; concorrência final da IA: "
+              f"{int(limiter.limit)} de {limiter.max_limit}.")
+    print(f"\n\nProcesso concluído! {writer.written} novos registros extraídos pela OpenAI foram salvos em '{output_filename}'.")
+    metrics.write_run("process_documents")
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py extract`)."""
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS,
+                        help="Downloads simultâneos do Drive.")
+    parser.add_argument("--llm-workers", type=int, default=LLM_WORKERS,
+                        help="Chamadas simultâneas à API da OpenAI.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help=f"Processa apenas arquivos novos ou alterados desde a última execução (usa '{MANIFEST_FILE}').")
+    mode.add_argument("--resume", action="store_true",
+                      help=f"Continua uma execução interrompida, pulando os arquivos já gravados em '{OUTPUT_FILE}'.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Não usa o cache de respostas da IA (força novas chamadas pagas).")
+    parser.add_argument("--no-text-cache", action="store_true",
+                        help="Baixa todos os documentos do Drive, sem reaproveitar textos já extraídos.")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="Envia todos os documentos à IA, sem a extração prévia por regras.")
+    parser.add_argument("--no-trim", action="store_true",
+                        help="Envia o texto completo do termo à IA, sem recortar as cláusulas de texto padrão.")
+    parser.add_argument("--recursive", action="store_true",
+                        help="Inclui os .docx das subpastas das pastas de termos.")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help=f"Não pula modelos de termo nem agrupa os termos quase idênticos em '{CLUSTERS_FILE}'.")
+    parser.add_argument("--multi-doc", action="store_true",
+                        help="Envia vários termos por chamada à IA (menos requisições e tokens de prompt).")
+
+def run_cli(args):
+    """Aplica as opções de `add_arguments` e executa a extração."""
+    global USE_LLM_CACHE, USE_TEXT_CACHE, USE_RULES, USE_PROMPT_TRIMMING, LIST_RECURSIVE, USE_NEAR_DUPLICATES, USE_MULTI_DOC
+    if args.no_cache:
+        USE_LLM_CACHE = False
+    if args.no_text_cache:
+        USE_TEXT_CACHE = False
+    if args.no_rules:
+        USE_RULES = False
+    if args.no_trim:
+        USE_PROMPT_TRIMMING = False
+    if args.recursive:
+        LIST_RECURSIVE = True
+    if args.no_dedup:
+        USE_NEAR_DUPLICATES = False
+    if args.multi_doc:
+        USE_MULTI_DOC = True
+    main(download_workers=args.download_workers, llm_workers=args.llm_workers,
+         incremental=args.incremental, resume=args.resume)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extrai os dados dos termos do Drive com a OpenAI.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())
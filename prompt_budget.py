@@ -0,0 +1,147 @@
+"""
+Recorte do texto dos termos antes de enviá-lo à IA, dentro de um orçamento de tokens.
+
+Os campos extraídos ficam no preâmbulo (processo, termo, permissionário, responsável),
+na CLÁUSULA PRIMEIRA (objeto: evento, espaço, datas e horários) e na cláusula de
+pagamento/valor. As demais cláusulas (vigência, obrigações, penalidades, foro...) são
+texto padrão e saem do prompt; delas só sobram as linhas com valores em R$ ou menção
+a gratuidade. Se ainda assim o texto passar de `PROMPT_TOKEN_BUDGET`, os blocos de
+menor prioridade são cortados primeiro.
+
+A contagem usa o tiktoken, se instalado; sem ele, uma estimativa próxima do
+tokenizador do GPT-4o (palavras quebradas a cada ~4 caracteres, mais a pontuação).
+
+Uso (relatório de tokens antes/depois para arquivos locais):
+    python prompt_budget.py termo1.docx termo2.docx ...
+"""
+import argparse
+import os
+import re
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+OMITTED_MARKER = "[...]"
+
+CLAUSE_HEADING_RE = re.compile(r"^\s*CL[ÁA]USULA\s+\S+", re.IGNORECASE)
+# Cláusulas que trazem campos extraídos: objeto (sempre a primeira) e pagamento/valor
+RELEVANT_CLAUSE_RE = re.compile(
+    r"CL[ÁA]USULA\s+(?:PRIMEIRA|1\s*[ªa.º°]?(?!\d))|OBJETO|PAGAMENTO|VALOR|PRE[ÇC]O|REMUNERA|RETRIBUI|CONTRAPRESTA|"
+    r"D[AO]S?\s+DATAS?|PER[ÍI]ODO|HOR[ÁA]RIO",
+    re.IGNORECASE,
+)
+# Linhas aproveitadas das cláusulas descartadas
+SIGNAL_LINE_RE = re.compile(r"R\$|valor\s+total|gratuit|isen[çc][ãa]o|isent[oa]|sem\s+[ôo]nus", re.IGNORECASE)
+_TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+# Prioridade dos blocos quando o orçamento aperta (menor número = mantido primeiro)
+PRIORITY_PREAMBLE = 0
+PRIORITY_CLAUSE = 1
+PRIORITY_SIGNAL = 2
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _ENCODING = None
+
+
+def count_tokens(text):
+    """Número de tokens de `text` no tokenizador do GPT-4o (ou uma estimativa, sem tiktoken)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PIECE_RE.findall(text))
+
+
+def split_sections(text):
+    """
+    Divide o texto em seções: o preâmbulo (título None) e uma seção por cláusula,
+    cada uma com o título (primeira linha) e a lista de linhas.
+    """
+    sections = [(None, [])]
+    for line in text.split("\n"):
+        if CLAUSE_HEADING_RE.match(line):
+            sections.append((line.strip(), [line]))
+        else:
+            sections[-1][1].append(line)
+    return sections
+
+
+def _select_blocks(text):
+    """
+    Lista de blocos (prioridade, linhas, completo) na ordem do documento, já sem as
+    cláusulas de texto padrão; `completo` é False quando o bloco perdeu linhas.
+    """
+    sections = split_sections(text)
+    if len(sections) == 1:
+        # Termo fora do modelo (sem cláusulas): não há o que descartar com segurança
+        return [(PRIORITY_PREAMBLE, sections[0][1], True)]
+
+    blocks = []
+    for heading, lines in sections:
+        if heading is None:
+            blocks.append((PRIORITY_PREAMBLE, lines, True))
+        elif RELEVANT_CLAUSE_RE.search(heading):
+            blocks.append((PRIORITY_CLAUSE, lines, True))
+        else:
+            # Fica o título da cláusula, para dar contexto ao valor (ex.: multa x preço)
+            signal_lines = [line for line in lines[1:] if SIGNAL_LINE_RE.search(line)]
+            blocks.append((PRIORITY_SIGNAL, [lines[0]] + signal_lines, False) if signal_lines else (None, [], False))
+    return blocks
+
+
+def trim_document(text, budget=PROMPT_TOKEN_BUDGET):
+    """
+    Retorna (texto_recortado, tokens_antes, tokens_depois). Trechos descartados
+    viram um marcador `[...]`, para a IA saber que há texto omitido.
+    """
+    tokens_before = count_tokens(text)
+    blocks = _select_blocks(text)
+
+    # Preenche o orçamento por prioridade, linha a linha; o resto do bloco que estourar é cortado
+    kept = [[] for _ in blocks]
+    used = 0
+    order = sorted((priority, index) for index, (priority, _, _) in enumerate(blocks) if priority is not None)
+    for _, index in order:
+        for line in blocks[index][1]:
+            line_tokens = count_tokens(line) + 1
+            if used + line_tokens > budget:
+                break
+            kept[index].append(line)
+            used += line_tokens
+
+    if len(blocks) == 1 and len(kept[0]) == len(blocks[0][1]):
+        # Nada foi cortado: o texto segue idêntico (inclusive para o cache da IA)
+        return text, tokens_before, tokens_before
+
+    parts = []
+    for (_, lines, complete), kept_lines in zip(blocks, kept):
+        if kept_lines and not complete:
+            # Cláusula descartada em parte: o marcador vem entre o título e as linhas aproveitadas
+            parts.extend(kept_lines[:1] + [OMITTED_MARKER] + kept_lines[1:])
+        else:
+            parts.extend(kept_lines)
+        if (not complete or len(kept_lines) < len(lines)) and (not parts or parts[-1] != OMITTED_MARKER):
+            parts.append(OMITTED_MARKER)
+    trimmed = "\n".join(parts)
+    return trimmed, tokens_before, count_tokens(trimmed)
+
+
+def main():
+    from docx_text import extract_docx_text
+
+    parser = argparse.ArgumentParser(description="Relatório de tokens dos termos antes e depois do recorte.")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos .docx locais.")
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    total_before = total_after = 0
+    print(f"{'arquivo':<50} {'antes':>8} {'depois':>8} {'redução':>8}")
+    for path in args.arquivos:
+        _, before, after = trim_document(extract_docx_text(path), args.budget)
+        total_before += before
+        total_after += after
+        print(f"{os.path.basename(path)[:50]:<50} {before:>8} {after:>8} {1 - after / max(before, 1):>8.0%}")
+    print(f"{'TOTAL':<50} {total_before:>8} {total_after:>8} {1 - total_after / max(total_before, 1):>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Novas tentativas e controle de concorrência para as chamadas à API da OpenAI.
+
+- `classify_error` separa os erros em "limite" (429), "transitorio" (rede, tempo
+  esgotado, 5xx) e "fatal" (demais 4xx, resposta inválida, erros de programação);
+  só os dois primeiros são repetidos.
+- `retry_after_seconds` lê a espera pedida pelo servidor (`retry-after-ms`,
+  `retry-after` em segundos ou data HTTP, e os `x-ratelimit-reset-*` da OpenAI);
+  `retry_after_from_headers` faz o mesmo com os cabeçalhos de qualquer resposta.
+- `backoff_delay` é exponencial com "full jitter", para que threads que falharam
+  juntas não voltem todas no mesmo instante.
+- `AdaptiveLimiter` limita as chamadas simultâneas: o limite cai pela metade a cada
+  rajada de 429 e volta a subir devagar (+1 a cada `limite` sucessos), ficando perto
+  da cota real sem insistir nela.
+
+    limiter = AdaptiveLimiter(max_limit=4)
+    response = call_with_retry(lambda: client.chat.completions.create(...), limiter=limiter)
+
+Os erros são reconhecidos pelos atributos `status_code` e `response.headers` das
+exceções (como as do cliente `openai`), sem depender de uma biblioteca específica.
+"""
+import email.utils
+import json
+import random
+import re
+import threading
+import time
+
+MAX_ATTEMPTS = 5
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 60.0
+# 429s recebidos dentro desta janela contam como uma única redução do limite
+DECREASE_COOLDOWN_SECONDS = 2.0
+
+RATE_LIMITED = "limite"
+TRANSIENT = "transitorio"
+FATAL = "fatal"
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+# Erros que uma nova tentativa idêntica não resolve
+_FATAL_TYPES = (json.JSONDecodeError, TypeError, KeyError, AttributeError, IndexError)
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(exc):
+    """'limite', 'transitorio' ou 'fatal'."""
+    status = _status_code(exc)
+    if status == 429:
+        return RATE_LIMITED
+    if status is not None:
+        return TRANSIENT if status >= 500 or status in (408, 409) else FATAL
+    if isinstance(exc, _FATAL_TYPES):
+        return FATAL
+    # Sem status HTTP: falha de conexão, tempo esgotado etc.
+    return TRANSIENT
+
+
+def _parse_duration(value):
+    """'20ms', '1s', '6m0s', '1.5s' -> segundos (None se não reconhecer)."""
+    parts = _DURATION_RE.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(exc):
+    """Espera (em segundos) pedida pelo servidor na resposta de `exc`, ou None."""
+    return retry_after_from_headers(getattr(getattr(exc, "response", None), "headers", None))
+
+
+def retry_after_from_headers(headers):
+    """Espera (em segundos) pedida nos cabeçalhos de uma resposta (sem distinguir maiúsculas), ou None."""
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                moment = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                moment = None
+            if moment is not None:
+                return max(0.0, moment.timestamp() - time.time())
+    resets = [_parse_duration(headers.get(name))
+              for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def backoff_delay(attempt, base=BASE_DELAY_SECONDS, cap=MAX_DELAY_SECONDS):
+    """Espera aleatória entre 0 e base * 2^attempt (no máximo `cap`)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    Limite de chamadas simultâneas com aumento aditivo e redução multiplicativa (AIMD).
+
+    Começa em `initial` (padrão: `max_limit`). Um 429 reduz o limite pela metade (no
+    mínimo `min_limit`), uma vez por janela de DECREASE_COOLDOWN_SECONDS, e pode pausar
+    todas as chamadas até o fim do Retry-After; cada sucesso soma 1/limite.
+    Seguro para várias threads.
+    """
+
+    def __init__(self, max_limit, initial=None, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial or max_limit)
+        self.in_flight = 0
+        self.throttled = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, outcome=None, retry_after=None):
+        """Libera a vaga; `outcome` é None (sucesso) ou o resultado de `classify_error`."""
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome is None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif outcome == RATE_LIMITED:
+                self.throttled += 1
+                if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    # Vários 429 simultâneos pedem a mesma espera: a pausa não se acumula
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            self._condition.notify_all()
+
+
+def call_with_retry(func, limiter=None, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY_SECONDS,
+                    max_delay=MAX_DELAY_SECONDS, on_retry=None):
+    """
+    Chama `func()` repetindo os erros de limite e transitórios, com espera exponencial
+    com jitter (ou a pedida pelo servidor, se maior). Erros fatais, e o último erro
+    após `max_attempts` tentativas, são relançados.
+
+    `on_retry(attempt, exc, kind, delay)` é chamado antes de cada espera (para logs).
+    """
+    for attempt in range(max_attempts):
+        if limiter:
+            limiter.acquire()
+        try:
+            result = func()
+        except Exception as exc:
+            kind = classify_error(exc)
+            server_delay = retry_after_seconds(exc) if kind == RATE_LIMITED else None
+            if limiter:
+                limiter.release(kind, server_delay)
+            if kind == FATAL or attempt == max_attempts - 1:
+                raise
+            delay = max(backoff_delay(attempt, base_delay, max_delay), min(server_delay or 0, max_delay))
+            if on_retry:
+                on_retry(attempt, exc, kind, delay)
+            time.sleep(delay)
+            continue
+        if limiter:
+            limiter.release()
+        return result
@@ -0,0 +1,257 @@
+"""
+Extração determinística (por expressões regulares) dos campos dos Termos de Permissão de Uso.
+
+Os termos seguem um modelo fixo ("Processo n°: E:...", "Termo n°: 41/2025",
+"PERMISSIONÁRIO(A): ... CPF/MF sob o nº ...", "valor total de R$ 2.495,00"), então a
+maior parte dos campos pode ser lida localmente, em milissegundos. `extract_with_rules`
+devolve o mesmo JSON de `extract_data_with_openai` e uma confiança (0 a 1) por campo;
+só os documentos com algum campo abaixo do limite precisam ir para a IA, e
+`merge_with_llm` combina as duas extrações campo a campo.
+"""
+import os
+import re
+from datetime import date
+
+CONFIDENCE_THRESHOLD = float(os.getenv("RULES_CONFIDENCE_THRESHOLD", "0.8"))
+
+CLIENT_FIELDS = ("nome_razao_social", "documento", "tipo_pessoa", "nome_responsavel")
+EVENT_FIELDS = ("numero_processo", "numero_termo", "nome_evento", "datas_evento",
+                "hora_inicio", "hora_fim", "valor_final", "espaco_utilizado")
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+_NUMERO = r"n\s*[º°o.]*\s*:?"
+PROCESSO_RE = re.compile(rf"Processo\s*{_NUMERO}\s*(E\s*:\s*[\d.]+\s*/\s*\d{{4}})", re.IGNORECASE)
+TERMO_RE = re.compile(rf"Termo\s*{_NUMERO}\s*(\d+\s*/\s*\d{{4}})", re.IGNORECASE)
+PERMISSIONARIO_RE = re.compile(r"PERMISSION[ÁA]RI[OA](?:\s*\(A\))?\s*:\s*(.+)")
+CNPJ_RE = re.compile(r"\b(\d{2}\.?\d{3}\.?\d{3}\s*/?\s*\d{4}\s*-?\s*\d{2})\b")
+CPF_RE = re.compile(r"\b(\d{3}\.?\d{3}\.?\d{3}\s*-?\s*\d{2})\b")
+PESSOA_FISICA_RE = re.compile(r"PESSOA\s+F[ÍI]SICA", re.IGNORECASE)
+NAME_PREFIX_RE = re.compile(r"^(?:(?:A|O)\s+)?(?:PESSOA\s+(?:F[ÍI]SICA|JUR[ÍI]DICA)\s+)?", re.IGNORECASE)
+RESPONSAVEL_RE = re.compile(
+    r"representad[oa]\s+(?:neste\s+ato\s+)?(?:legalmente\s+)?(?:pel[oa]|por)\s+"
+    r"(?:(?:seu|sua)\s+[\w\s/]+?,\s*)?(?:(?:o|a)\s+)?(?:Sr\.?a?|Sra\.?|Dr\.?a?|Prof\.?a?)?\s*"
+    r"([A-ZÀ-Ý][^,]{3,80}?)\s*,\s*(?:inscrit|portador|brasileir|CPF)",
+    re.IGNORECASE,
+)
+OBJETO_RE = re.compile(r"CL[ÁA]USULA\s+PRIMEIRA.*?(?=CL[ÁA]USULA\s+SEGUNDA|\Z)", re.IGNORECASE | re.DOTALL)
+NOME_EVENTO_RE = re.compile(r"realiza[çc][ãa]o\b[^“\"”]{0,80}?[“\"]([^”\"]+)[”\"]", re.IGNORECASE)
+# Sem aspas, o nome vai até a data ("para realização de reunião do Fórum ... no dia 08 de janeiro")
+NOME_EVENTO_LIVRE_RE = re.compile(r"para\s+realiza[çc][ãa]o\s+d[eoa]s?\s+(.+?),?\s+(?:n[oa]s?\s+dias?|a\s+ser\s+realizad)", re.IGNORECASE)
+ESPACO_RE = re.compile(r"de\s+[áa]rea\s+d[oa]s?\s+(.+?)\s+do\s+im[óo]vel\s+denominado\s+([^,]+)", re.IGNORECASE)
+DATAS_RE = re.compile(
+    r"(\d{1,2})º?((?:\s*(?:,|e|a|até)\s*\d{1,2}º?)*)\s+de\s+(" + "|".join(MONTHS) + r")(?:\s+de)?(?:\s+(\d{4}))?",
+    re.IGNORECASE,
+)
+_HORA = r"\d{1,2}\s*h(?:\s*\d{2})?(?:\s*min)?|\d{1,2}:\d{2}"
+HORARIO_RE = re.compile(rf"(?:das|de)\s+({_HORA})\s+(?:às|as|até|a)\s+({_HORA})", re.IGNORECASE)
+A_PARTIR_RE = re.compile(rf"a\s+partir\s+das\s+({_HORA})", re.IGNORECASE)
+VALOR_RE = re.compile(r"valor\s+total\s+de\s+R\$\s*([\d.]+,\d{2})", re.IGNORECASE)
+GRATUITO_RE = re.compile(r"gratuit|sem\s+[ôo]nus|isen[çc][ãa]o|isent[oa]", re.IGNORECASE)
+
+
+def _digits(value):
+    return "".join(filter(str.isdigit, value))
+
+
+def _check_digits_ok(number, weights_list):
+    for weights in weights_list:
+        total = sum(int(d) * w for d, w in zip(number, weights))
+        digit = 11 - total % 11
+        if (0 if digit >= 10 else digit) != int(number[len(weights)]):
+            return False
+    return True
+
+
+def is_valid_cpf(cpf):
+    cpf = _digits(cpf)
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    return _check_digits_ok(cpf, [range(10, 1, -1), range(11, 1, -1)])
+
+
+def is_valid_cnpj(cnpj):
+    cnpj = _digits(cnpj)
+    if len(cnpj) != 14 or cnpj == cnpj[0] * 14:
+        return False
+    return _check_digits_ok(cnpj, [[5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]])
+
+
+def _clean_spaces(value):
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def _extract_client(text, confidence):
+    client = dict.fromkeys(CLIENT_FIELDS)
+    match = PERMISSIONARIO_RE.search(text)
+    if not match:
+        confidence.update({f"cliente.{field}": 0.0 for field in CLIENT_FIELDS})
+        return client
+    paragraph = match.group(1)
+
+    name = _clean_spaces(NAME_PREFIX_RE.sub("", paragraph.split(",")[0]))
+    client["nome_razao_social"] = name or None
+    confidence["cliente.nome_razao_social"] = 0.85 if name else 0.0
+
+    cnpjs = [_digits(m) for m in CNPJ_RE.findall(paragraph)]
+    cpfs = [_digits(m) for m in CPF_RE.findall(paragraph)]
+    is_pf = bool(PESSOA_FISICA_RE.search(paragraph)) or not cnpjs
+    if is_pf and cpfs:
+        client["documento"], client["tipo_pessoa"] = cpfs[0], "PF"
+        doc_confidence = 0.95 if is_valid_cpf(cpfs[0]) else 0.3
+    elif cnpjs:
+        client["documento"], client["tipo_pessoa"] = cnpjs[0], "PJ"
+        doc_confidence = 0.95 if is_valid_cnpj(cnpjs[0]) else 0.3
+        # CNPJ e CPF sem "pessoa física" (ex.: MEI): o tipo de pessoa fica ambíguo
+        if cpfs:
+            doc_confidence = min(doc_confidence, 0.6)
+    else:
+        doc_confidence = 0.0
+    confidence["cliente.documento"] = doc_confidence
+    confidence["cliente.tipo_pessoa"] = doc_confidence
+
+    if client["tipo_pessoa"] == "PF":
+        # Para PF o responsável é preenchido depois (sanitize_and_review), como na extração pela IA
+        confidence["cliente.nome_responsavel"] = 0.9
+    else:
+        responsavel = RESPONSAVEL_RE.search(paragraph)
+        if responsavel:
+            client["nome_responsavel"] = _clean_spaces(responsavel.group(1))
+            confidence["cliente.nome_responsavel"] = 0.8
+        else:
+            confidence["cliente.nome_responsavel"] = 0.0
+    return client
+
+
+def _parse_dates(clause):
+    """Datas do tipo "no dia 01 de agosto de 2025" ou "nos dias 11 e 12 de setembro de 2025"."""
+    groups = []
+    for first_day, more_days, month, year in DATAS_RE.findall(clause):
+        days = [int(first_day)] + [int(d) for d in re.findall(r"\d{1,2}", more_days)]
+        if re.search(r"\b(?:a|até)\b", more_days) and len(days) == 2:
+            days = list(range(days[0], days[1] + 1))
+        groups.append((days, MONTHS[month.lower()], int(year) if year else None))
+    if not groups:
+        return [], 0.0
+    # Grupos sem ano herdam o próximo ano citado ("27 de fevereiro, 27 de março de 2025")
+    next_year = None
+    for index in range(len(groups) - 1, -1, -1):
+        days, month, year = groups[index]
+        next_year = year or next_year
+        groups[index] = (days, month, next_year)
+    if any(year is None for _, _, year in groups):
+        return [], 0.0
+    try:
+        dates = sorted({date(year, month, day).isoformat() for days, month, year in groups for day in days})
+    except ValueError:
+        return [], 0.0
+    return dates, 0.9 if len(groups) == 1 else 0.6
+
+
+def _normalize_hour(value):
+    return re.sub(r"\s+", "", value)
+
+
+def _extract_event(text, confidence):
+    event = dict.fromkeys(EVENT_FIELDS)
+
+    processo = PROCESSO_RE.search(text)
+    event["numero_processo"] = re.sub(r"\s+", "", processo.group(1)) if processo else None
+    confidence["evento.numero_processo"] = 0.95 if processo else 0.0
+
+    termo = TERMO_RE.search(text)
+    event["numero_termo"] = re.sub(r"\s+", "", termo.group(1)) if termo else None
+    confidence["evento.numero_termo"] = 0.95 if termo else 0.0
+
+    objeto = OBJETO_RE.search(text)
+    clause = objeto.group(0) if objeto else ""
+    # Só o trecho até "conforme proposta" descreve o evento (depois vêm números de ofício)
+    clause = re.split(r"conforme\s+proposta", clause, maxsplit=1, flags=re.IGNORECASE)[0]
+
+    nome = NOME_EVENTO_RE.search(clause)
+    if nome:
+        event["nome_evento"] = _clean_spaces(nome.group(1))
+        confidence["evento.nome_evento"] = 0.85
+    else:
+        nome = NOME_EVENTO_LIVRE_RE.search(clause)
+        event["nome_evento"] = _clean_spaces(nome.group(1)) if nome else None
+        confidence["evento.nome_evento"] = 0.6 if nome else 0.0
+
+    espaco = ESPACO_RE.search(clause)
+    if espaco:
+        event["espaco_utilizado"] = _clean_spaces(f"{espaco.group(1)} do {espaco.group(2)}")
+    confidence["evento.espaco_utilizado"] = 0.8 if espaco else 0.0
+
+    after_name = clause[nome.end():] if nome else clause
+    event["datas_evento"], confidence["evento.datas_evento"] = _parse_dates(after_name)
+
+    horario = HORARIO_RE.search(after_name)
+    a_partir = A_PARTIR_RE.search(after_name)
+    if horario:
+        event["hora_inicio"], event["hora_fim"] = map(_normalize_hour, horario.groups())
+        confidence["evento.hora_inicio"] = confidence["evento.hora_fim"] = 0.85
+    elif a_partir:
+        event["hora_inicio"] = _normalize_hour(a_partir.group(1))
+        confidence["evento.hora_inicio"] = 0.85
+        # "a partir das 18h": o termo não define o horário de término
+        confidence["evento.hora_fim"] = 0.8
+    else:
+        confidence["evento.hora_inicio"] = confidence["evento.hora_fim"] = 0.0
+
+    valor = VALOR_RE.search(text)
+    if valor:
+        event["valor_final"] = float(valor.group(1).replace(".", "").replace(",", "."))
+        confidence["evento.valor_final"] = 0.95
+    elif GRATUITO_RE.search(text):
+        event["valor_final"] = 0.0
+        confidence["evento.valor_final"] = 0.7
+    else:
+        confidence["evento.valor_final"] = 0.0
+    return event
+
+
+def extract_with_rules(text):
+    """
+    Extrai localmente os campos do termo.
+    Retorna (dados no formato de `extract_data_with_openai`, confiança por campo),
+    com os campos identificados como "cliente.<campo>" e "evento.<campo>".
+    """
+    confidence = {}
+    client = _extract_client(text, confidence)
+    event = _extract_event(text, confidence)
+    return {"cliente": client, "eventos": [event]}, confidence
+
+
+def low_confidence_fields(confidence, threshold=CONFIDENCE_THRESHOLD):
+    """Campos que precisam ser confirmados pela IA."""
+    return sorted(field for field, value in confidence.items() if value < threshold)
+
+
+def merge_with_llm(rules_data, confidence, llm_data, threshold=CONFIDENCE_THRESHOLD):
+    """
+    Combina as duas extrações: mantém os campos das regras com confiança suficiente
+    e usa a resposta da IA nos demais. Se a IA encontrou mais de um evento no termo,
+    a lista de eventos dela é usada inteira (as regras só reconhecem um evento).
+    """
+    merged_client = dict(llm_data.get("cliente") or {})
+    for field in CLIENT_FIELDS:
+        if confidence.get(f"cliente.{field}", 0.0) >= threshold:
+            merged_client[field] = rules_data["cliente"][field]
+
+    llm_events = llm_data.get("eventos") or []
+    if len(llm_events) > 1:
+        merged_events = llm_events
+    else:
+        merged_event = dict(llm_events[0]) if llm_events else {}
+        for field in EVENT_FIELDS:
+            if confidence.get(f"evento.{field}", 0.0) >= threshold or field not in merged_event:
+                merged_event[field] = rules_data["eventos"][0][field]
+        merged_events = [merged_event]
+
+    merged = dict(llm_data)
+    merged["cliente"] = merged_client
+    merged["eventos"] = merged_events
+    return merged
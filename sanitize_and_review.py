@@ -1,50 +1,63 @@
-import json
-import requests
-import time
 import os
 
-SOURCE_FILE = "dados_extraidos_openai.json"
-OUTPUT_FILE = "dados_prontos_para_importar.json"
+from cnpj_enrichment import CNPJCache, CNPJEnricher, clean_cnpj
+from jsonl_io import JsonlWriter, iter_records, resolve_data_file
+from metrics import metrics
+from near_duplicates import CLUSTERS_FILE, load_cluster_ids
+
+SOURCE_FILE = "dados_extraidos_openai.jsonl"
+OUTPUT_FILE = "dados_prontos_para_importar.jsonl"
+
+_enricher = None
+
+def get_enricher():
+    """Consultor da BrasilAPI compartilhado (limite de taxa, cache em disco e sessão HTTP; ver cnpj_enrichment.py)."""
+    global _enricher
+    if _enricher is None:
+        _enricher = CNPJEnricher(cache=CNPJCache())
+    return _enricher
 
 def enrich_data_from_cnpj(cnpj):
     """Busca dados adicionais de um CNPJ usando a BrasilAPI."""
-    if not cnpj or not isinstance(cnpj, str):
-        return None
-    
-    cleaned_cnpj = "".join(filter(str.isdigit, cnpj))
-    
-    if len(cleaned_cnpj) != 14:
-        return None
-        
-    print(f"    -> Buscando dados para o CNPJ: {cleaned_cnpj}...")
-    try:
-        # A BrasilAPI tem um rate limit, então uma pausa é prudente.
-        # Gratuito: 3 req/min. Vamos esperar mais para garantir.
-        time.sleep(21) 
-        response = requests.get(f"https://brasilapi.com.br/api/cnpj/v1/{cleaned_cnpj}")
-        response.raise_for_status() 
-        return response.json()
-    except requests.RequestException as e:
-        print(f"    -> Erro ao consultar a API para o CNPJ {cleaned_cnpj}: {e}")
-        return None
-
-def sanitize_and_review_data():
-    """Lê os dados extraídos, enriquece, aplica regras e salva para revisão."""
+    return get_enricher().lookup(cnpj)
+
+def sanitize_and_review_data(enricher=None):
+    """
+    Lê os dados extraídos, enriquece, aplica regras e salva para revisão (registro a registro).
+
+    Uma primeira passada reúne os CNPJs dos clientes PJ, consultados em paralelo e uma
+    única vez cada; a segunda aplica os dados obtidos e grava o arquivo final.
+
+    O grupo de termos quase idênticos (`grupo_similar`) segue para a importação. Vale o
+    de CLUSTERS_FILE, calculado com todos os termos indexados; o gravado no registro
+    durante a extração é provisório e só é usado para arquivos ausentes de CLUSTERS_FILE.
+    """
+    enricher = enricher or get_enricher()
     
-    try:
-        with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-    except FileNotFoundError:
+    source_file = resolve_data_file(SOURCE_FILE)
+    if not os.path.exists(source_file):
         print(f"Erro: Arquivo de origem '{SOURCE_FILE}' não encontrado.")
         print(f"Por favor, execute o script 'process_documents.py' primeiro para gerar o arquivo '{SOURCE_FILE}'.")
         return
 
     print("Iniciando processo de sanitização e enriquecimento de dados...")
-    
-    final_data_for_import = []
 
-    for i, record in enumerate(all_data):
-        print(f"\n[ Processando registro {i+1}/{len(all_data)} ] Arquivo: {record.get('arquivo_origem')}")
+    pj_documents = [
+        (record.get('cliente') or {}).get('documento')
+        for record in iter_records(source_file)
+        if (record.get('cliente') or {}).get('tipo_pessoa') == 'PJ'
+    ]
+    print(f"Consultando {len(set(filter(None, map(clean_cnpj, pj_documents))))} CNPJs distintos "
+          f"({len(pj_documents)} registros PJ) na BrasilAPI...")
+    with metrics.timer("enriquecimento_cnpj"):
+        enriched_by_cnpj = enricher.lookup_many(pj_documents)
+    print(f"CNPJs: {enricher.cache_hits} do cache, {enricher.api_calls} requisições à API.")
+
+    cluster_ids = load_cluster_ids(CLUSTERS_FILE)
+    writer = JsonlWriter(OUTPUT_FILE)
+
+    for i, record in enumerate(iter_records(source_file)):
+        print(f"\n[ Processando registro {i+1} ] Arquivo: {record.get('arquivo_origem')}")
         
         client_data = record.get('cliente')
         event_list = record.get('eventos')
@@ -56,7 +69,7 @@ def sanitize_and_review_data():
         # --- ETAPA DE ENRIQUECIMENTO E PÓS-PROCESSAMENTO ---
         
         if client_data and client_data.get('tipo_pessoa') == 'PJ':
-            enriched_info = enrich_data_from_cnpj(client_data.get('documento'))
+            enriched_info = enriched_by_cnpj.get(clean_cnpj(client_data.get('documento')))
             if enriched_info:
                 print("    -> Dados da API recebidos. Atualizando registro.")
                 # Usa a razão social oficial da API
@@ -81,21 +94,34 @@ def sanitize_and_review_data():
              client_data['nome_responsavel'] = client_data.get('nome_razao_social')
              print("    -> Regra PF aplicada: nome do responsável preenchido.")
 
-        # Adiciona o cliente e seus eventos à lista final
-        final_data_for_import.append({
+        # Grava o cliente e seus eventos no arquivo final assim que ficam prontos
+        output = {
             "cliente": client_data,
             "eventos": event_list,
             "arquivo_origem": record.get('arquivo_origem'),
             "id_arquivo_drive": record.get('id_arquivo_drive')
-        })
+        }
+        group = cluster_ids.get(record.get('id_arquivo_drive')) or record.get('grupo_similar')
+        if group:
+            output["grupo_similar"] = group
+        writer.write(output)
 
-    # Salva o resultado final em um novo arquivo JSON
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_data_for_import, f, indent=2, ensure_ascii=False)
+    writer.close()
 
     print(f"\n--- Processo Concluído ---")
     print(f"Os dados foram sanitizados, enriquecidos e salvos em '{OUTPUT_FILE}'.")
     print("Por favor, abra este arquivo e revise os dados antes da importação final.")
+    metrics.count("registros_gravados", writer.written)
+    metrics.write_run("sanitize_and_review")
+
+
+def add_arguments(parser):
+    """Sem opções por enquanto (ver `extrator.py sanitize`)."""
+
+
+def run_cli(args):
+    sanitize_and_review_data()
+
 
 if __name__ == "__main__":
-    sanitize_and_review_data()
\ No newline at end of file
+    sanitize_and_review_data()
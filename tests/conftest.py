@@ -0,0 +1,5 @@
+"""Os testes importam os scripts da raiz do repositório, como os benchmarks."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
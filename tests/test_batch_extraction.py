@@ -0,0 +1,86 @@
+"""Ciclo submit -> consulta -> collect de batch_extraction.py contra a Batch API falsa de fakes.py."""
+import json
+import os
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from openai import OpenAI
+
+import batch_extraction
+import process_documents
+from fakes import FakeDriveService, FakeOpenAIBatchServer
+
+FILES = {f"id{i}": (f"termo{i}.docx", [f"Termo de permissão {i}", f"Evento {i}"]) for i in range(6)}
+FOLDERS = {"pagos": ("Pagos", ["id0", "id1", "id2"]), "gratuitos": ("Gratuitos", ["id3", "id4", "id5"])}
+
+
+class _FolderFailingDrive:
+    """Repassa ao Drive falso, mas a listagem de `folder_id` falha com 404."""
+
+    def __init__(self, drive, folder_id):
+        self.drive = drive
+        self.folder_id = folder_id
+
+    def files(self):
+        files = self.drive.files()
+
+        def list_(q=None, **kwargs):
+            if f"'{self.folder_id}'" in (q or ""):
+                def _fail():
+                    raise HttpError(httplib2.Response({"status": 404}), b"pasta removida", uri="fake://drive")
+                return SimpleNamespace(execute=_fail)
+            return files.list(q=q, **kwargs)
+
+        return SimpleNamespace(list=list_, get_media=files.get_media)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for flag in ("USE_LLM_CACHE", "USE_TEXT_CACHE", "USE_RULES"):
+        monkeypatch.setattr(process_documents, flag, False)
+    service = _FolderFailingDrive(FakeDriveService(FILES, FOLDERS), "removida")
+    monkeypatch.setattr(process_documents, "get_drive_service", lambda: service)
+    monkeypatch.setattr(batch_extraction, "get_drive_service", lambda: service)
+    monkeypatch.setattr(process_documents, "drive_folders",
+                        lambda: {"Termos Pagos": "pagos", "Termos Gratuitos": "gratuitos", "Antiga": "removida"})
+
+    def get_docx_text(service, file_id, modified_time=None):
+        if file_id == "id1":
+            raise OSError("conexão interrompida")
+        return process_documents.get_docx_text(service, file_id, modified_time)
+
+    monkeypatch.setattr(batch_extraction, "get_docx_text", get_docx_text)
+
+
+def _written_ids():
+    with open(batch_extraction.OUTPUT_FILE, encoding="utf-8") as f:
+        return sorted(json.loads(line)["id_arquivo_drive"] for line in f if line.strip())
+
+
+def test_submit_poll_collect(pipeline, capsys):
+    responder = lambda messages: {"cliente": {"nome_razao_social": "EMPRESA X"}, "eventos": []}
+    with FakeOpenAIBatchServer(responder=responder, failing_ids={"id4"}, polls_until_done=2) as server:
+        llm = OpenAI(base_url=server.base_url, api_key="teste", max_retries=0)
+
+        batch_id = batch_extraction.submit(llm_client=llm)
+        submitted = capsys.readouterr().out
+        assert batch_id in server.batches
+        assert os.path.exists(batch_extraction.BATCH_STATE_FILE)
+        # O download que falhou e a pasta não listada são relatados; os demais seguem para o lote
+        assert "termo1.docx: erro no download: conexão interrompida" in submitted
+        assert "Antiga" in submitted
+        with open(batch_extraction.BATCH_INPUT_FILE, encoding="utf-8") as f:
+            assert sorted(json.loads(line)["custom_id"] for line in f) == ["id0", "id2", "id3", "id4", "id5"]
+
+        batch_extraction.collect(llm_client=llm, poll_interval=0)
+        collected = capsys.readouterr().out
+
+    assert server.batches[batch_id]["_polls"] == 3
+    assert _written_ids() == ["id0", "id2", "id3", "id5"]
+    assert "termo4.docx" in collected
+    assert not os.path.exists(batch_extraction.BATCH_STATE_FILE)
+    with open(process_documents.MANIFEST_FILE, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["id0", "id2", "id3", "id5"]
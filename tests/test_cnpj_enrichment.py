@@ -0,0 +1,96 @@
+"""`cnpj_enrichment.CNPJEnricher` contra a BrasilAPI falsa de fakes.py."""
+import email.utils
+import time
+
+import pytest
+
+from cnpj_enrichment import CNPJCache, CNPJEnricher, TokenBucket
+from fakes import FakeBrasilAPIServer
+
+CNPJ = "12345678000195"
+OTHER_CNPJ = "11222333000181"
+COMPANIES = {CNPJ: {"razao_social": "EMPRESA X LTDA"}, OTHER_CNPJ: {"razao_social": "EMPRESA Y SA"}}
+
+
+class _QuotaOnceServer(FakeBrasilAPIServer):
+    """Responde 429 com `retry_after` (cabeçalho Retry-After) à primeira requisição de cada CNPJ."""
+
+    def __init__(self, companies, retry_after):
+        super().__init__(companies)
+        self.retry_after = retry_after
+
+    def respond(self, cnpj):
+        if cnpj not in self.requests:
+            self.requests[cnpj] = 1
+            self.throttled += 1
+            return 429, {"message": "Too Many Requests"}, {"Retry-After": self.retry_after}
+        return super().respond(cnpj)
+
+
+def _enricher(api, cache=None, rate_per_minute=6000, capacity=10):
+    return CNPJEnricher(base_url=api.base_url, limiter=TokenBucket(rate_per_minute, capacity), cache=cache)
+
+
+def test_requests_are_paced_by_the_token_bucket():
+    with FakeBrasilAPIServer(COMPANIES) as api:
+        enricher = _enricher(api, rate_per_minute=600, capacity=1)
+        start = time.monotonic()
+        for cnpj in (CNPJ, OTHER_CNPJ, CNPJ, OTHER_CNPJ, CNPJ):
+            assert enricher.lookup(cnpj) is not None
+        elapsed = time.monotonic() - start
+    # Uma ficha a cada 0,1s: a primeira é imediata, as outras quatro esperam
+    assert elapsed >= 0.35
+    assert api.throttled == 0
+
+
+def test_429_waits_for_retry_after_in_seconds():
+    with _QuotaOnceServer(COMPANIES, "0.5") as api:
+        enricher = _enricher(api)
+        start = time.monotonic()
+        data = enricher.lookup(CNPJ)
+        elapsed = time.monotonic() - start
+    assert data["razao_social"] == "EMPRESA X LTDA"
+    assert api.throttled == 1 and enricher.api_calls == 2
+    assert elapsed >= 0.45
+
+
+@pytest.mark.parametrize("retry_after", ["data", "inválido"])
+def test_429_with_http_date_or_invalid_retry_after(retry_after):
+    if retry_after == "data":
+        retry_after = email.utils.formatdate(time.time() + 1, usegmt=True)
+    with _QuotaOnceServer(COMPANIES, retry_after) as api:
+        enricher = _enricher(api)
+        results = enricher.lookup_many([CNPJ, OTHER_CNPJ])
+    assert {cnpj: data["razao_social"] for cnpj, data in results.items()} == {
+        CNPJ: "EMPRESA X LTDA", OTHER_CNPJ: "EMPRESA Y SA"}
+    assert api.throttled == 2
+
+
+def test_cache_entries_expire_after_ttl(tmp_path):
+    cache = CNPJCache(str(tmp_path / "cache_cnpj.db"), ttl_days=1)
+    with FakeBrasilAPIServer(COMPANIES) as api:
+        enricher = _enricher(api, cache=cache)
+        missing = "99888777000166"
+        assert enricher.lookup(CNPJ)["razao_social"] == "EMPRESA X LTDA"
+        assert enricher.lookup(missing) is None
+        assert enricher.lookup(CNPJ) is not None and enricher.lookup(missing) is None
+        # Dentro da validade, nem o CNPJ inexistente (404) volta à API
+        assert enricher.api_calls == 2 and enricher.cache_hits == 2
+
+        with cache._lock:
+            cache._conn.execute("UPDATE cnpjs SET consultado_em = consultado_em - 2 * 86400 WHERE cnpj = ?", (CNPJ,))
+            cache._conn.commit()
+        assert enricher.lookup(CNPJ) is not None
+        assert enricher.lookup(missing) is None
+    assert api.requests == {CNPJ: 2, missing: 1}
+    cache.close()
+
+
+def test_repeated_cnpjs_are_looked_up_once():
+    documents = [CNPJ, "12.345.678/0001-95", OTHER_CNPJ, "11.222.333/0001-81", CNPJ, None, "123", "não informado"]
+    with FakeBrasilAPIServer(COMPANIES, latency=0.02) as api:
+        enricher = _enricher(api)
+        results = enricher.lookup_many(documents)
+    assert sorted(results) == sorted([CNPJ, OTHER_CNPJ])
+    assert api.requests == {CNPJ: 1, OTHER_CNPJ: 1}
+    assert enricher.api_calls == 2
@@ -0,0 +1,94 @@
+"""`drive_listing.iter_docx_files` contra o Drive falso de fakes.py."""
+from types import SimpleNamespace
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import drive_listing
+import resilience
+from fakes import FakeDriveService
+
+FILES = {f"id{i}": (f"termo{i}.docx", [f"Termo de permissão {i}"]) for i in range(8)}
+FOLDERS = {
+    "pagos": ("Pagos", ["id0", "id1", "id2", "sub2024"]),
+    "sub2024": ("2024", ["id3", "id4", "sub_jan"]),
+    "sub_jan": ("Janeiro", ["id5"]),
+    "gratuitos": ("Gratuitos", ["id6", "id7", "id0", "id3"]),
+}
+
+
+class _FailingListDrive:
+    """Repassa ao Drive falso, mas as `failures` primeiras listagens de `folder_id` falham com `status`."""
+
+    def __init__(self, drive, folder_id, status, failures=None):
+        self.drive = drive
+        self.folder_id = folder_id
+        self.status = status
+        self.remaining = failures
+        self.attempts = 0
+
+    def files(self):
+        files = self.drive.files()
+
+        def list_(q=None, **kwargs):
+            request = files.list(q=q, **kwargs)
+            if f"'{self.folder_id}'" not in (q or ""):
+                return request
+
+            def _execute():
+                self.attempts += 1
+                if self.remaining is None or self.remaining > 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    raise HttpError(httplib2.Response({"status": self.status}), b"erro simulado", uri="fake://drive")
+                return request.execute()
+            return SimpleNamespace(execute=_execute)
+
+        return SimpleNamespace(list=list_, get_media=files.get_media)
+
+
+def _ids(service, folders, **kwargs):
+    return sorted(item["id"] for item in drive_listing.iter_docx_files(lambda: service, folders, **kwargs))
+
+
+def test_follows_next_page_token():
+    drive = FakeDriveService(FILES, FOLDERS)
+    assert _ids(drive, {"Pagos": "pagos"}, page_size=1) == ["id0", "id1", "id2"]
+    # Três páginas de um arquivo cada (a subpasta não entra sem `recursive`)
+    assert drive.list_calls == 3
+    assert sorted(item["id"] for item in drive_listing.list_docx_files(drive, "gratuitos", page_size=3)) == [
+        "id0", "id3", "id6", "id7"]
+
+
+def test_recursive_lists_subfolders():
+    drive = FakeDriveService(FILES, FOLDERS)
+    assert _ids(drive, {"Pagos": "pagos"}) == ["id0", "id1", "id2"]
+    assert _ids(drive, {"Pagos": "pagos"}, recursive=True, page_size=2) == ["id0", "id1", "id2", "id3", "id4", "id5"]
+
+
+def test_files_in_two_folders_are_yielded_once():
+    drive = FakeDriveService(FILES, FOLDERS)
+    items = list(drive_listing.iter_docx_files(lambda: drive, {"Pagos": "pagos", "Gratuitos": "gratuitos"},
+                                               recursive=True, page_size=2))
+    assert sorted(item["id"] for item in items) == sorted(FILES)
+    assert len(items) == len(FILES)
+
+
+def test_failing_folder_is_recorded_and_the_others_are_listed():
+    service = _FailingListDrive(FakeDriveService(FILES, FOLDERS), "sub2024", status=404)
+    failures = []
+    ids = _ids(service, {"Pagos": "pagos", "Gratuitos": "gratuitos"}, recursive=True, failures=failures)
+    # Os arquivos da subpasta (e da subpasta dela) só são entregues se também estiverem em outra pasta
+    assert ids == ["id0", "id1", "id2", "id3", "id6", "id7"]
+    assert [(name, folder_id) for name, folder_id, _ in failures] == [("Pagos/2024", "sub2024")]
+    assert isinstance(failures[0][2], HttpError)
+    # 404 é fatal: sem novas tentativas
+    assert service.attempts == 1
+
+
+def test_transient_listing_error_is_retried(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda *args: 0)
+    service = _FailingListDrive(FakeDriveService(FILES, FOLDERS), "gratuitos", status=503, failures=2)
+    failures = []
+    assert _ids(service, {"Gratuitos": "gratuitos"}, failures=failures) == ["id0", "id3", "id6", "id7"]
+    assert failures == [] and service.attempts == 3
@@ -0,0 +1,129 @@
+"""`process_documents.run_pipeline` com o Drive e a OpenAI falsos de fakes.py."""
+import random
+import re
+import threading
+import time
+
+import pytest
+
+import process_documents
+from drive_listing import list_docx_files
+from fakes import FAKE_FOLDER_ID, FakeAPIError, FakeDriveService, FakeOpenAIClient
+
+DOCUMENTS = 24
+
+
+class _Counter:
+    """Conta quantas chamadas estão em andamento ao mesmo tempo."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+@pytest.fixture(autouse=True)
+def _no_caches(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(process_documents, "USE_LLM_CACHE", False)
+    monkeypatch.setattr(process_documents, "USE_MULTI_DOC", False)
+
+
+@pytest.fixture
+def drive():
+    files = {f"id{i}": (f"termo{i}.docx", [f"Termo n°: {i}/2025", f"Evento {i}"]) for i in range(DOCUMENTS)}
+    return FakeDriveService(files)
+
+
+def _responder(messages):
+    name = re.search(r"nome do arquivo: (\S+)\)", messages[-1]["content"]).group(1)
+    if name == "termo5.docx":
+        raise FakeAPIError("requisição inválida simulada", status_code=400)
+    return {"cliente": {"nome_razao_social": name}, "eventos": []}
+
+
+def _run(drive, llm, on_result=None, fail_download=(), download_workers=3, llm_workers=2):
+    downloads = _Counter()
+    rng = random.Random(1)
+
+    def fetch_text(item):
+        with downloads:
+            # Latências diferentes fazem os arquivos terminarem fora de ordem
+            time.sleep(rng.random() * 0.01)
+            if item["id"] in fail_download:
+                raise OSError("falha simulada no download")
+            return process_documents.get_docx_text(drive, item["id"])
+
+    items = list_docx_files(drive, FAKE_FOLDER_ID)
+    results = process_documents.run_pipeline(
+        items, fetch_text=fetch_text,
+        extract=lambda text, name: process_documents.extract_data_with_openai(text, name, llm_client=llm),
+        on_result=on_result, download_workers=download_workers, llm_workers=llm_workers)
+    return items, results, downloads
+
+
+def test_results_follow_input_order(drive):
+    llm = FakeOpenAIClient(latency=0.005)
+    emitted = []
+    items, _, _ = _run(drive, llm, on_result=lambda item, result: emitted.append(item["id"]))
+    assert emitted == [item["id"] for item in items]
+
+
+def test_concurrency_is_bounded(drive):
+    llm = FakeOpenAIClient(latency=0.02)
+    downloads = _Counter()
+    # Arquivos entre o início do download e o fim da extração
+    in_flight = _Counter()
+
+    def fetch_text(item):
+        in_flight.__enter__()
+        with downloads:
+            time.sleep(0.005)
+            return process_documents.get_docx_text(drive, item["id"])
+
+    def extract(text, name):
+        try:
+            return process_documents.extract_data_with_openai(text, name, llm_client=llm)
+        finally:
+            in_flight.__exit__()
+
+    results = process_documents.run_pipeline(list_docx_files(drive, FAKE_FOLDER_ID), fetch_text=fetch_text,
+                                             extract=extract, download_workers=3, llm_workers=2)
+    assert len(results) == DOCUMENTS
+    assert downloads.peak <= 3
+    assert llm.peak_in_flight <= 2
+    # Os textos baixados não se acumulam: no máximo os downloads e o dobro das chamadas à IA
+    assert in_flight.peak <= 3 + 2 * 2
+
+
+def test_failing_documents_do_not_drop_the_others(drive):
+    llm = FakeOpenAIClient(responder=_responder)
+    items, results, _ = _run(drive, llm, fail_download={"id3"})
+    assert len(results) == DOCUMENTS
+    failed = {item["id"] for item, result in zip(items, results) if result is None}
+    assert failed == {"id3", "id5"}
+    assert [result["arquivo_origem"] for result in results if result] == \
+        [item["name"] for item in items if item["id"] not in failed]
+
+
+def test_on_result_error_is_raised_after_all_results(drive):
+    llm = FakeOpenAIClient()
+    emitted = []
+
+    def on_result(item, result):
+        if item["id"] == "id2":
+            raise RuntimeError("disco cheio")
+        emitted.append(item["id"])
+
+    with pytest.raises(RuntimeError, match="disco cheio"):
+        _run(drive, llm, on_result=on_result)
+    assert len(emitted) == DOCUMENTS - 1
@@ -0,0 +1,65 @@
+"""
+Cache em disco (SQLite) do texto extraído dos .docx, compartilhado entre os scripts.
+
+A chave é (id do arquivo no Drive, modifiedTime): enquanto o arquivo não for editado,
+o texto já extraído por `process_documents.py` é reaproveitado por `debug_faltantes.py`
+(e por novas execuções) sem baixar o documento de novo. Só a versão mais recente de
+cada arquivo é mantida.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv("TEXT_CACHE_PATH", "cache_textos.db")
+
+
+class TextCache:
+    """Textos dos documentos por (id, modifiedTime), seguro para uso por várias threads."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS textos (
+                id_arquivo TEXT PRIMARY KEY,
+                modified_time TEXT NOT NULL,
+                texto TEXT NOT NULL,
+                salvo_em REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, file_id, modified_time):
+        """Texto guardado para essa versão do arquivo, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT texto FROM textos WHERE id_arquivo = ? AND modified_time = ?", (file_id, modified_time)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, file_id, modified_time, text):
+        """Guarda o texto, substituindo o de versões anteriores do mesmo arquivo."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO textos (id_arquivo, modified_time, texto, salvo_em) VALUES (?, ?, ?, ?)",
+                (file_id, modified_time, text, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM textos").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entradas": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,76 +1,295 @@
+"""
+Relatório de qualidade dos dados extraídos, com regras configuráveis por campo.
+
+Os registros são lidos uma única vez e achatados em colunas (uma lista de valores
+por campo); cada regra percorre a coluna inteira de uma vez. Campos "cliente.x" e
+campos de primeiro nível ("arquivo_origem") têm um valor por documento; campos
+"evento.x" têm um valor por evento (um documento sem eventos conta como um evento
+vazio, para que a falta apareça no relatório).
+
+O resultado pode ser salvo em JSON (`--relatorio`) e usado para barrar a importação:
+o script termina com código 1 se alguma regra de severidade "erro" falhar em mais
+registros do que a tolerância permite (ver também `import_to_db.py --validar`).
+
+Uso:
+    python validate_data.py
+    python validate_data.py dados_prontos_para_importar.jsonl --relatorio relatorio.json --tolerancia 0.01
+"""
+import argparse
 import json
+import os
+import re
+import sys
+from datetime import date
+
+from jsonl_io import iter_records, resolve_data_file
+from metrics import metrics
+from rule_extractor import is_valid_cnpj, is_valid_cpf
+
+MAX_EXAMPLES = 5
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Horários como "08:00", "8h" ou "08h30"
+HOUR_RE = re.compile(r"([01]?\d|2[0-3])(:[0-5]\d|h(?:[0-5]\d)?)")
+
+
+def is_valid_document(value):
+    """CPF (11 dígitos) ou CNPJ (14 dígitos) com dígitos verificadores corretos; pontuação é ignorada."""
+    digits = re.sub(r"\D", "", str(value))
+    return is_valid_cpf(digits) if len(digits) == 11 else is_valid_cnpj(digits)
+
+
+def is_iso_date(value):
+    if not isinstance(value, str) or not ISO_DATE_RE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def is_iso_date_list(value):
+    return isinstance(value, list) and all(is_iso_date(item) for item in value)
+
+
+# --- Regras -------------------------------------------------------------------
+# Cada regra é um dicionário com o campo, o nome e a severidade ("erro" ou "aviso"),
+# e uma função `falhas(coluna)` que devolve as posições da coluna que não passam.
+# Com exceção de "obrigatorio", valores vazios não são verificados.
+
+def obrigatorio(field, severity="aviso"):
+    def failures(column):
+        return [i for i, value in enumerate(column) if value is None or value == "" or value == [] or value == {}]
+    return {"campo": field, "regra": "obrigatorio", "severidade": severity, "falhas": failures}
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
 
-def validate_data(filepath="dados_extraidos_openai.json"):
+
+def formato(field, name, check, severity="aviso"):
     """
-    Lê o arquivo JSON com os dados extraídos pela IA e gera um relatório de campos faltantes.
+    Regra genérica: `check(valor)` deve ser verdadeiro para todo valor não vazio.
+    Cada valor distinto da coluna é verificado uma única vez (documentos e datas se repetem muito).
     """
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Erro: O arquivo '{filepath}' não foi encontrado.")
-        print("Por favor, execute o script 'process_documents.py' primeiro.")
-        return
+    def failures(column):
+        results = {}
+        failed = []
+        for i, value in enumerate(column):
+            if value is None or value == "" or value == [] or value == {}:
+                continue
+            try:
+                key = _hashable(value)
+                ok = results.get(key)
+                if ok is None:
+                    ok = results[key] = bool(check(value))
+            except TypeError:  # valor não "hasheável" (ex.: dicionário)
+                ok = bool(check(value))
+            if not ok:
+                failed.append(i)
+        return failed
+    return {"campo": field, "regra": name, "severidade": severity, "falhas": failures}
+
+
+def regex(field, pattern, name=None, severity="aviso"):
+    compiled = re.compile(pattern)
+    return formato(field, name or f"regex {pattern}", lambda value: isinstance(value, str) and compiled.fullmatch(value),
+                   severity)
+
+
+def valores(field, allowed, severity="aviso"):
+    allowed = frozenset(allowed)
+    return formato(field, f"valores {sorted(allowed)}", lambda value: value in allowed, severity)
+
+
+def faixa(field, minimum=None, maximum=None, severity="aviso"):
+    def in_range(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return (minimum is None or value >= minimum) and (maximum is None or value <= maximum)
+    return formato(field, f"faixa [{minimum}, {maximum}]", in_range, severity)
+
+
+# Regras "erro" correspondem ao que a importação não consegue gravar ou gravaria errado
+DEFAULT_RULES = [
+    obrigatorio('cliente.nome_razao_social', "erro"),
+    obrigatorio('cliente.documento'),
+    obrigatorio('cliente.tipo_pessoa', "erro"),
+    obrigatorio('cliente.nome_responsavel'),
+    obrigatorio('evento.nome_evento', "erro"),
+    obrigatorio('evento.datas_evento'),
+    obrigatorio('evento.valor_final'),
+    obrigatorio('evento.espaco_utilizado'),
+    formato('cliente.documento', "cpf_cnpj", is_valid_document, "erro"),
+    valores('cliente.tipo_pessoa', ("PF", "PJ"), "erro"),
+    formato('evento.datas_evento', "datas_iso", is_iso_date_list, "erro"),
+    faixa('evento.valor_final', 0, 1_000_000),
+    regex('evento.hora_inicio', HOUR_RE.pattern, "horario"),
+    regex('evento.hora_fim', HOUR_RE.pattern, "horario"),
+]
+
+
+# --- Colunas ------------------------------------------------------------------
+
+def _get_path(data, keys):
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
 
-    total_records = len(data)
-    if total_records == 0:
-        print("Nenhum dado encontrado no arquivo para validar.")
-        return
-    
-    total_events = sum(len(record.get('eventos', [])) for record in data)
-
-    # Dicionário para contar os campos faltantes
-    missing_counts = {
-        'cliente.nome_razao_social': 0,
-        'cliente.documento': 0,
-        'cliente.tipo_pessoa': 0,
-        'cliente.nome_responsavel': 0,
-        'evento.nome_evento': 0,
-        'evento.datas_evento': 0,
-        'evento.valor_final': 0,
-        'evento.espaco_utilizado': 0
-    }
 
-    # Itera sobre cada documento extraído
-    for record in data:
-        # Validação do Cliente
-        cliente = record.get('cliente', {})
-        if not cliente or not cliente.get('nome_razao_social'): missing_counts['cliente.nome_razao_social'] += 1
-        if not cliente or not cliente.get('documento'): missing_counts['cliente.documento'] += 1
-        if not cliente or not cliente.get('tipo_pessoa'): missing_counts['cliente.tipo_pessoa'] += 1
-        if not cliente or not cliente.get('nome_responsavel'): missing_counts['cliente.nome_responsavel'] += 1
-        
-        # Validação do(s) Evento(s)
-        eventos = record.get('eventos', [])
-        if not eventos:
-             # Se a lista de eventos estiver vazia, todos os campos de evento contam como faltantes
-            for key in missing_counts:
-                if key.startswith('evento.'):
-                    missing_counts[key] += 1
+def _group_by_parent(fields, skip=0):
+    """[(caminho do dicionário pai, [(coluna, chave final), ...]), ...] para resolver cada pai uma vez só."""
+    groups = {}
+    for field, column in fields:
+        keys = field.split('.')[skip:]
+        groups.setdefault(tuple(keys[:-1]), []).append((column, keys[-1]))
+    return list(groups.items())
+
+
+def _append_values(data, groups):
+    for parent_keys, leaves in groups:
+        parent = _get_path(data, parent_keys) if parent_keys else data
+        if isinstance(parent, dict):
+            get = parent.get
+            for column, key in leaves:
+                column.append(get(key))
         else:
-            for evento in eventos:
-                if not evento.get('nome_evento'): missing_counts['evento.nome_evento'] += 1
-                # Verifica se a lista de datas está vazia ou ausente
-                if not evento.get('datas_evento'): missing_counts['evento.datas_evento'] += 1
-                if evento.get('valor_final') is None: missing_counts['evento.valor_final'] += 1
-                if not evento.get('espaco_utilizado'): missing_counts['evento.espaco_utilizado'] += 1
-    
-    # Imprime o Relatório Final
+            for column, _ in leaves:
+                column.append(None)
+
+
+def flatten(records, fields):
+    """
+    Achata os registros nas colunas de `fields` numa única passada.
+    Retorna (colunas, origem_documentos, origem_eventos, total_documentos, total_eventos):
+    as listas de origem dão, para cada posição, o arquivo de onde o valor veio.
+    """
+    columns = {field: [] for field in fields}
+    record_groups = _group_by_parent(
+        [(field, column) for field, column in columns.items() if not field.startswith('evento.')])
+    event_groups = _group_by_parent(
+        [(field, column) for field, column in columns.items() if field.startswith('evento.')], skip=1)
+    record_origins, event_origins = [], []
+    total_records = total_events = 0
+
+    for record in records:
+        total_records += 1
+        origin = record.get('arquivo_origem') or record.get('id_arquivo_drive')
+        record_origins.append(origin)
+        _append_values(record, record_groups)
+
+        eventos = record.get('eventos') or []
+        total_events += len(eventos)
+        for evento in eventos or [{}]:
+            event_origins.append(origin)
+            _append_values(evento, event_groups)
+
+    return columns, record_origins, event_origins, total_records, total_events
+
+
+def build_report(filepath, rules=DEFAULT_RULES, tolerance=0.0):
+    """
+    Aplica `rules` aos registros de `filepath` e retorna o relatório (um dicionário
+    serializável em JSON). `aprovado` é falso se alguma regra "erro" falhar em mais
+    do que `tolerance` (fração) das posições do seu campo.
+    """
+    fields = list(dict.fromkeys(rule["campo"] for rule in rules))
+    with metrics.timer("validacao_leitura"):
+        columns, record_origins, event_origins, total_records, total_events = flatten(iter_records(filepath), fields)
+
+    report_fields = {}
+    blocking = []
+    for rule in rules:
+        field = rule["campo"]
+        column = columns[field]
+        origins = event_origins if field.startswith('evento.') else record_origins
+        with metrics.timer("validacao"):
+            failures = rule["falhas"](column)
+        field_report = report_fields.setdefault(field, {"posicoes": len(column), "regras": {}})
+        field_report["regras"][rule["regra"]] = {
+            "severidade": rule["severidade"],
+            "falhas": len(failures),
+            "exemplos": list(dict.fromkeys(origins[i] for i in failures))[:MAX_EXAMPLES],
+        }
+        if rule["severidade"] == "erro" and column and len(failures) > tolerance * len(column):
+            blocking.append(f"{field}: {rule['regra']}")
+
+    return {
+        "arquivo": filepath,
+        "total_documentos": total_records,
+        "total_eventos": total_events,
+        "tolerancia": tolerance,
+        "aprovado": not blocking,
+        "bloqueios": blocking,
+        "campos": report_fields,
+    }
+
+
+def print_report(report):
     print("--- Relatório de Qualidade da Extração com OpenAI ---")
-    print(f"Total de documentos analisados: {total_records}")
-    print(f"Total de eventos individuais identificados: {total_events}")
-    print("\n--- Contagem de Campos Nulos ou Vazios ---")
-    print("(Mostrando apenas campos que faltaram ao menos uma vez)\n")
-
-    found_missing = False
-    for field, count in missing_counts.items():
-        if count > 0:
-            found_missing = True
-            target_total = total_events if field.startswith('evento.') else total_records
-            print(f"- {field}: {count} de {target_total} registros.")
-    
-    if not found_missing:
+    print(f"Total de documentos analisados: {report['total_documentos']}")
+    print(f"Total de eventos individuais identificados: {report['total_eventos']}")
+    print("\n--- Regras com falhas ---")
+    print("(Mostrando apenas regras que falharam ao menos uma vez)\n")
+
+    found_failures = False
+    for field, field_report in report["campos"].items():
+        for name, result in field_report["regras"].items():
+            if result["falhas"]:
+                found_failures = True
+                print(f"- [{result['severidade']}] {field} ({name}): {result['falhas']} de {field_report['posicoes']} registros."
+                      f" Ex.: {', '.join(map(str, result['exemplos']))}")
+
+    if not found_failures:
         print("🎉🎉🎉 RESULTADO PERFEITO! Nenhum campo essencial foi identificado como faltante em toda a base de dados!")
+    elif report["aprovado"]:
+        print("\nNenhuma regra de severidade 'erro' acima da tolerância: dados liberados para importação.")
+    else:
+        print(f"\nDados REPROVADOS para importação ({len(report['bloqueios'])} regra(s) de erro acima da tolerância).")
+
+
+def validate_data(filepath="dados_extraidos_openai.jsonl", report_path=None, tolerance=0.0, rules=DEFAULT_RULES):
+    """
+    Valida o arquivo (JSON Lines) com os dados extraídos, imprime o relatório e,
+    se `report_path` for dado, salva-o em JSON. Retorna o relatório (None se não
+    houver dados para validar).
+    """
+    filepath = resolve_data_file(filepath)
+    if not os.path.exists(filepath):
+        print(f"Erro: O arquivo '{filepath}' não foi encontrado.")
+        print("Por favor, execute o script 'process_documents.py' primeiro.")
+        return None
+
+    report = build_report(filepath, rules, tolerance)
+    if report["total_documentos"] == 0:
+        print("Nenhum dado encontrado no arquivo para validar.")
+        return None
+
+    print_report(report)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório salvo em '{report_path}'.")
+    return report
+
+def add_arguments(parser):
+    """Opções de linha de comando (usadas aqui e em `extrator.py validate`)."""
+    parser.add_argument("arquivo", nargs="?", default="dados_extraidos_openai.jsonl")
+    parser.add_argument("--relatorio", help="Salva o relatório em JSON neste caminho.")
+    parser.add_argument("--tolerancia", type=float, default=0.0,
+                        help="Fração de falhas aceita em regras de severidade 'erro' (padrão: 0).")
+
+
+def run_cli(args):
+    """Valida o arquivo e encerra com código 1 se os dados forem reprovados."""
+    report = validate_data(args.arquivo, args.relatorio, args.tolerancia)
+    metrics.write_run("validate_data")
+    sys.exit(0 if report and report["aprovado"] else 1)
+
 
 if __name__ == "__main__":
-    validate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Relatório de qualidade dos dados extraídos.")
+    add_arguments(parser)
+    run_cli(parser.parse_args())